@@ -0,0 +1,79 @@
+"""
+Throughput benchmark of distributed batch analysis, using the fake UCI engine.
+
+Runs a coordinator and 1, 2, 4, ... local workers over loopback TCP and
+reports positions per second for each worker count. Engine start-up is
+excluded, so the numbers show how far leasing, the JSON protocol and result
+collection let throughput grow with the number of engines.
+
+Usage:
+    python benchmarks/bench_distributed.py
+    python benchmarks/bench_distributed.py --workers 1 2 4 8 --positions 200 --latency 0.05
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.distributed import Coordinator, run_worker
+from src.engine import EngineHandler
+from src.random_positions import random_fens
+
+FAKE_ENGINE = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'tests', 'fake_uci_engine.py'))
+
+
+def run(fens, workers, latency, batch_size):
+    """Seconds for `workers` local engines to analyse every position, and the positions analysed."""
+    handlers = [EngineHandler(FAKE_ENGINE, ["--latency", str(latency)]) for _ in range(workers)]
+    for handler in handlers:
+        success, msg = handler.initialize_engine()
+        if not success:
+            raise RuntimeError(msg)
+
+    coordinator = Coordinator({"depth": 4}, batch_size=batch_size)
+    _, port = coordinator.serve("127.0.0.1", 0)
+    try:
+        for fen in fens:
+            coordinator.add(fen)
+        coordinator.close()
+        threads = [threading.Thread(target=run_worker, args=("127.0.0.1", port, handler, f"bench/{i}"))
+                   for i, handler in enumerate(handlers)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        coordinator.finished.wait()
+        wall = time.perf_counter() - start
+        for thread in threads:
+            thread.join()
+    finally:
+        coordinator.shutdown()
+        for handler in handlers:
+            handler.quit()
+    return wall, coordinator.progress()["done"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark distributed analysis with local fake engines.")
+    parser.add_argument("--workers", nargs="+", type=int, default=[1, 2, 4], help="Worker counts to compare")
+    parser.add_argument("--positions", type=int, default=80, help="Positions per run")
+    parser.add_argument("--latency", type=float, default=0.1, help="Simulated search time (seconds)")
+    parser.add_argument("--batch-size", type=int, default=4, help="Positions per lease")
+    args = parser.parse_args(argv)
+
+    fens = random_fens(args.positions, seed=11)
+    print(f"Distributed throughput (engine latency {args.latency * 1000:.0f} ms, {len(fens)} positions, "
+          f"batches of {args.batch_size})")
+    baseline = None
+    for workers in args.workers:
+        wall, done = run(fens, workers, args.latency, args.batch_size)
+        rate = done / wall
+        baseline = baseline or rate
+        print(f"  {workers:>2} workers: {rate:8.1f} positions/s  (x{rate / baseline:4.2f}, ideal x{workers})")
+
+
+if __name__ == "__main__":
+    main()
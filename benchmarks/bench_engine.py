@@ -0,0 +1,160 @@
+"""
+Deterministic benchmark of the engine layer, using the fake UCI engine.
+
+Measures what EngineHandler itself costs, independent of any real engine:
+  - call overhead of get_best_move / get_top_moves against a zero-latency engine
+  - queueing and lock contention when several threads share one handler
+  - recovery time after an engine crash or hang
+  - EnginePool throughput as the pool grows
+
+Usage:
+    python benchmarks/bench_engine.py
+    python benchmarks/bench_engine.py --calls 500 --pool-sizes 1 2 4 8 --latency 0.02
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.engine import EngineHandler, EnginePool
+from src.random_positions import random_fens
+
+FAKE_ENGINE = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'tests', 'fake_uci_engine.py'))
+
+
+def fake_handler(*args, timeout=10.0):
+    handler = EngineHandler(FAKE_ENGINE, list(args), timeout=timeout)
+    success, msg = handler.initialize_engine()
+    if not success:
+        raise RuntimeError(msg)
+    return handler
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p / 100.0 * len(ordered)))]
+
+
+def describe(label, seconds):
+    ms = [s * 1000.0 for s in seconds]
+    print(f"  {label:<28} mean {statistics.mean(ms):8.3f} ms  p50 {percentile(ms, 50):8.3f}  "
+          f"p99 {percentile(ms, 99):8.3f}  max {max(ms):8.3f}")
+
+
+def bench_overhead(fens, calls):
+    print("Call overhead (zero-latency engine, depth 1)")
+    handler = fake_handler("--latency", "0", "--depth", "1")
+    for name, call in [
+        ("get_best_move", lambda fen: handler.get_best_move(fen, time_limit=0.001)),
+        ("get_top_moves(limit=1)", lambda fen: handler.get_top_moves(fen, limit=1, time_limit=0.001)),
+        ("get_top_moves(limit=3)", lambda fen: handler.get_top_moves(fen, limit=3, time_limit=0.001)),
+    ]:
+        timings = []
+        for i in range(calls):
+            fen = fens[i % len(fens)]
+            start = time.perf_counter()
+            call(fen)
+            timings.append(time.perf_counter() - start)
+        describe(name, timings)
+    handler.quit()
+
+
+def bench_contention(fens, calls, latency, thread_counts):
+    print(f"\nShared handler contention (engine latency {latency * 1000:.0f} ms)")
+    handler = fake_handler("--latency", str(latency), "--depth", "1")
+    for threads in thread_counts:
+        per_thread = max(1, calls // (threads * 4))
+        timings = []
+        timings_lock = threading.Lock()
+
+        def worker():
+            local = []
+            for i in range(per_thread):
+                start = time.perf_counter()
+                handler.get_best_move(fens[i % len(fens)], time_limit=latency)
+                local.append(time.perf_counter() - start)
+            with timings_lock:
+                timings.extend(local)
+
+        start = time.perf_counter()
+        pool = [threading.Thread(target=worker) for _ in range(threads)]
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+        wall = time.perf_counter() - start
+        # Everything beyond the engine's own latency is queueing behind the lock plus overhead
+        waits = [max(0.0, t - latency) for t in timings]
+        print(f"  {threads:>2} threads: {len(timings) / wall:8.1f} calls/s, "
+              f"mean wait {statistics.mean(waits) * 1000:8.2f} ms, p99 wait {percentile(waits, 99) * 1000:8.2f} ms")
+    handler.quit()
+
+
+def bench_recovery(fen):
+    print("\nRecovery")
+    # Crash: the 2nd search of every engine process exits abruptly
+    handler = fake_handler("--crash-after", "2")
+    handler.get_best_move(fen, time_limit=0.01)
+    start = time.perf_counter()
+    failed = handler.get_best_move(fen, time_limit=0.01)
+    crashed_at = time.perf_counter()
+    recovered = handler.get_best_move(fen, time_limit=0.01)
+    end = time.perf_counter()
+    print(f"  crash: failing call {1000 * (crashed_at - start):8.1f} ms, next call "
+          f"{1000 * (end - crashed_at):8.1f} ms ({'recovered' if failed is None and recovered else 'NOT recovered'})")
+    handler.quit()
+
+    # Hang: the engine stops answering; recovery is bounded by the handler timeout
+    timeout = 0.5
+    handler = fake_handler("--hang-after", "2", timeout=timeout)
+    handler.get_best_move(fen, time_limit=0.01)
+    start = time.perf_counter()
+    failed = handler.get_best_move(fen, time_limit=0.01)
+    hung_at = time.perf_counter()
+    recovered = handler.get_best_move(fen, time_limit=0.01)
+    end = time.perf_counter()
+    print(f"  hang (timeout {timeout}s): failing call {1000 * (hung_at - start):8.1f} ms, next call "
+          f"{1000 * (end - hung_at):8.1f} ms ({'recovered' if failed is None and recovered else 'NOT recovered'})")
+    handler.quit()
+
+
+def bench_pool(fens, latency, sizes):
+    print(f"\nEnginePool throughput (engine latency {latency * 1000:.0f} ms, {len(fens)} positions)")
+    baseline = None
+    for size in sizes:
+        pool = EnginePool(size, FAKE_ENGINE, ["--latency", str(latency), "--depth", "1"])
+        success, msg = pool.initialize()
+        if not success:
+            raise RuntimeError(msg)
+        start = time.perf_counter()
+        results = list(pool.map(lambda handler, fen: handler.get_best_move(fen, time_limit=latency), fens))
+        wall = time.perf_counter() - start
+        pool.quit()
+        rate = len(results) / wall
+        baseline = baseline or rate
+        print(f"  {size:>2} engines: {rate:8.1f} positions/s  (x{rate / baseline:4.2f}, ideal x{size})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the engine layer with a fake UCI engine.")
+    parser.add_argument("--calls", type=int, default=200, help="Calls per overhead measurement")
+    parser.add_argument("--latency", type=float, default=0.01, help="Simulated search time (seconds)")
+    parser.add_argument("--threads", nargs="+", type=int, default=[1, 2, 4, 8])
+    parser.add_argument("--pool-sizes", nargs="+", type=int, default=[1, 2, 4])
+    parser.add_argument("--positions", type=int, default=80, help="Positions for the pool benchmark")
+    args = parser.parse_args(argv)
+
+    fens = random_fens(max(args.positions, 20), seed=7)
+    bench_overhead(fens, args.calls)
+    bench_contention(fens, args.calls, args.latency, args.threads)
+    bench_recovery(fens[0])
+    bench_pool(fens[:args.positions], args.latency, args.pool_sizes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Offline accuracy and speed benchmark for the board recognition code.
+
+Renders synthetic boards (src/vision_synth.py) for every combination of piece
+style, square theme, size, noise and blur, calibrates each classifier on the
+starting position in the same look, and reports per-square accuracy, full-FEN
+accuracy, calibration time and images per second.
+
+Usage:
+    python benchmarks/bench_vision.py
+    python benchmarks/bench_vision.py --positions 200 --sizes 32 64 --noise 0 8 --json vision.json
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+
+import chess
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.random_positions import random_fens
+from src.square_classifier import DEFAULT_MODEL_PATH, SquareClassifier, build_training_set
+from src.vision import VisionHandler
+from src.vision_synth import (SQUARE_THEMES, available_styles, count_correct_squares,
+                              generate_samples, render_board)
+
+_mlp_model = None
+
+
+def mlp_vision():
+    """VisionHandler backed by the learned classifier; trains a quick model if none is saved."""
+    global _mlp_model
+    if _mlp_model is None:
+        if os.path.exists(DEFAULT_MODEL_PATH):
+            _mlp_model = SquareClassifier.load(DEFAULT_MODEL_PATH)
+        else:
+            print(f"No model at {DEFAULT_MODEL_PATH}, training one (seed 0)...")
+            features, labels = build_training_set(seed=0)
+            _mlp_model = SquareClassifier(features.shape[1])
+            _mlp_model.train(features, labels)
+    return VisionHandler(classifier=_mlp_model)
+
+
+# name -> factory; each classifier needs calibrate(image) and get_fen_from_image(image)
+CLASSIFIERS = {
+    "template": VisionHandler,
+    "mlp": mlp_vision,
+}
+
+
+def run_config(name, fens, style, theme, size, noise, blur, highlight):
+    classifier = CLASSIFIERS[name]()
+    calibration_image = render_board(chess.STARTING_FEN, size, style, theme, noise, blur, seed=12345)
+
+    start = time.perf_counter()
+    classifier.calibrate(calibration_image)
+    calibrate_seconds = time.perf_counter() - start
+
+    samples = list(generate_samples(fens, size, style, theme, noise, blur, highlight_last_move=highlight))
+    correct_squares = correct_boards = 0
+    start = time.perf_counter()
+    predictions = [classifier.get_fen_from_image(s["image"]) for s in samples]
+    classify_seconds = time.perf_counter() - start
+
+    for sample, predicted in zip(samples, predictions):
+        correct = count_correct_squares(predicted, sample["fen"]) if predicted else 0
+        correct_squares += correct
+        correct_boards += correct == 64
+
+    return {
+        "classifier": name,
+        "style": style,
+        "theme": theme,
+        "size": size,
+        "noise": noise,
+        "blur": blur,
+        "highlight": highlight,
+        "square_accuracy": correct_squares / (64.0 * len(samples)),
+        "fen_accuracy": correct_boards / float(len(samples)),
+        "calibrate_ms": calibrate_seconds * 1000.0,
+        "images_per_second": len(samples) / classify_seconds if classify_seconds > 0 else float('inf'),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark board recognition on synthetic renders.")
+    parser.add_argument("--positions", type=int, default=30, help="Random positions per configuration")
+    parser.add_argument("--classifiers", nargs="+", default=list(CLASSIFIERS), choices=list(CLASSIFIERS))
+    parser.add_argument("--styles", nargs="+", default=available_styles())
+    parser.add_argument("--themes", nargs="+", default=["green", "brown"], choices=list(SQUARE_THEMES))
+    parser.add_argument("--sizes", nargs="+", type=int, default=[48])
+    parser.add_argument("--noise", nargs="+", type=float, default=[0.0, 6.0])
+    parser.add_argument("--blur", nargs="+", type=float, default=[0.0])
+    parser.add_argument("--highlight", action="store_true", help="Tint two random squares like a last-move highlight")
+    parser.add_argument("--seed", type=int, default=2024, help="Seed for the evaluation positions (training uses 0)")
+    parser.add_argument("--json", help="Also write all rows to this JSON file")
+    args = parser.parse_args(argv)
+
+    fens = random_fens(args.positions, seed=args.seed)
+    rows = []
+    print(f"{'classifier':<10} {'style':<8} {'theme':<6} {'size':>4} {'noise':>5} {'blur':>4} "
+          f"{'square%':>8} {'fen%':>6} {'calib ms':>8} {'img/s':>8}")
+    for name, style, theme, size, noise, blur in itertools.product(
+            args.classifiers, args.styles, args.themes, args.sizes, args.noise, args.blur):
+        row = run_config(name, fens, style, theme, size, noise, blur, args.highlight)
+        rows.append(row)
+        print(f"{name:<10} {style:<8} {theme:<6} {size:>4} {noise:>5.1f} {blur:>4.1f} "
+              f"{row['square_accuracy'] * 100:>8.2f} {row['fen_accuracy'] * 100:>6.1f} "
+              f"{row['calibrate_ms']:>8.1f} {row['images_per_second']:>8.1f}")
+
+    print("\nSummary")
+    for name in args.classifiers:
+        own = [r for r in rows if r["classifier"] == name]
+        if not own:
+            continue
+        square = sum(r["square_accuracy"] for r in own) / len(own)
+        fen = sum(r["fen_accuracy"] for r in own) / len(own)
+        speed = sum(r["images_per_second"] for r in own) / len(own)
+        print(f"{name:<10} square {square * 100:6.2f}%  fen {fen * 100:6.1f}%  {speed:8.1f} img/s")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,18 @@
+import argparse
+
 import customtkinter as ctk
 from src.gui import ChessApp
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CheckerChesser")
+    parser.add_argument("--profile", type=float, metavar="SECONDS",
+                        help="Capture a sampling profile of all threads for the first SECONDS of the session")
+    args = parser.parse_args()
+
     ctk.set_appearance_mode("Dark")
     ctk.set_default_color_theme("blue")
-    
+
     app = ChessApp()
+    if args.profile:
+        app.after(0, lambda: app.toggle_profiling(args.profile))
     app.mainloop()
- 
\ No newline at end of file
@@ -0,0 +1,59 @@
+"""
+Shared, thread-safe cache of engine analysis keyed by position.
+
+Entries are keyed by the position's Zobrist (polyglot) hash, so the same
+position reached by different move orders, in different boards, shares one
+entry. A result replaces the cached one unless that is already at least as
+deep and has at least as many lines; get() only answers when the entry has the
+requested number of lines.
+"""
+import collections
+import threading
+
+import chess.polyglot
+
+from src.metrics import registry
+
+
+class AnalysisCache:
+    def __init__(self, max_entries=20000):
+        self.max_entries = max_entries
+        self.entries = collections.OrderedDict()  # key -> {"depth", "multipv", "lines"}, least recently used first
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(board):
+        return chess.polyglot.zobrist_hash(board)
+
+    def get(self, board, multipv=1, min_depth=0):
+        """Cached {"depth", "multipv", "lines"} with lines cut to `multipv`, or None."""
+        key = self.key(board)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None or entry["multipv"] < multipv or entry["depth"] < min_depth:
+                registry.counter("analysis_cache_misses_total", "Analysis cache lookups that missed").inc()
+                return None
+            self.entries.move_to_end(key)
+        registry.counter("analysis_cache_hits_total", "Analysis served from the cache").inc()
+        return dict(entry, lines=entry["lines"][:multipv])
+
+    def put(self, board, lines, depth, multipv):
+        """Store a search result; returns False if a better one was already cached."""
+        key = self.key(board)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry["depth"] >= depth and entry["multipv"] >= multipv:
+                self.entries.move_to_end(key)
+                return False
+            self.entries[key] = {"depth": depth, "multipv": multipv, "lines": list(lines)}
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return True
+
+    def __len__(self):
+        return len(self.entries)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
@@ -0,0 +1,159 @@
+"""
+Fair scheduling of analysis requests from several boards over one engine pool.
+
+Every client (an analysis tab) has at most one job: its current position. A
+job is analysed by iterative deepening in short slices (one fixed-depth
+multipv search each), and the client's callback receives the lines after every
+slice. Between slices the job goes back to the scheduler, so no board can hold
+an engine for long.
+
+Whenever an engine frees up, the visible client's job goes first. Background
+jobs share whatever capacity is left in round-robin order and stop at
+background_max_depth. Results are written to the shared AnalysisCache. A
+slice whose depth is already cached is answered from there without an engine.
+"""
+import collections
+import threading
+
+import chess
+import chess.engine
+
+from src.analysis_cache import AnalysisCache
+
+MATE_SCORE = 10000
+
+
+def lines_from_infos(infos):
+    """Final multipv lines of a search in the EngineHandler.get_top_moves format, plus "depth"."""
+    final = {}
+    for info in infos:
+        if info.get("pv") and "score" in info:
+            final[info.get("multipv", 1)] = info
+    lines = []
+    for rank in sorted(final):
+        info = final[rank]
+        lines.append({
+            "rank": rank,
+            "move": info["pv"][0],
+            "score": info["score"].relative.score(mate_score=MATE_SCORE),
+            "pv": list(info["pv"]),
+            "depth": info.get("depth"),
+        })
+    return lines
+
+
+class AnalysisJob:
+    def __init__(self, client, fen, multipv, callback, depth):
+        self.client = client
+        self.board = chess.Board(fen)
+        self.multipv = multipv
+        self.callback = callback
+        self.depth = depth  # next depth to search
+        self.running = False
+
+
+class AnalysisScheduler:
+    def __init__(self, pool, cache=None, start_depth=8, depth_step=2, max_depth=30, background_max_depth=None):
+        self.pool = pool
+        self.cache = cache if cache is not None else AnalysisCache()
+        self.start_depth = start_depth
+        self.depth_step = depth_step
+        self.max_depth = max_depth
+        self.background_max_depth = background_max_depth or max_depth
+        self.jobs = {}  # client -> current AnalysisJob
+        self.rotation = collections.deque()  # background clients, next in line first
+        self.visible = None
+        self.stopped = False
+        self.threads = []
+        self._cond = threading.Condition()
+
+    def start(self):
+        """One worker thread per pooled engine."""
+        for i in range(self.pool.size):
+            thread = threading.Thread(target=self._worker, name=f"analysis-{i}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self):
+        with self._cond:
+            self.stopped = True
+            self._cond.notify_all()
+
+    def submit(self, client, fen, multipv=3, callback=None):
+        """Analyse `fen` for `client`, replacing whatever it asked for before. callback(lines, depth)."""
+        with self._cond:
+            self.jobs[client] = AnalysisJob(client, fen, multipv, callback, self.start_depth)
+            if client not in self.rotation:
+                self.rotation.append(client)
+            self._cond.notify_all()
+
+    def cancel(self, client):
+        with self._cond:
+            self.jobs.pop(client, None)
+            if client in self.rotation:
+                self.rotation.remove(client)
+            if self.visible == client:
+                self.visible = None
+
+    def set_visible(self, client):
+        with self._cond:
+            self.visible = client
+            self._cond.notify_all()
+
+    def _limit(self, job):
+        return self.max_depth if job.client == self.visible else self.background_max_depth
+
+    def _runnable(self, job):
+        return job is not None and not job.running and job.depth <= self._limit(job)
+
+    def _next_job(self):
+        """Block until a job can run; the visible client first, then background clients in turn."""
+        with self._cond:
+            while not self.stopped:
+                job = self.jobs.get(self.visible)
+                if not self._runnable(job):
+                    job = None
+                    for _ in range(len(self.rotation)):
+                        client = self.rotation[0]
+                        self.rotation.rotate(-1)
+                        if client != self.visible and self._runnable(self.jobs.get(client)):
+                            job = self.jobs[client]
+                            break
+                if job is not None:
+                    job.running = True
+                    return job
+                self._cond.wait()
+            return None
+
+    def _worker(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            try:
+                self._run_slice(job)
+            finally:
+                with self._cond:
+                    job.running = False
+                    self._cond.notify_all()
+
+    def _run_slice(self, job):
+        cached = self.cache.get(job.board, job.multipv, min_depth=job.depth)
+        if cached is not None:
+            lines, depth = cached["lines"], cached["depth"]
+        else:
+            with self.pool.acquire() as handler:
+                if self.jobs.get(job.client) is not job:
+                    return  # superseded while waiting for an engine
+                _, infos = handler.search_infos(job.board, chess.engine.Limit(depth=job.depth),
+                                                multipv=job.multipv)
+                if handler.preempted:
+                    return  # stopped for interactive work: run the same depth again later
+            lines, depth = lines_from_infos(infos), job.depth
+            if not lines:
+                job.depth = self._limit(job) + 1  # engine failure: give up on this position
+                return
+            self.cache.put(job.board, lines, depth, job.multipv)
+        job.depth = depth + self.depth_step
+        if job.callback and self.jobs.get(job.client) is job:
+            job.callback(lines, depth)
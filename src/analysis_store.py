@@ -0,0 +1,267 @@
+"""
+Columnar on-disk store for large batch analysis outputs.
+
+Rows are (Zobrist key, game, ply, depth, score, best move, PV). The writer
+buffers appended rows as a NumPy structured array (ROW_DTYPE); every chunk is
+then written as one .npy file per column (chunk_000000.score.npy, ...), so a
+scan memory-maps only the columns it filters on. Moves are packed to 16 bits
+(src/packing.py) and the PV keeps its first PV_LENGTH moves. manifest.json
+lists the chunks with their row counts and game ranges and is replaced
+atomically, so an interrupted writer never leaves a half-visible chunk.
+
+Rows are expected in game order (all plies of a game before the next game);
+eval-swing queries compare each row with the previous row of the same game,
+across chunk boundaries.
+
+Usage:
+    python -m src.analysis_store info data/analysis
+    python -m src.analysis_store swings data/analysis --threshold 300 --csv swings.csv
+    python -m src.analysis_store game data/analysis 1234
+    python -m src.analysis_store export data/analysis all.csv
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from src.packing import pack_move, unpack_move
+
+PV_LENGTH = 8
+ROW_DTYPE = np.dtype([
+    ("key", "<u8"),              # Zobrist (polyglot) hash of the position
+    ("game", "<u4"),
+    ("ply", "<u2"),
+    ("depth", "u1"),
+    ("score", "<i2"),            # centipawns from White's point of view, mates clipped to +/-32000
+    ("move", "<u2"),             # packed best move
+    ("pv_len", "u1"),
+    ("pv", "<u2", PV_LENGTH),    # packed PV, zero padded
+])
+COLUMNS = list(ROW_DTYPE.names)
+CSV_FIELDS = ["key", "game", "ply", "depth", "score", "move", "pv"]
+
+
+def make_row(key, game, ply, depth, score, move, pv=()):
+    """One ROW_DTYPE tuple from python-chess values (move/pv are chess.Move)."""
+    pv = list(pv)[:PV_LENGTH]
+    packed = [pack_move(m) for m in pv] + [0] * (PV_LENGTH - len(pv))
+    score = max(-32000, min(32000, int(score)))
+    return (key, game, ply, min(depth, 255), score, pack_move(move) if move else 0, len(pv), packed)
+
+
+def _atomic_write(path, write):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        write(f)
+    os.replace(tmp, path)
+
+
+class AnalysisStore:
+    """A directory of column chunks. Open it for reading, or append() and flush() to grow it."""
+
+    def __init__(self, directory, chunk_size=1000000):
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.buffer = []
+        self.buffered = 0
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, "manifest.json")
+        self.chunks = []
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.chunks = json.load(f)["chunks"]
+
+    def __len__(self):
+        return sum(chunk["rows"] for chunk in self.chunks) + self.buffered
+
+    # Writing
+
+    def append(self, rows):
+        """Append a structured array or a list of make_row() tuples."""
+        rows = rows if isinstance(rows, np.ndarray) else np.array(rows, dtype=ROW_DTYPE)
+        if not len(rows):
+            return
+        self.buffer.append(rows)
+        self.buffered += len(rows)
+        if self.buffered >= self.chunk_size:
+            self.flush(full_chunks_only=True)
+
+    def flush(self, full_chunks_only=False):
+        """Write buffered rows as chunks of chunk_size rows (plus a short last one) and publish them."""
+        if not self.buffer:
+            return
+        data = np.concatenate(self.buffer)
+        end = len(data) - len(data) % self.chunk_size if full_chunks_only else len(data)
+        self.buffer = [data[end:]] if end < len(data) else []
+        self.buffered = len(data) - end
+        for start in range(0, end, self.chunk_size):
+            part = data[start:start + self.chunk_size]
+            name = f"chunk_{len(self.chunks):06d}"
+            for column in COLUMNS:
+                values = np.ascontiguousarray(part[column])
+                _atomic_write(os.path.join(self.directory, f"{name}.{column}.npy"),
+                              lambda f, v=values: np.save(f, v))
+            self.chunks.append({"name": name, "rows": len(part),
+                                "game_min": int(part["game"].min()), "game_max": int(part["game"].max())})
+        manifest = json.dumps({"dtype": str(ROW_DTYPE.descr), "chunks": self.chunks}, indent=1)
+        _atomic_write(os.path.join(self.directory, "manifest.json"), lambda f: f.write(manifest.encode("utf-8")))
+
+    def close(self):
+        self.flush()
+
+    # Reading
+
+    def column(self, chunk, name):
+        """One column of one chunk, memory-mapped."""
+        return np.load(os.path.join(self.directory, f"{chunk['name']}.{name}.npy"), mmap_mode="r")
+
+    def rows(self, chunk, index=None):
+        """Rows of a chunk (all, or a boolean mask / index array) as a ROW_DTYPE array."""
+        count = chunk["rows"] if index is None else int(np.count_nonzero(index) if index.dtype == bool
+                                                        else len(index))
+        out = np.empty(count, dtype=ROW_DTYPE)
+        for column in COLUMNS:
+            values = self.column(chunk, column)
+            out[column] = values if index is None else values[index]
+        return out
+
+    def scan(self, columns, where=None, games=None):
+        """
+        Yield (chunk, {column: array}) for every chunk, with the arrays already filtered.
+        where(cols) returns a boolean mask over the chunk; games=(first, last) skips chunks
+        outside that game range without opening them.
+        """
+        for chunk in self.chunks:
+            if games and (chunk["game_max"] < games[0] or chunk["game_min"] > games[1]):
+                continue
+            cols = {name: self.column(chunk, name) for name in columns}
+            if where is not None:
+                mask = where(cols)
+                cols = {name: values[mask] for name, values in cols.items()}
+            yield chunk, cols
+
+    def select(self, where=None, games=None):
+        """All matching rows as one ROW_DTYPE array; where() sees every column lazily via memory maps."""
+        parts = []
+        for chunk in self.chunks:
+            if games and (chunk["game_max"] < games[0] or chunk["game_min"] > games[1]):
+                continue
+            if where is None:
+                parts.append(self.rows(chunk))
+                continue
+            mask = where(_LazyColumns(self, chunk))
+            if mask.any():
+                parts.append(self.rows(chunk, mask))
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=ROW_DTYPE)
+
+    def game(self, game_id):
+        """Every row of one game, in ply order."""
+        rows = self.select(lambda cols: cols["game"] == game_id, games=(game_id, game_id))
+        return rows[np.argsort(rows["ply"], kind="stable")]
+
+    def swings(self, threshold):
+        """Rows whose score differs by at least `threshold` from the previous ply of the same game."""
+        parts = []
+        previous = (-1, 0, 0)  # (game, ply, score) of the last row of the previous chunk
+        for chunk in self.chunks:
+            game = self.column(chunk, "game").astype(np.int64)
+            ply = self.column(chunk, "ply").astype(np.int64)
+            score = self.column(chunk, "score").astype(np.int32)
+            prev_game = np.concatenate(([previous[0]], game[:-1]))
+            prev_ply = np.concatenate(([previous[1]], ply[:-1]))
+            prev_score = np.concatenate(([previous[2]], score[:-1]))
+            mask = (game == prev_game) & (ply == prev_ply + 1) & (np.abs(score - prev_score) >= threshold)
+            if mask.any():
+                rows = self.rows(chunk, mask)
+                swing = (score - prev_score)[mask]
+                parts.append((rows, swing))
+            if len(game):
+                previous = (int(game[-1]), int(ply[-1]), int(score[-1]))
+        if not parts:
+            return np.zeros(0, dtype=ROW_DTYPE), np.zeros(0, dtype=np.int32)
+        return np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
+
+    def export_csv(self, path, rows=None):
+        """Write rows (default: the whole store, chunk by chunk) as CSV with UCI moves."""
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(CSV_FIELDS)
+            batches = [rows] if rows is not None else (self.rows(chunk) for chunk in self.chunks)
+            count = 0
+            for batch in batches:
+                for row in batch:
+                    writer.writerow(format_row(row))
+                count += len(batch)
+        return count
+
+
+class _LazyColumns:
+    """Mapping that opens a chunk's column files only when a where() predicate asks for them."""
+
+    def __init__(self, store, chunk):
+        self.store = store
+        self.chunk = chunk
+
+    def __getitem__(self, name):
+        return self.store.column(self.chunk, name)
+
+
+def format_row(row):
+    """CSV values of one row: moves as UCI, the PV space separated."""
+    move = unpack_move(row["move"]).uci() if row["move"] else ""
+    pv = " ".join(unpack_move(m).uci() for m in row["pv"][:row["pv_len"]])
+    return [int(row["key"]), int(row["game"]), int(row["ply"]), int(row["depth"]), int(row["score"]), move, pv]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query and export a columnar analysis store.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    info = sub.add_parser("info", help="Rows, chunks and size on disk")
+    info.add_argument("store")
+    swings = sub.add_parser("swings", help="Plies where the score jumped by at least --threshold")
+    swings.add_argument("store")
+    swings.add_argument("--threshold", type=int, default=200, help="Centipawns")
+    swings.add_argument("--csv", help="Write the rows to this CSV file instead of printing them")
+    game = sub.add_parser("game", help="All rows of one game")
+    game.add_argument("store")
+    game.add_argument("game", type=int)
+    export = sub.add_parser("export", help="Whole store to CSV")
+    export.add_argument("store")
+    export.add_argument("csv")
+    args = parser.parse_args(argv)
+
+    store = AnalysisStore(args.store)
+    start = time.perf_counter()
+    if args.command == "info":
+        size = sum(os.path.getsize(os.path.join(args.store, name)) for name in os.listdir(args.store))
+        print(f"{len(store)} rows in {len(store.chunks)} chunks, {size / 1e6:.1f} MB "
+              f"({size / max(1, len(store)):.1f} bytes/row)")
+        return 0
+    if args.command == "export":
+        count = store.export_csv(args.csv)
+        print(f"{count} rows written to {args.csv} in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+        return 0
+
+    if args.command == "swings":
+        rows, deltas = store.swings(args.threshold)
+    else:
+        rows, deltas = store.game(args.game), None
+    elapsed = time.perf_counter() - start
+    if getattr(args, "csv", None):
+        store.export_csv(args.csv, rows)
+    else:
+        for i, row in enumerate(rows):
+            values = format_row(row)
+            swing = f"  swing {int(deltas[i]):+d}" if deltas is not None else ""
+            print(f"game {values[1]:>8} ply {values[2]:>4} depth {values[3]:>3} score {values[4]:>6} "
+                  f"best {values[5]:<6}{swing}  {values[6]}")
+    print(f"{len(rows)} rows in {elapsed:.2f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
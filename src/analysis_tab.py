@@ -0,0 +1,112 @@
+import customtkinter as ctk
+import chess
+
+from src.game_state import GameState
+from src.board_ui import BoardUI
+from src.engine import format_score
+
+
+class AnalysisTab(ctk.CTkFrame):
+    """
+    One analysis board: its own game and number of lines, analysed through the shared scheduler.
+    Moves are free for both sides; every new position is submitted under this tab's name.
+    """
+
+    def __init__(self, master, name, scheduler, fen=None, find_similar=None, on_close=None, **kwargs):
+        super().__init__(master, fg_color="transparent", **kwargs)
+        self.name = name
+        self.scheduler = scheduler
+        self.game_state = GameState()
+        if fen:
+            self.game_state.set_fen(fen)
+
+        self.grid_rowconfigure(1, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+
+        controls = ctk.CTkFrame(self, fg_color="transparent")
+        controls.grid(row=0, column=0, pady=(5, 0), sticky="ew")
+        self.fen_entry = ctk.CTkEntry(controls, placeholder_text="Paste a FEN", width=360)
+        self.fen_entry.pack(side="left", padx=(20, 5))
+        ctk.CTkButton(controls, text="Load FEN", width=80, command=self.load_fen).pack(side="left", padx=5)
+        ctk.CTkButton(controls, text="Undo", width=60, command=self.undo).pack(side="left", padx=5)
+        ctk.CTkButton(controls, text="⟳ Flip", width=60, command=self.flip).pack(side="left", padx=5)
+        if find_similar:
+            ctk.CTkButton(controls, text="Similar", width=70,
+                          command=lambda: find_similar(self)).pack(side="left", padx=5)
+
+        if on_close:
+            ctk.CTkButton(controls, text="✕ Close", width=70, fg_color="gray30", hover_color="gray40",
+                          command=lambda: on_close(self)).pack(side="left", padx=5)
+
+        self.lines_var = ctk.StringVar(value="3")
+        ctk.CTkOptionMenu(controls, variable=self.lines_var, values=["1", "2", "3", "5"], width=60,
+                          command=lambda value: self.request_analysis()).pack(side="right", padx=(5, 20))
+        ctk.CTkLabel(controls, text="Lines:").pack(side="right")
+
+        self.board_ui = BoardUI(self, self.game_state)
+        self.board_ui.grid(row=1, column=0, padx=20, pady=10, sticky="nsew")
+
+        self.score_label = ctk.CTkLabel(self, text="Waiting for engine...", font=("Arial", 12))
+        self.score_label.grid(row=2, column=0, pady=(0, 10))
+
+        # Moves made on this board reach ChessApp.on_move_made, which calls request_analysis()
+        self.request_analysis()
+
+    def request_analysis(self):
+        fen = self.game_state.get_fen()
+        self.board_ui.last_analysis_moves = []
+        self.board_ui.canvas.delete("arrow")
+        if not self.game_state.is_valid():
+            self.scheduler.cancel(self.name)
+            self.score_label.configure(text="Invalid position: " + "; ".join(self.game_state.position_errors()))
+            return
+        if self.game_state.is_game_over():
+            self.scheduler.cancel(self.name)
+            self.score_label.configure(text=f"Game over: {self.game_state.board.result(claim_draw=True)}")
+            return
+
+        def _deliver(lines, depth):
+            self.after(0, lambda: self.display_analysis(fen, lines, depth))
+
+        self.scheduler.submit(self.name, fen, int(self.lines_var.get()), _deliver)
+
+    def display_analysis(self, fen, lines, depth):
+        if not self.winfo_exists() or fen != self.game_state.get_fen():
+            return  # the position changed while this result was on its way
+        self.board_ui.display_analysis(lines)
+        board = chess.Board(fen)
+        text = "  |  ".join(f"{board.san(line['move'])} {format_score(line['score'])}" for line in lines)
+        self.score_label.configure(text=f"depth {depth}:  {text}")
+
+    def load_fen(self):
+        fen = self.fen_entry.get().strip()
+        try:
+            self.game_state.set_fen(fen)
+        except ValueError:
+            self.score_label.configure(text="Invalid FEN")
+            return
+        self.board_ui.selected_square = None
+        self.board_ui.draw_board()
+        self.request_analysis()
+
+    def open_board(self, board):
+        """Replace this tab's game with `board` (including its move stack)."""
+        self.game_state.board = board
+        self.game_state.changed()
+        self.board_ui.selected_square = None
+        self.board_ui.draw_board()
+        self.request_analysis()
+
+    def undo(self):
+        if self.game_state.board.move_stack:
+            self.game_state.pop()
+            self.board_ui.draw_board()
+            self.request_analysis()
+
+    def flip(self):
+        self.board_ui.flipped = not self.board_ui.flipped
+        self.board_ui.draw_board()
+
+    def destroy(self):
+        self.scheduler.cancel(self.name)
+        super().destroy()
@@ -0,0 +1,222 @@
+"""
+Headless batch digitization: turn folders of board images into FEN/EPD.
+
+Usage:
+    python -m src.batch_vision scans/ --calibration start.png --out results.jsonl
+    python -m src.batch_vision "book/*.png" --templates pieces.npz --out results.epd --workers 8
+    python -m src.batch_vision photos/ --calibration start.jpg --auto-locate
+    python -m src.batch_vision archive/ --out results.jsonl   # piece set picked per image from the library
+    python -m src.batch_vision scans/ --classifier models/square_classifier.npz
+
+Images are classified across a process pool. Only a small window of images is
+in flight at any time and results are written as soon as they arrive (in input
+order), so memory stays flat no matter how large the folder is.
+"""
+import argparse
+import collections
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import chess
+import cv2
+
+from src.board_locator import BoardLocator
+from src.square_classifier import DEFAULT_MODEL_PATH
+from src.template_library import DEFAULT_LIBRARY_DIR, TemplateLibrary, resolve_templates
+from src.vision import VisionHandler
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".gif", ".tif", ".tiff", ".webp")
+
+# Per-process handlers, set up once by the pool initializer
+_worker_vision = None
+_worker_locator = None
+_worker_library = None
+
+
+def iter_image_paths(inputs):
+    """Yield image paths from directories, glob patterns or plain files, lazily."""
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, dirs, files in os.walk(item):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.lower().endswith(IMAGE_EXTENSIONS):
+                        yield os.path.join(root, name)
+        elif os.path.isfile(item):
+            yield item
+        else:
+            for path in glob.iglob(item, recursive=True):
+                if os.path.isfile(path) and path.lower().endswith(IMAGE_EXTENSIONS):
+                    yield path
+
+
+def build_templates(calibration=None, templates=None, auto_locate=False, library_dir=None):
+    """
+    Calibrate once in the parent process; workers only receive the templates.
+    `templates` may be a .npz path or a piece set name from the library in `library_dir`.
+    """
+    vision = VisionHandler()
+    if templates:
+        vision.templates = resolve_templates(templates, TemplateLibrary(library_dir or DEFAULT_LIBRARY_DIR))
+    elif calibration:
+        image = cv2.imread(calibration)
+        if image is None:
+            raise ValueError(f"Could not read calibration image {calibration}")
+        if auto_locate:
+            image = BoardLocator().extract_board(image)
+            if image is None:
+                raise ValueError(f"No board found in calibration image {calibration}")
+        vision.calibrate(image)
+    else:
+        raise ValueError("Either a calibration image or a template file is required")
+    return vision.templates
+
+
+def _init_worker(templates, auto_locate=False, library_dir=None, classifier_path=None):
+    global _worker_vision, _worker_locator, _worker_library
+    # One OpenCV thread per process; the pool already provides the parallelism
+    cv2.setNumThreads(1)
+    _worker_vision = VisionHandler()
+    if classifier_path is not None:
+        _worker_vision.use_classifier(classifier_path)
+    elif templates is not None:
+        _worker_vision.templates = templates
+        _worker_vision.is_calibrated = True
+    else:
+        # No templates given: choose a piece set from the library for every image
+        _worker_library = TemplateLibrary(library_dir or DEFAULT_LIBRARY_DIR)
+        _worker_library.load_all()
+    _worker_locator = BoardLocator() if auto_locate else None
+
+
+def digitize_image(path):
+    """Classify one image. Runs inside a pool worker."""
+    start = time.perf_counter()
+    image = cv2.imread(path)
+    if image is None:
+        return {"path": path, "fen": None, "confidence": 0.0, "error": "unreadable image"}
+    if _worker_locator is not None:
+        # Pages from one folder usually share a layout, so the folder is the cache key
+        image = _worker_locator.extract_board(image, source_key=os.path.dirname(path))
+        if image is None:
+            return {"path": path, "fen": None, "confidence": 0.0, "error": "no board found"}
+    piece_set = None
+    if _worker_library is not None:
+        piece_set = _worker_vision.auto_select_piece_set(image, _worker_library)
+        if piece_set is None:
+            return {"path": path, "fen": None, "confidence": 0.0, "error": "template library is empty"}
+    try:
+        fen, confidence = _worker_vision.get_fen_with_confidence(image)
+    except Exception as e:
+        return {"path": path, "fen": None, "confidence": 0.0, "error": repr(e)}
+    record = {
+        "path": path,
+        "fen": fen,
+        "confidence": round(float(confidence), 4),
+        "seconds": round(time.perf_counter() - start, 4),
+    }
+    if piece_set is not None:
+        record["piece_set"] = piece_set
+    return record
+
+
+def format_record(record, fmt):
+    if fmt == "jsonl":
+        return json.dumps(record)
+    # EPD: position plus the source file and confidence as comment operations
+    if not record.get("fen"):
+        # Keep failures visible; EPD readers (src/epd_runner.py) skip '#' lines
+        return f"# {record['path']}: {record.get('error', 'no position recognised')}"
+    board = chess.Board(record["fen"])
+    return board.epd(c0=record["path"], c1=str(record["confidence"]))
+
+
+def run_batch(paths, templates, out, fmt="jsonl", workers=None, window=None, min_confidence=None,
+              auto_locate=False, library_dir=None, classifier_path=None):
+    """
+    Digitize `paths` with a process pool and stream formatted results to `out`.
+    With templates=None each image is matched against the best piece set in the library,
+    unless classifier_path points to a trained SquareClassifier.
+    Returns (processed, failed, low_confidence) counts.
+    """
+    workers = workers or os.cpu_count() or 1
+    window = window or workers * 4
+    processed = failed = low_confidence = 0
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(templates, auto_locate, library_dir, classifier_path)) as pool:
+        in_flight = collections.deque()
+        paths = iter(paths)
+
+        def refill():
+            while len(in_flight) < window:
+                path = next(paths, None)
+                if path is None:
+                    return
+                in_flight.append(pool.submit(digitize_image, path))
+
+        refill()
+        while in_flight:
+            record = in_flight.popleft().result()
+            refill()
+
+            processed += 1
+            if record.get("error"):
+                failed += 1
+            elif min_confidence is not None and record["confidence"] < min_confidence:
+                low_confidence += 1
+                record["low_confidence"] = True
+
+            out.write(format_record(record, fmt) + "\n")
+            out.flush()
+
+    return processed, failed, low_confidence
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Digitize board images into FEN/EPD.")
+    parser.add_argument("inputs", nargs="+", help="Image files, directories or glob patterns")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--calibration", help="Image of the starting position in the same piece set")
+    source.add_argument("--templates", help="Template .npz file or piece set name (default: auto-select per image)")
+    source.add_argument("--classifier", nargs="?", const=DEFAULT_MODEL_PATH,
+                        help="Use the learned square classifier (optionally a weight file path)")
+    parser.add_argument("--library", default=DEFAULT_LIBRARY_DIR, help="Piece set library directory")
+    parser.add_argument("--out", default="-", help="Output file (.jsonl or .epd), '-' for stdout")
+    parser.add_argument("--format", choices=["jsonl", "epd"], help="Output format (default: from --out extension)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--min-confidence", type=float, default=None, help="Flag results below this confidence")
+    parser.add_argument("--auto-locate", action="store_true", help="Find and rectify the board in each image")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ("epd" if args.out.lower().endswith(".epd") else "jsonl")
+    templates = None
+    if args.calibration or args.templates:
+        templates = build_templates(args.calibration, args.templates, args.auto_locate, args.library)
+    elif not args.classifier and not TemplateLibrary(args.library).list_sets():
+        parser.error(f"No calibration or templates given and the library at {args.library} is empty")
+
+    out = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8")
+    start = time.perf_counter()
+    try:
+        processed, failed, low = run_batch(iter_image_paths(args.inputs), templates, out, fmt=fmt,
+                                           workers=args.workers, min_confidence=args.min_confidence,
+                                           auto_locate=args.auto_locate, library_dir=args.library,
+                                           classifier_path=args.classifier)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    elapsed = time.perf_counter() - start
+    rate = processed / elapsed if elapsed > 0 else 0.0
+    print(f"Processed {processed} images in {elapsed:.1f}s ({rate:.1f} img/s), "
+          f"{failed} failed, {low} low confidence.", file=sys.stderr)
+    return 0 if failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+import cv2
+import numpy as np
+
+from src.metrics import registry
+
+
+class BoardLocator:
+    """
+    Find the chess board in a full image and rectify it.
+
+    Detection runs on a downscaled copy (contour quads, then the inner 7x7
+    checkerboard corners as a fallback); the winning quad is snapped onto the
+    grid lines there and only the last sub-pixel steps run at full resolution. Geometry is cached per source, so frames or pages from the
+    same source only pay for a cheap verification.
+    """
+
+    def __init__(self, work_size=480, min_checker_score=1.5):
+        self.work_size = work_size
+        self.min_checker_score = min_checker_score
+        self.cache = {}  # source_key -> corners (4x2 float32, TL TR BR BL, full resolution)
+
+    def extract_board(self, image, source_key=None, square_size=None):
+        """
+        Return the rectified board image, cropped exactly to the board edges, or None.
+        The result is what VisionHandler.split_board expects.
+        """
+        corners = self.locate(image, source_key)
+        if corners is None:
+            return None
+        return self.warp(image, corners, square_size)
+
+    def locate(self, image, source_key=None):
+        """Return board corners (TL, TR, BR, BL) in image coordinates, or None."""
+        if source_key is not None and source_key in self.cache:
+            corners = self.cache[source_key]
+            if self.checker_score(image, corners) >= self.min_checker_score:
+                registry.counter("board_locator_cache_hits_total", "Cached board geometry reused").inc()
+                return corners
+            # The source moved or changed layout: detect again
+            del self.cache[source_key]
+
+        registry.counter("board_locator_cache_misses_total", "Full board detections").inc()
+
+        corners = self.detect(image)
+        if corners is not None and source_key is not None:
+            self.cache[source_key] = corners
+        return corners
+
+    def detect(self, image):
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+        h, w = gray.shape
+        scale = min(1.0, self.work_size / float(max(h, w)))
+        small = cv2.resize(gray, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA) if scale < 1.0 else gray
+
+        # Candidates must look like a checkerboard; the best aligned one wins
+        best, best_score = None, 0.0
+        for quad in self._contour_candidates(small) + self._checkerboard_candidates(small):
+            if self.checker_score(small, quad) < self.min_checker_score:
+                continue
+            score = self.grid_score(small, quad)
+            if score > best_score:
+                best, best_score = quad, score
+
+        if best is None:
+            return None
+        # Coarse fit on the small image, then a fine pass at full resolution
+        best = self._refine(small, best, min_step=1.0)
+        return self._refine(gray, best / scale, min_step=0.5 / scale)
+
+    def _contour_candidates(self, gray):
+        """
+        Large, roughly square convex quadrilaterals in the edge map.
+        The board's outline can be faint against the background, but the edges between
+        its squares are dense, so the edge map is also closed at a few scales to merge
+        the whole grid into one blob whose hull is the board.
+        """
+        edges = cv2.Canny(cv2.GaussianBlur(gray, (5, 5), 0), 30, 90)
+        min_area = 0.04 * gray.shape[0] * gray.shape[1]
+        side = min(gray.shape)
+
+        quads = []
+        for k in (3, side // 40, side // 20):
+            k = max(3, int(k))
+            closed = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, np.ones((k, k), np.uint8))
+            contours, _ = cv2.findContours(closed, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+            for contour in sorted(contours, key=cv2.contourArea, reverse=True)[:10]:
+                if cv2.contourArea(contour) < min_area:
+                    break
+                quad = _approx_quad(contour)
+                if quad is not None and _is_roughly_square(quad):
+                    quads.append(quad)
+        return quads
+
+    def _checkerboard_candidates(self, gray):
+        """Extrapolate the outer board corners from the 7x7 inner grid corners."""
+        found, inner = cv2.findChessboardCorners(
+            gray, (7, 7), flags=cv2.CALIB_CB_ADAPTIVE_THRESH | cv2.CALIB_CB_NORMALIZE_IMAGE)
+        if not found:
+            return []
+        ideal = np.array([[x, y] for y in range(1, 8) for x in range(1, 8)], dtype=np.float32)
+        homography, _ = cv2.findHomography(ideal, inner.reshape(-1, 2))
+        if homography is None:
+            return []
+        outer = np.array([[[0, 0], [8, 0], [8, 8], [0, 8]]], dtype=np.float32)
+        quad = order_corners(cv2.perspectiveTransform(outer, homography).reshape(4, 2))
+        return [quad]
+
+    def _refine(self, gray, corners, min_step=0.5):
+        """
+        Snap the corners onto the grid lines by coordinate descent on grid_score.
+        Each evaluation only warps a small patch, so this is cheap at any resolution.
+        """
+        corners = corners.astype(np.float32).copy()
+        best = self.grid_score(gray, corners)
+        step = np.linalg.norm(corners[1] - corners[0]) / 32.0
+        while step >= min_step:
+            improved = True
+            while improved:
+                improved = False
+                for i in range(4):
+                    for axis in (0, 1):
+                        for sign in (1, -1):
+                            trial = corners.copy()
+                            trial[i, axis] += sign * step
+                            score = self.grid_score(gray, trial)
+                            if score > best:
+                                best, corners, improved = score, trial, True
+            step /= 2.0
+        return corners
+
+    def warp(self, image, corners, square_size=None):
+        """Perspective-correct the board to a square image whose side is a multiple of 8."""
+        if square_size is None:
+            side = max(np.linalg.norm(corners[1] - corners[0]), np.linalg.norm(corners[3] - corners[0]))
+            square_size = max(8, int(round(side / 8)))
+        size = 8 * square_size
+        target = np.array([[0, 0], [size, 0], [size, size], [0, size]], dtype=np.float32)
+        matrix = cv2.getPerspectiveTransform(corners.astype(np.float32), target)
+        return cv2.warpPerspective(image, matrix, (size, size), flags=cv2.INTER_LINEAR)
+
+    def checker_score(self, image, corners):
+        """
+        How much the region inside `corners` looks like an 8x8 checkerboard.
+        Compares the light and dark square colours using only each square's border
+        ring, which pieces rarely cover.
+        """
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+        board = self.warp(gray, corners, square_size=12).astype(np.float32)
+        cells = board.reshape(8, 12, 8, 12).transpose(0, 2, 1, 3)
+        ring = np.concatenate([cells[:, :, 1, 1:-1], cells[:, :, -2, 1:-1],
+                               cells[:, :, 1:-1, 1], cells[:, :, 1:-1, -2]], axis=2)
+        levels = np.median(ring, axis=2)
+
+        parity = (np.add.outer(np.arange(8), np.arange(8)) % 2).astype(bool)
+        light, dark = levels[~parity], levels[parity]
+        spread = np.median(np.abs(light - np.median(light))) + np.median(np.abs(dark - np.median(dark)))
+        return abs(np.median(light) - np.median(dark)) / (spread + 4.0)
+
+    def grid_score(self, gray, corners, cell=12):
+        """
+        Edge strength along the 9 expected horizontal and vertical grid lines, relative
+        to the edge strength inside the squares. The board is warped with one square
+        of margin so the outer border lines are included.
+        """
+        size = 10 * cell
+        target = np.array([[cell, cell], [9 * cell, cell], [9 * cell, 9 * cell], [cell, 9 * cell]], dtype=np.float32)
+        matrix = cv2.getPerspectiveTransform(corners.astype(np.float32), target)
+        board = cv2.warpPerspective(gray, matrix, (size, size), flags=cv2.INTER_LINEAR).astype(np.float32)
+
+        gx = np.abs(np.diff(board, axis=1))[cell:9 * cell]
+        gy = np.abs(np.diff(board, axis=0))[:, cell:9 * cell]
+        lines = [cell * i - 1 for i in range(1, 10)]
+        on_grid = gx[:, lines].mean() + gy[lines, :].mean()
+        overall = gx[:, cell:9 * cell].mean() + gy[cell:9 * cell, :].mean()
+        return on_grid / (overall + 1.0)
+
+
+def order_corners(points):
+    """Order four points as top-left, top-right, bottom-right, bottom-left."""
+    points = np.asarray(points, dtype=np.float32)
+    s = points.sum(axis=1)
+    d = np.diff(points, axis=1).ravel()
+    return np.array([points[np.argmin(s)], points[np.argmin(d)],
+                     points[np.argmax(s)], points[np.argmax(d)]], dtype=np.float32)
+
+
+def _approx_quad(contour):
+    """Simplify a contour's hull to four corners, loosening the tolerance as needed."""
+    hull = cv2.convexHull(contour)
+    perimeter = cv2.arcLength(hull, True)
+    for epsilon in (0.02, 0.04, 0.06, 0.08):
+        approx = cv2.approxPolyDP(hull, epsilon * perimeter, True)
+        if len(approx) == 4:
+            return order_corners(approx.reshape(4, 2))
+        if len(approx) < 4:
+            break
+    return None
+
+
+def _is_roughly_square(quad, max_ratio=1.6):
+    sides = [np.linalg.norm(quad[i] - quad[(i + 1) % 4]) for i in range(4)]
+    return min(sides) > 0 and max(sides) / min(sides) <= max_ratio
@@ -1,6 +1,10 @@
+import time
+
 import customtkinter as ctk
 import chess
 
+from src.metrics import registry
+
 class BoardUI(ctk.CTkFrame):
     def __init__(self, master, game_state, **kwargs):
         super().__init__(master, **kwargs)
@@ -15,8 +19,14 @@ class BoardUI(ctk.CTkFrame):
         self.edit_mode = False
         self.selected_edit_piece = None  # Piece to place in edit mode (None = Delete)
         self.last_analysis_moves = [] # cache for redrawing arrows
+        self.last_threat_moves = []  # opponent's best replies if it were their turn
+        self.show_move_hints = True  # dots on the selected piece's legal destinations
+        self.drag_from = None  # square of the piece being dragged
+        self.dragging = False
         
         self.canvas.bind("<Button-1>", self.on_click)
+        self.canvas.bind("<B1-Motion>", self.on_drag)
+        self.canvas.bind("<ButtonRelease-1>", self.on_release)
         self.canvas.bind("<Configure>", self.on_resize)
         
     def on_resize(self, event):
@@ -46,6 +56,7 @@ class BoardUI(ctk.CTkFrame):
         return chess.square(file, rank)
 
     def draw_board(self):
+        start = time.perf_counter()
         self.canvas.delete("all")
         colors = ["#EBECD0", "#779556"]  # Light, Dark squares
         
@@ -80,12 +91,15 @@ class BoardUI(ctk.CTkFrame):
         if self.game_state.board.is_check():
             self.highlight_king_check()
             
-        if self.selected_square is not None:
-             self.highlight_square(self.selected_square)
+        self.draw_selection()
 
         # Redraw arrows if they exist
         if self.last_analysis_moves:
              self.display_analysis(self.last_analysis_moves, cache=False)
+        if self.last_threat_moves:
+             self.display_threats(self.last_threat_moves, cache=False)
+
+        registry.histogram("ui_draw_board_seconds", "BoardUI.draw_board render time").record(time.perf_counter() - start)
 
     def draw_piece(self, x, y, piece):
         symbol = piece.unicode_symbol()
@@ -136,61 +150,111 @@ class BoardUI(ctk.CTkFrame):
         x2 = x1 + self.square_size
         y2 = y1 + self.square_size
         
-        self.canvas.create_rectangle(x1, y1, x2, y2, fill="yellow", stipple="gray50", outline="gold", width=2)
+        self.canvas.create_rectangle(x1, y1, x2, y2, fill="yellow", stipple="gray50", outline="gold", width=2,
+                                     tag="selection")
 
-    def on_click(self, event):
-        # Adjust for offset
-        adj_x = event.x - getattr(self, 'offset_x', 0)
-        adj_y = event.y - getattr(self, 'offset_y', 0)
-        
-        if adj_x < 0 or adj_y < 0:
+    def draw_selection(self):
+        """(Re)draw only the selection highlight and its move hints, without repainting the board."""
+        self.canvas.delete("selection")
+        self.canvas.delete("hint")
+        if self.selected_square is None:
             return
-            
+        self.highlight_square(self.selected_square)
+        if not self.show_move_hints or self.edit_mode:
+            return
+        for to_square in self.game_state.destinations(self.selected_square):
+            visual_file, visual_rank = self.get_visual_coords(chess.square_file(to_square),
+                                                              chess.square_rank(to_square))
+            cx = self.offset_x + (visual_file + 0.5) * self.square_size
+            cy = self.offset_y + (visual_rank + 0.5) * self.square_size
+            if self.game_state.board.piece_at(to_square):
+                # Capture: ring around the target piece
+                r = self.square_size * 0.46
+                self.canvas.create_oval(cx - r, cy - r, cx + r, cy + r, outline="#1f1f1f",
+                                        width=max(2, self.square_size // 12), tag="hint")
+            else:
+                r = self.square_size * 0.15
+                self.canvas.create_oval(cx - r, cy - r, cx + r, cy + r, fill="#1f1f1f", outline="",
+                                        stipple="gray50", tag="hint")
+
+    def select(self, square):
+        self.selected_square = square
+        self.draw_selection()
+
+    def square_at(self, x, y):
+        """Chess square under canvas coordinates, or None outside the board."""
+        adj_x = x - getattr(self, 'offset_x', 0)
+        adj_y = y - getattr(self, 'offset_y', 0)
+        if adj_x < 0 or adj_y < 0:
+            return None
         visual_file = int(adj_x // self.square_size)
         visual_rank = int(adj_y // self.square_size)
-        
-        if visual_file < 0 or visual_file > 7 or visual_rank < 0 or visual_rank > 7:
+        if visual_file > 7 or visual_rank > 7:
+            return None
+        return self.get_chess_square_from_visual(visual_file, visual_rank)
+
+    def try_move(self, from_square, to_square):
+        """Play from -> to if legal (auto-queening); True if a move was made."""
+        move = self.game_state.find_move(from_square, to_square)
+        if move is None:
+            return False
+        self.game_state.push(move)
+        self.selected_square = None
+        self.draw_board()
+        self.master.event_generate("<<MoveMade>>")
+        return True
+
+    def on_click(self, event):
+        chess_square = self.square_at(event.x, event.y)
+        self.drag_from = None
+        self.dragging = False
+        if chess_square is None:
             return
         
-        chess_square = self.get_chess_square_from_visual(visual_file, visual_rank)
-        
         if self.edit_mode:
             # Edit Mode Logic
+            if self.game_state.board.piece_at(chess_square) == self.selected_edit_piece:
+                return
             self.game_state.set_piece(chess_square, self.selected_edit_piece)
             self.draw_board()
+            self.master.event_generate("<<PositionEdited>>")
             return
 
-        # Normal Play Logic
-        if self.selected_square is None:
-            piece = self.game_state.board.piece_at(chess_square)
-            if piece and piece.color == self.game_state.board.turn:
-                self.selected_square = chess_square
-                self.draw_board()
+        # Normal Play Logic: legality comes from the per-position move map, no move generation per click
+        if self.selected_square is not None and self.try_move(self.selected_square, chess_square):
+            return
+        piece = self.game_state.board.piece_at(chess_square)
+        if piece and piece.color == self.game_state.board.turn:
+            self.select(chess_square)
+            self.drag_from = chess_square
         else:
-            # Try to move
-            move = chess.Move(self.selected_square, chess_square)
-            # Check for promotion
-            piece_at_start = self.game_state.board.piece_at(self.selected_square)
-            if piece_at_start and piece_at_start.piece_type == chess.PAWN:
-                if (self.game_state.board.turn == chess.WHITE and chess.square_rank(chess_square) == 7) or \
-                   (self.game_state.board.turn == chess.BLACK and chess.square_rank(chess_square) == 0):
-                    move = chess.Move(self.selected_square, chess_square, promotion=chess.QUEEN)
-
-            if move in self.game_state.board.legal_moves:
-                self.game_state.board.push(move)
-                self.selected_square = None
-                self.draw_board()
-                self.master.event_generate("<<MoveMade>>")
-            else:
-                piece = self.game_state.board.piece_at(chess_square)
-                if piece and piece.color == self.game_state.board.turn:
-                    self.selected_square = chess_square
-                    self.draw_board()
-                else:
-                    self.selected_square = None
-                    self.draw_board()
-
-    def draw_arrow(self, start_sq, end_sq, color="#00FF00", width=4):
+            self.select(None)
+
+    def on_drag(self, event):
+        """Carry the pressed piece with the cursor."""
+        if self.drag_from is None:
+            return
+        piece = self.game_state.board.piece_at(self.drag_from)
+        if piece is None:
+            return
+        self.dragging = True
+        self.canvas.delete("drag")
+        font_size = int(self.square_size * 0.7)
+        self.canvas.create_text(event.x, event.y, text=piece.unicode_symbol(),
+                                font=("Segoe UI Symbol", font_size, "bold"),
+                                fill="#1a1a1a" if piece.color == chess.BLACK else "#ffffff", tag="drag")
+
+    def on_release(self, event):
+        """Drop a dragged piece: move if legal, otherwise it stays selected for a click-move."""
+        if not self.dragging:
+            return
+        from_square, self.drag_from, self.dragging = self.drag_from, None, False
+        self.canvas.delete("drag")
+        to_square = self.square_at(event.x, event.y)
+        if to_square is not None and to_square != from_square:
+            self.try_move(from_square, to_square)
+
+    def draw_arrow(self, start_sq, end_sq, color="#00FF00", width=4, tag="arrow", dash=None):
         # Get visual coordinates for arrow
         start_file = chess.square_file(start_sq)
         start_rank = chess.square_rank(start_sq)
@@ -205,7 +269,8 @@ class BoardUI(ctk.CTkFrame):
         x2 = self.offset_x + end_vf * self.square_size + self.square_size // 2
         y2 = self.offset_y + end_vr * self.square_size + self.square_size // 2
         
-        self.canvas.create_line(x1, y1, x2, y2, fill=color, width=width, arrow="last", arrowshape=(16, 20, 6), tag="arrow")
+        self.canvas.create_line(x1, y1, x2, y2, fill=color, width=width, arrow="last", arrowshape=(16, 20, 6),
+                                tag=tag, dash=dash)
 
     def display_analysis(self, top_moves, cache=True):
         if cache:
@@ -213,10 +278,21 @@ class BoardUI(ctk.CTkFrame):
              
         self.canvas.delete("arrow")
         
-        colors = ["#00FF00", "#00FFFF", "#FFFF00"]
+        colors = ["#00FF00", "#00FFFF", "#FFFF00", "#FF9900", "#FF00FF"]
         
         for i, move_data in enumerate(top_moves):
             if i >= len(colors):
                 break
             move = move_data["move"]
-            self.draw_arrow(move.from_square, move.to_square, color=colors[i], width=6 - i)
+            self.draw_arrow(move.from_square, move.to_square, color=colors[i], width=max(2, 6 - i))
+
+    def display_threats(self, threat_moves, cache=True):
+        """Dashed red arrows for what the opponent would play if it were their move."""
+        if cache:
+             self.last_threat_moves = threat_moves
+
+        self.canvas.delete("threat")
+
+        for i, move_data in enumerate(threat_moves[:2]):
+            move = move_data["move"]
+            self.draw_arrow(move.from_square, move.to_square, color="#FF4040", width=4 - i, tag="threat", dash=(6, 4))
@@ -0,0 +1,136 @@
+import threading
+
+import customtkinter as ctk
+
+from src.cpu_budget import BACKGROUND
+from src.engine_compare import EngineComparison, format_comparison, load_engine_configs
+
+
+class ComparePanel(ctk.CTkToplevel):
+    """Window analysing the main board with every configured engine side by side."""
+
+    REFRESH_MS = 500
+    # Cores left to the main window's own engines (best moves and threats)
+    RESERVED_CORES = 2
+
+    def __init__(self, master, game_state, config_path="engines.json"):
+        super().__init__(master)
+        self.title("Compare Engines")
+        self.geometry("860x380")
+        self.game_state = game_state
+        self.version = None
+        self.fen = None
+        self.note = None  # why the position is not analysed (game over, invalid)
+        self.comparison = None
+        self.pending = None  # comparison whose engines are still starting
+        self.request = None  # latest (comparison, fen) not yet handed to the engines; fen None clears
+        self.applying = False  # a worker thread is handing requests to the engines
+        self.closed = False
+        self._lock = threading.Lock()
+
+        self.textbox = ctk.CTkTextbox(self, font=("Courier New", 12), wrap="none")
+        self.textbox.pack(fill="both", expand=True, padx=10, pady=(10, 5))
+
+        controls = ctk.CTkFrame(self, fg_color="transparent")
+        controls.pack(fill="x", padx=10, pady=(0, 10))
+        ctk.CTkLabel(controls, text="Lines:").pack(side="left")
+        self.lines_var = ctk.StringVar(value="1")
+        ctk.CTkOptionMenu(controls, variable=self.lines_var, values=["1", "2", "3"], width=60,
+                          command=self.on_lines_change).pack(side="left", padx=5)
+        self.status_label = ctk.CTkLabel(controls, text="Starting engines...", anchor="w")
+        self.status_label.pack(side="left", padx=10)
+
+        self.configs = load_engine_configs(config_path)
+        self.protocol("WM_DELETE_WINDOW", self.close)
+        if not self.configs:
+            self.status_label.configure(text="No engines found: add them to engines.json")
+            return
+        self.start_engines()
+        self.refresh()
+
+    def start_engines(self):
+        comparison = EngineComparison(self.configs, int(self.lines_var.get()), reserved_cores=self.RESERVED_CORES,
+                                      priority=BACKGROUND)
+        with self._lock:
+            self.pending = comparison
+
+        def _init():
+            results = comparison.initialize()
+            with self._lock:
+                current = not self.closed and self.pending is comparison
+                if current:
+                    self.pending = None
+                    self.comparison = comparison
+                    self.version = None  # analyse the current position on the next refresh
+            if not current:
+                comparison.quit()  # the window closed or the lines changed while the engines started
+                return
+            ready = sum(1 for _, success, _ in results if success)
+            mode = " (taking turns)" if comparison.time_sliced else ""
+            self.after(0, lambda: self.status_label.configure(
+                text=f"{ready}/{len(results)} engines, {comparison.free_cores} cores{mode}"))
+        threading.Thread(target=_init, daemon=True).start()
+
+    def on_lines_change(self, value):
+        with self._lock:
+            old, self.comparison = self.comparison, None
+        if old:
+            threading.Thread(target=old.quit, daemon=True).start()
+        self.start_engines()
+
+    def refresh(self):
+        if not self.winfo_exists():
+            return
+        comparison = self.comparison
+        if comparison is not None:
+            if self.game_state.version != self.version:
+                self.version = self.game_state.version
+                self.fen = self.game_state.get_fen()
+                if not self.game_state.is_valid():
+                    self.note = "Invalid position"
+                elif self.game_state.is_game_over():
+                    self.note = "Game over"
+                else:
+                    self.note = None
+                self.submit(comparison, None if self.note else self.fen)
+            fen, snapshot = comparison.position()
+            if fen != self.fen:
+                # The lines belong to the previous position until the new search has started
+                snapshot = [dict(state, lines=[]) for state in snapshot]
+            text = f"{self.note}: nothing to analyse" if self.note else format_comparison(snapshot, self.fen)
+            self.textbox.configure(state="normal")
+            self.textbox.delete("1.0", "end")
+            self.textbox.insert("1.0", text)
+            self.textbox.configure(state="disabled")
+        self.after(self.REFRESH_MS, self.refresh)
+
+    def submit(self, comparison, fen):
+        """Queue a position change. Only the newest waits, so a burst of moves ends on the last position."""
+        with self._lock:
+            self.request = (comparison, fen)
+            if self.applying:
+                return
+            self.applying = True
+        threading.Thread(target=self._apply_requests, daemon=True).start()
+
+    def _apply_requests(self):
+        # One worker at a time applies requests in order; stopping the engines can take a while
+        while True:
+            with self._lock:
+                request, self.request = self.request, None
+                if request is None or self.closed:
+                    self.applying = False
+                    return
+            comparison, fen = request
+            if fen is None:
+                comparison.clear()
+            else:
+                comparison.analyse(fen)
+
+    def close(self):
+        with self._lock:
+            self.closed = True
+            comparison, self.comparison = self.comparison, None
+        if comparison:
+            threading.Thread(target=comparison.quit, daemon=True).start()
+        self.destroy()
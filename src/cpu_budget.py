@@ -0,0 +1,190 @@
+"""
+Priority classes for engine work: interactive, background and batch.
+
+Each class maps to a default engine Threads value, an OS niceness and a CPU
+affinity for the engine process:
+
+    interactive   what the user is watching (best moves, threats, AI moves): every core but one, normal priority
+    background    extra boards, engine comparison: 1 thread, nice 10, upper half of the cores
+    batch         bulk jobs: 1 thread, nice 19, every core but the first
+
+The process-wide `budget` also arbitrates searches. While an interactive
+search runs, background and batch searches that can be stopped (streaming
+searches, see EngineHandler.search_infos/analyse_stream) are stopped and
+new ones wait, so the interactive search always gets the cores. A preempted
+search reports `preempted` so the caller can retry it instead of using a
+shallow result.
+
+Niceness and affinity are set right after the engine starts, before its
+Threads option is sent. On Linux both are per thread, so they are applied to
+every thread the engine already has; threads it creates later inherit them.
+They are best effort: unsupported platforms or permission errors leave the
+engine at normal priority.
+"""
+import os
+import sys
+import threading
+from contextlib import contextmanager
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+BATCH = "batch"
+
+# Windows has priority classes instead of nice values
+_BELOW_NORMAL_PRIORITY_CLASS = 0x4000
+_IDLE_PRIORITY_CLASS = 0x40
+_PROCESS_SET_INFORMATION = 0x0200
+
+
+class PriorityClass:
+    def __init__(self, name, nice, preemptible):
+        self.name = name
+        self.nice = nice
+        self.preemptible = preemptible  # stopped while an interactive search runs
+
+
+PRIORITY_CLASSES = {
+    INTERACTIVE: PriorityClass(INTERACTIVE, nice=0, preemptible=False),
+    BACKGROUND: PriorityClass(BACKGROUND, nice=10, preemptible=True),
+    BATCH: PriorityClass(BATCH, nice=19, preemptible=True),
+}
+
+
+class _Search:
+    """One running search of a preemptible class; attach() its stop function once the search exists."""
+
+    def __init__(self, priority):
+        self.priority = priority
+        self.preempted = False
+        self._stop = None
+        self._lock = threading.Lock()
+
+    def attach(self, stop):
+        with self._lock:
+            self._stop = stop
+            preempted = self.preempted
+        if preempted:
+            stop()  # an interactive search started before this one got going
+
+    def detach(self):
+        with self._lock:
+            self._stop = None
+
+    def preempt(self):
+        with self._lock:
+            self.preempted = True
+            stop = self._stop
+        if stop:
+            stop()
+
+
+class CpuBudget:
+    """Threads, niceness and affinity per priority class, and interactive-first search arbitration."""
+
+    def __init__(self, cpus=None):
+        if cpus is None:
+            cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else \
+                list(range(os.cpu_count() or 1))
+        self.cpus = list(cpus)
+        self._cond = threading.Condition()
+        self._interactive = 0
+        self._running = set()
+
+    def engine_threads(self, priority):
+        """Default engine Threads option for the class."""
+        if priority == INTERACTIVE:
+            return max(1, len(self.cpus) - 1)  # one core left for the UI thread
+        return 1
+
+    def affinity(self, priority):
+        """CPUs the class's engines may run on (None: all)."""
+        if priority == INTERACTIVE or len(self.cpus) < 2:
+            return None
+        if priority == BACKGROUND:
+            return self.cpus[len(self.cpus) // 2:]
+        return self.cpus[1:]
+
+    def default_engines(self, priority=None, threads=1):
+        """Engines of `threads` threads each that fit on the class's CPUs without oversubscribing them."""
+        cpus = (self.affinity(priority) if priority else None) or self.cpus
+        return max(1, len(cpus) // max(1, int(threads)))
+
+    def apply(self, pid, priority):
+        """Set the niceness and affinity of an engine process. Returns False if the OS refused."""
+        nice = PRIORITY_CLASSES[priority].nice
+        cpus = self.affinity(priority)
+        try:
+            if sys.platform == "win32":
+                _apply_windows(pid, nice, cpus)
+            else:
+                for tid in _thread_ids(pid):
+                    if nice:
+                        os.setpriority(os.PRIO_PROCESS, tid, nice)
+                    if cpus and hasattr(os, "sched_setaffinity"):
+                        os.sched_setaffinity(tid, cpus)
+            return True
+        except (OSError, AttributeError) as e:
+            print(f"Could not set {priority} priority for engine process {pid}: {e}")
+            return False
+
+    @contextmanager
+    def search(self, priority):
+        """
+        Hold while searching. Interactive searches preempt running background/batch ones and hold
+        new ones back; those yield a _Search to attach() their stop function to and check .preempted.
+        """
+        search = _Search(priority)
+        if not PRIORITY_CLASSES[priority].preemptible:
+            with self._cond:
+                self._interactive += 1
+                running = list(self._running)
+            for other in running:
+                other.preempt()
+            try:
+                yield search
+            finally:
+                with self._cond:
+                    self._interactive -= 1
+                    self._cond.notify_all()
+            return
+
+        with self._cond:
+            while self._interactive:
+                self._cond.wait()
+            self._running.add(search)
+        try:
+            yield search
+        finally:
+            with self._cond:
+                self._running.discard(search)
+
+    def interactive_active(self):
+        with self._cond:
+            return self._interactive > 0
+
+
+def _thread_ids(pid):
+    """Every thread of a process where the OS exposes them (Linux), else just the process."""
+    try:
+        return [int(tid) for tid in os.listdir(f"/proc/{pid}/task")]
+    except OSError:
+        return [pid]
+
+
+def _apply_windows(pid, nice, cpus):
+    import ctypes
+
+    kernel32 = ctypes.windll.kernel32
+    handle = kernel32.OpenProcess(_PROCESS_SET_INFORMATION, False, pid)
+    if not handle:
+        raise OSError(f"OpenProcess failed ({kernel32.GetLastError()})")
+    try:
+        if nice:
+            kernel32.SetPriorityClass(handle, _IDLE_PRIORITY_CLASS if nice >= 15 else _BELOW_NORMAL_PRIORITY_CLASS)
+        if cpus:
+            kernel32.SetProcessAffinityMask(handle, sum(1 << cpu for cpu in cpus))
+    finally:
+        kernel32.CloseHandle(handle)
+
+
+budget = CpuBudget()
@@ -0,0 +1,460 @@
+"""
+Distributed batch analysis: one coordinator, any number of workers on other machines.
+
+The coordinator owns the work list and listens on TCP. Workers connect, wrap
+their local engines (one EngineHandler and one connection per engine) and
+pull positions in small batches. The protocol is one JSON object per line:
+
+    worker -> {"type": "hello", "name": ...}
+    worker -> {"type": "lease"}            coordinator -> {"type": "batch", "lease": id, "limit": {...},
+                                                            "multipv": n, "positions": [{"key", "fen"}]}
+                                                         or {"type": "wait", "seconds": s} / {"type": "done"}
+    worker -> {"type": "result", "lease": id, "results": [{"key", "depth", "lines"}]}
+                                           coordinator -> {"type": "ack"}
+
+Positions are deduplicated by Zobrist key and skipped when the AnalysisCache
+already has them deep enough. A lease that is not returned within
+--lease-timeout, or whose connection drops, goes back in the queue; a
+position is given up after --max-attempts leases. Results stream into the
+cache and, optionally, a JSONL file as they arrive. With --store, the results
+are also written to an AnalysisStore, one row per input position in game order.
+
+Usage:
+    python -m src.distributed coordinator archive/*.pgn --depth 18 --port 7878 --out analysis.jsonl
+    python -m src.distributed coordinator data/games --depth 18 --store data/analysis
+    python -m src.distributed worker --host coordinator.lan --port 7878 --engine stockfish --engines 8
+"""
+import argparse
+import collections
+import itertools
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+import chess
+import chess.engine
+
+from src.analysis_cache import AnalysisCache
+from src.analysis_scheduler import lines_from_infos
+from src.analysis_store import AnalysisStore, make_row
+from src.cpu_budget import BATCH, PRIORITY_CLASSES, budget
+from src.engine import EngineHandler, parse_uci_options
+from src.epd_runner import read_epd
+from src.game_store import GameStore, is_game_store
+from src.metrics import registry
+from src.puzzle_miner import iter_games
+
+DEFAULT_PORT = 7878
+
+
+def send_message(stream, message):
+    stream.write((json.dumps(message) + "\n").encode("utf-8"))
+    stream.flush()
+
+
+def read_message(stream):
+    """Next message, or None when the peer closed the connection."""
+    line = stream.readline()
+    if not line:
+        return None
+    return json.loads(line)
+
+
+def encode_lines(lines):
+    return [{"move": line["move"].uci(), "score": line["score"], "pv": [m.uci() for m in line["pv"]]}
+            for line in lines]
+
+
+def decode_lines(lines):
+    return [{"rank": i + 1, "move": chess.Move.from_uci(line["move"]), "score": line["score"],
+             "pv": [chess.Move.from_uci(m) for m in line["pv"]]} for i, line in enumerate(lines)]
+
+
+def iter_game_positions(paths):
+    """(game, ply, board) for every position of every game in .pgn files and game store directories
+    (src/game_store.py), and every line of EPD/FEN files as a game of its own. Games are numbered
+    across all inputs; boards may be reused."""
+    game = 0
+    for path in paths:
+        if is_game_store(path):
+            store = GameStore(path)
+            for index, ply, board in store.iter_positions():
+                yield game + index, ply, board
+            game += len(store)
+        elif path.lower().endswith(".pgn"):
+            for _, pgn_game in iter_games([path]):
+                board = pgn_game.board()
+                yield game, 0, board
+                for ply, move in enumerate(pgn_game.mainline_moves(), 1):
+                    board.push(move)
+                    yield game, ply, board
+                game += 1
+        else:
+            for _, board, _, _ in read_epd([path]):
+                if board is not None:  # read_epd has reported the malformed line
+                    yield game, 0, board
+                    game += 1
+
+
+def iter_positions(paths):
+    """FENs to analyse, in input order (see iter_game_positions)."""
+    for _, _, board in iter_game_positions(paths):
+        yield board.fen()
+
+
+def write_store(directory, paths, results):
+    """
+    Append analysed positions to an AnalysisStore (src/analysis_store.py) in game order: one row per
+    input position with a result, holding its best line. Game numbers continue after the store's last
+    game. Returns the number of rows written.
+    """
+    store = AnalysisStore(directory)
+    first_game = max((chunk["game_max"] for chunk in store.chunks), default=-1) + 1
+    rows = []
+    for game, ply, board in iter_game_positions(paths):
+        key = AnalysisCache.key(board)
+        result = results.get(key)
+        if result is None or not result["lines"]:
+            continue  # failed, or the game store was appended to since
+        line = result["lines"][0]
+        score = line["score"] if board.turn == chess.WHITE else -line["score"]
+        rows.append(make_row(key, first_game + game, ply, result["depth"] or 0, score, line["move"], line["pv"]))
+    store.append(rows)
+    store.close()
+    return len(rows)
+
+
+class Coordinator:
+    """Hands out position batches under leases and collects the results."""
+
+    def __init__(self, limit, multipv=1, cache=None, batch_size=8, lease_timeout=60.0, max_attempts=3,
+                 on_result=None):
+        self.limit = limit  # dict of chess.engine.Limit fields, sent to workers as is
+        self.multipv = multipv
+        self.cache = cache if cache is not None else AnalysisCache()
+        self.batch_size = batch_size
+        self.lease_timeout = lease_timeout
+        self.max_attempts = max_attempts
+        self.on_result = on_result
+
+        self.fens = {}  # key -> fen, every distinct position ever added
+        self.queue = collections.deque()  # keys waiting for a lease
+        self.attempts = collections.Counter()
+        self.leases = {}  # lease id -> {"keys", "deadline", "owner"}
+        self.results = {}  # key -> {"fen", "depth", "lines", "worker"}
+        self.failed = set()
+        self.duplicates = 0
+        self.workers = collections.Counter()  # worker name -> positions analysed
+        self.closed = False  # no more positions will be added
+        self.finished = threading.Event()
+        self._lease_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.server = None
+
+    def add(self, fen):
+        """Queue one position unless it is a duplicate or already cached."""
+        board = chess.Board(fen)
+        key = AnalysisCache.key(board)
+        with self._lock:
+            if key in self.fens:
+                self.duplicates += 1
+                return key
+            self.fens[key] = board.fen()
+        cached = self.cache.get(board, self.multipv, min_depth=self.limit.get("depth") or 0)
+        if cached is not None:
+            self._store(key, cached["depth"], cached["lines"], "cache")
+        else:
+            with self._lock:
+                self.queue.append(key)
+        return key
+
+    def close(self):
+        """No more positions: the run finishes once everything queued is done."""
+        with self._lock:
+            self.closed = True
+            self._check_finished()
+
+    def _check_finished(self):
+        if self.closed and len(self.results) + len(self.failed) == len(self.fens):
+            self.finished.set()
+
+    def _expire(self, now):
+        for lease_id, lease in list(self.leases.items()):
+            if lease["deadline"] < now:
+                registry.counter("distributed_lease_expired_total", "Leases not returned in time").inc()
+                self._release(lease_id)
+
+    def _release(self, lease_id, keep=()):
+        """Requeue a lease's unfinished positions (at most max_attempts leases per position)."""
+        lease = self.leases.pop(lease_id, None)
+        if lease is None:
+            return
+        for key in lease["keys"]:
+            if key in self.results or key in keep:
+                continue
+            if self.attempts[key] >= self.max_attempts:
+                self.failed.add(key)
+            else:
+                self.queue.appendleft(key)
+        self._check_finished()
+
+    def lease(self, owner):
+        """The reply to a lease request from connection `owner`."""
+        with self._lock:
+            self._expire(time.monotonic())
+            if self.finished.is_set():
+                return {"type": "done"}
+            keys = []
+            while self.queue and len(keys) < self.batch_size:
+                key = self.queue.popleft()
+                if key not in self.results and key not in self.failed:
+                    keys.append(key)
+            if not keys:
+                return {"type": "wait", "seconds": 0.2}
+            lease_id = next(self._lease_ids)
+            for key in keys:
+                self.attempts[key] += 1
+            self.leases[lease_id] = {"keys": keys, "deadline": time.monotonic() + self.lease_timeout,
+                                     "owner": owner}
+            return {"type": "batch", "lease": lease_id, "limit": self.limit, "multipv": self.multipv,
+                    "positions": [{"key": str(key), "fen": self.fens[key]} for key in keys]}
+
+    def complete(self, lease_id, results, worker):
+        """Store a returned batch; positions missing from it go back in the queue."""
+        done = set()
+        for result in results:
+            key = int(result["key"])
+            if key in self.fens and result["lines"]:
+                self._store(key, result["depth"], decode_lines(result["lines"]), worker)
+                done.add(key)
+        with self._lock:
+            self._release(lease_id, keep=done)
+
+    def abandon(self, owner):
+        """A worker connection closed: requeue everything it still held."""
+        with self._lock:
+            for lease_id, lease in list(self.leases.items()):
+                if lease["owner"] is owner:
+                    self._release(lease_id)
+
+    def _store(self, key, depth, lines, worker):
+        with self._lock:
+            if key in self.results:
+                return  # a late answer from an expired lease
+            fen = self.fens[key]
+            self.results[key] = {"fen": fen, "depth": depth, "lines": lines, "worker": worker}
+            self.failed.discard(key)
+            self.workers[worker] += 1
+            self._check_finished()
+        self.cache.put(chess.Board(fen), lines, depth, self.multipv)
+        registry.counter("distributed_positions_total", "Positions analysed by distributed workers").inc()
+        if self.on_result:
+            self.on_result(key, self.results[key])
+
+    def serve(self, host="0.0.0.0", port=DEFAULT_PORT):
+        """Start listening in a background thread; returns the bound (host, port)."""
+        coordinator = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                name = f"{self.client_address[0]}:{self.client_address[1]}"
+                try:
+                    while True:
+                        message = read_message(self.rfile)
+                        if message is None:
+                            break
+                        if message["type"] == "hello":
+                            name = message.get("name") or name
+                        elif message["type"] == "lease":
+                            send_message(self.wfile, coordinator.lease(self))
+                        elif message["type"] == "result":
+                            coordinator.complete(message["lease"], message["results"], name)
+                            send_message(self.wfile, {"type": "ack"})
+                except (OSError, ValueError) as e:
+                    print(f"Worker {name} dropped: {e}")
+                finally:
+                    coordinator.abandon(self)
+
+        class Server(socketserver.ThreadingTCPServer):
+            daemon_threads = True
+            allow_reuse_address = True
+
+        self.server = Server((host, port), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self.server.server_address
+
+    def shutdown(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def progress(self):
+        with self._lock:
+            return {"positions": len(self.fens), "done": len(self.results), "failed": len(self.failed),
+                    "leased": sum(len(lease["keys"]) for lease in self.leases.values()),
+                    "duplicates": self.duplicates}
+
+
+def analyse_batch(handler, batch):
+    """Search every position of a coordinator batch with a local engine."""
+    limit = chess.engine.Limit(**batch["limit"])
+    results = []
+    for position in batch["positions"]:
+        _, infos = handler.search_infos(chess.Board(position["fen"]), limit, multipv=batch["multipv"])
+        lines = lines_from_infos(infos)
+        if lines:
+            depth = max(line["depth"] or 0 for line in lines)
+            results.append({"key": position["key"], "depth": depth, "lines": encode_lines(lines)})
+    return results
+
+
+def run_worker(host, port, handler, name=None, connect_timeout=30.0):
+    """Serve one coordinator with one engine until it says done. Returns the positions analysed."""
+    deadline = time.monotonic() + connect_timeout
+    while True:
+        try:
+            sock = socket.create_connection((host, port))
+            break
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.5)
+
+    analysed = 0
+    with sock, sock.makefile("rwb") as stream:
+        try:
+            send_message(stream, {"type": "hello", "name": name or f"{socket.gethostname()}:{os.getpid()}"})
+            while True:
+                send_message(stream, {"type": "lease"})
+                message = read_message(stream)
+                if message is None or message["type"] == "done":
+                    break
+                if message["type"] == "wait":
+                    time.sleep(message["seconds"])
+                    continue
+                results = analyse_batch(handler, message)
+                send_message(stream, {"type": "result", "lease": message["lease"], "results": results})
+                read_message(stream)
+                analysed += len(results)
+        except OSError:
+            pass  # the coordinator went away; whatever we held is leased out again
+    return analysed
+
+
+def run_workers(host, port, engines, engine_path, engine_args=None, engine_options=None, name=None, priority=None):
+    """One connection and one engine per thread. Returns the total positions analysed."""
+    name = name or socket.gethostname()
+    handlers = [EngineHandler(engine_path, engine_args, engine_options=engine_options, priority=priority)
+                for _ in range(engines)]
+    counts = [0] * engines
+
+    def serve(i):
+        success, msg = handlers[i].initialize_engine()
+        if not success:
+            print(msg, file=sys.stderr)
+            return
+        try:
+            counts[i] = run_worker(host, port, handlers[i], f"{name}/{i}")
+        finally:
+            handlers[i].quit()
+
+    threads = [threading.Thread(target=serve, args=(i,)) for i in range(engines)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(counts)
+
+
+def format_result(result):
+    return json.dumps({"fen": result["fen"], "depth": result["depth"], "lines": encode_lines(result["lines"])})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Distributed batch analysis over TCP.")
+    sub = parser.add_subparsers(dest="role", required=True)
+
+    coord = sub.add_parser("coordinator", help="Serve positions to workers and collect the results")
+    coord.add_argument("inputs", nargs="+", help="PGN files or game stores (every position), or EPD/FEN files")
+    coord.add_argument("--host", default="0.0.0.0")
+    coord.add_argument("--port", type=int, default=DEFAULT_PORT)
+    coord.add_argument("--depth", type=int, help="Depth per position")
+    coord.add_argument("--nodes", type=int, help="Nodes per position")
+    coord.add_argument("--time", type=float, help="Seconds per position")
+    coord.add_argument("--multipv", type=int, default=1)
+    coord.add_argument("--batch-size", type=int, default=8, help="Positions per lease")
+    coord.add_argument("--lease-timeout", type=float, default=120.0, help="Seconds before a lease is handed out again")
+    coord.add_argument("--max-attempts", type=int, default=3, help="Leases per position before giving up on it")
+    coord.add_argument("--out", help="Append one JSON line per analysed position")
+    coord.add_argument("--store", help="When done, append every analysed position to this analysis store directory")
+
+    work = sub.add_parser("worker", help="Analyse positions for a coordinator with local engines")
+    work.add_argument("--host", default="127.0.0.1")
+    work.add_argument("--port", type=int, default=DEFAULT_PORT)
+    work.add_argument("--engine", default="stockfish.exe", help="Engine executable")
+    work.add_argument("--engine-arg", action="append", default=[], help="Extra engine command line argument")
+    work.add_argument("--option", action="append", default=[], metavar="NAME=VALUE", help="UCI option")
+    work.add_argument("--engines", type=int, help="Engines (and connections) on this machine (default: cores of the priority class)")
+    work.add_argument("--name", help="Worker name in the coordinator's statistics")
+    work.add_argument("--priority", choices=list(PRIORITY_CLASSES), default=BATCH,
+                      help="Engine priority class: niceness and CPU affinity (default: batch)")
+    args = parser.parse_args(argv)
+
+    if args.role == "worker":
+        options = parse_uci_options(args.option)
+        options.setdefault("Threads", "1")
+        engines = args.engines or budget.default_engines(args.priority, options["Threads"])
+        analysed = run_workers(args.host, args.port, engines, args.engine, args.engine_arg, options, args.name,
+                               args.priority)
+        print(f"{analysed} positions analysed", file=sys.stderr)
+        return 0
+
+    limit = {k: v for k, v in (("depth", args.depth), ("nodes", args.nodes), ("time", args.time)) if v is not None}
+    if not limit:
+        limit = {"depth": 18}
+    out = open(args.out, "a", encoding="utf-8") if args.out else None
+    write_lock = threading.Lock()
+
+    def on_result(key, result):
+        if out:
+            with write_lock:
+                out.write(format_result(result) + "\n")
+                out.flush()
+
+    coordinator = Coordinator(limit, args.multipv, batch_size=args.batch_size, lease_timeout=args.lease_timeout,
+                              max_attempts=args.max_attempts, on_result=on_result)
+    host, port = coordinator.serve(args.host, args.port)
+    print(f"Coordinator listening on {host}:{port}", file=sys.stderr)
+    start = time.perf_counter()
+    try:
+        for fen in iter_positions(args.inputs):
+            coordinator.add(fen)
+        coordinator.close()
+        while not coordinator.finished.wait(5.0):
+            p = coordinator.progress()
+            rate = p["done"] / (time.perf_counter() - start)
+            print(f"{p['done']}/{p['positions']} done, {p['leased']} leased, {p['failed']} failed, "
+                  f"{rate:.1f} pos/s", file=sys.stderr)
+    finally:
+        coordinator.shutdown()
+        if out:
+            out.close()
+
+    elapsed = time.perf_counter() - start
+    p = coordinator.progress()
+    print(f"{p['done']} positions in {elapsed:.1f}s ({p['done'] / elapsed if elapsed else 0:.1f} pos/s), "
+          f"{p['duplicates']} duplicates skipped, {p['failed']} failed", file=sys.stderr)
+    for worker, count in sorted(coordinator.workers.items()):
+        print(f"  {worker:<30} {count}", file=sys.stderr)
+    if args.store:
+        rows = write_store(args.store, args.inputs, coordinator.results)
+        print(f"{rows} rows added to {args.store}", file=sys.stderr)
+    return 0 if not p["failed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
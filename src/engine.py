@@ -1,38 +1,157 @@
+import collections
 import chess
 import chess.engine
 import os
+import queue
+import shutil
 import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+
+from src.cpu_budget import budget
+from src.metrics import registry
+from src.uci_trace import TracingProtocol, dump_crash
+
+_END = object()
+
+def parse_uci_options(pairs):
+    """["Threads=2", "Hash=128"] -> {"Threads": "2", "Hash": "128"}, for command line tools."""
+    options = {}
+    for pair in pairs or []:
+        name, sep, value = pair.partition("=")
+        if not sep:
+            raise ValueError(f"Engine option must look like Name=Value: {pair!r}")
+        options[name.strip()] = value.strip()
+    return options
+
+def format_score(score):
+    """Centipawns (mate scores near +/-10000) as "+0.35" or "M3"/"-M3"."""
+    if abs(score) >= 9000:
+        mate_in = 10000 - abs(score)
+        return f"M{mate_in}" if score > 0 else f"-M{mate_in}"
+    return f"{score / 100:+.2f}"
+
+def _is_executable(path):
+    if not os.path.isfile(path):
+        return False
+    if os.name == "nt":
+        return path.lower().endswith(".exe")
+    return os.access(path, os.X_OK)
+
+def resolve_engine_path(path, hint="stockfish"):
+    """
+    The engine binary for `path`, or None: the file itself, the first executable inside a directory
+    whose name contains `hint`, or a bare name looked up on PATH. Off Windows, "stockfish.exe" also
+    matches "stockfish", so the same settings work on every platform.
+    """
+    if os.path.isfile(path):
+        return path
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            for file in sorted(files):
+                candidate = os.path.join(root, file)
+                if hint.lower() in file.lower() and _is_executable(candidate):
+                    return candidate
+        return None
+    if os.name != "nt" and path.lower().endswith(".exe"):
+        stripped = path[:-4]
+        if os.path.exists(stripped):
+            return resolve_engine_path(stripped, hint)
+        path = stripped
+    if os.path.dirname(path):
+        return None
+    return shutil.which(path)
+
+class _SearchWatchdog:
+    """
+    Bounds one streaming search (SimpleEngine.analysis), which python-chess never times out.
+    A search overruns when it runs `timeout` past its time limit, when the engine stays silent for
+    `timeout` during a search without one, or when it ignores "stop" for `timeout`. The engine is then
+    killed so the caller's loop over the infos ends (with EngineTerminatedError) and can restart it.
+    Call stop() to end the search early; it also arms the stop deadline.
+    """
+
+    POLL = 0.05
+
+    def __init__(self, engine, analysis, limit, timeout, stop_event=None):
+        self.engine = engine
+        self.analysis = analysis
+        self.timeout = timeout
+        self.stop_event = stop_event
+        self.started = time.perf_counter()
+        self.deadline = self.started + limit.time + timeout if limit is not None and limit.time else None
+        self.watch_silence = limit is not None and not limit.time  # infinite searches may be silent
+        self.stopped_at = None
+        self.overrun = False
+        self._finished = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._finished.set()
+
+    def stop(self):
+        if self.stopped_at is None:
+            self.stopped_at = time.perf_counter()
+        self.analysis.stop()
+
+    def _run(self):
+        trace = self.engine.protocol.trace
+        while not self._finished.wait(self.POLL):
+            if self.stop_event is not None and self.stop_event.is_set() and self.stopped_at is None:
+                self.stop()
+            now = time.perf_counter()
+            late = (self.deadline is not None and now > self.deadline) or \
+                (self.stopped_at is not None and now > self.stopped_at + self.timeout) or \
+                (self.watch_silence and now > max(self.started, trace.last_received) + self.timeout)
+            if late:
+                self.overrun = True
+                registry.counter("engine_search_overruns_total", "Searches killed for overrunning").inc()
+                self.analysis.stop()
+                transport = self.engine.protocol.transport
+                self.engine.protocol.loop.call_soon_threadsafe(transport.kill)
+                return
+
 
 class EngineHandler:
-    def __init__(self, engine_path="stockfish.exe"):
+    def __init__(self, engine_path="stockfish.exe", engine_args=None, timeout=10.0, engine_options=None,
+                 priority=None):
         self.engine_path = engine_path
+        self.engine_args = list(engine_args or [])  # Extra command line arguments for the engine process
+        self.timeout = timeout  # Seconds to wait for engine responses beyond the search time
+        self.engine_options = dict(engine_options or {})  # UCI options (Threads, Hash, ...) set after startup
+        # Priority class (src/cpu_budget.py): default Threads, niceness, affinity and search preemption
+        self.priority = priority
+        self.preempted = False  # the last streaming search was stopped early for an interactive one
         self.engine = None
         self.lock = threading.Lock()  # Prevent concurrent engine access
 
     def initialize_engine(self):
-        # 1. Check if path exists
-        if not os.path.exists(self.engine_path):
-            return False, f"Engine not found at {self.engine_path}. Please place 'stockfish.exe' in the project folder."
-        
-        # 2. If it is a directory, search for an executable inside
-        final_path = self.engine_path
-        if os.path.isdir(self.engine_path):
-            found_exe = None
-            for root, dirs, files in os.walk(self.engine_path):
-                for file in files:
-                    if "stockfish" in file.lower() and file.lower().endswith(".exe"):
-                        found_exe = os.path.join(root, file)
-                        break
-                if found_exe:
-                    break
-             
-            if found_exe:
-                final_path = found_exe
-            else:
+        # Find the binary: the file itself, an executable inside a directory, or a name on PATH
+        final_path = resolve_engine_path(self.engine_path)
+        if final_path is None:
+            if os.path.isdir(self.engine_path):
                 return False, f"Directory found at {self.engine_path}, but no 'stockfish' executable was found inside."
+            return False, (f"Engine not found at {self.engine_path}. Please place 'stockfish.exe' (Windows) or "
+                           f"'stockfish' in the project folder, or install it on the PATH.")
 
         try:
-            self.engine = chess.engine.SimpleEngine.popen_uci(final_path)
+            command = [final_path] + self.engine_args if self.engine_args else final_path
+            # UCI traffic goes through a ring buffer (src/uci_trace.py), dumped when the engine fails
+            self.engine = chess.engine.SimpleEngine.popen(TracingProtocol, command, timeout=self.timeout)
+            self.engine.protocol.trace.label = f"{os.path.basename(final_path)} {self.engine.protocol.trace.label}"
+            options = dict(self.engine_options)
+            if self.priority:
+                # Before Threads is sent, so the engine's search threads inherit niceness and affinity
+                budget.apply(self.engine.protocol.transport.get_pid(), self.priority)
+                if "Threads" in self.engine.options:
+                    options.setdefault("Threads", budget.engine_threads(self.priority))
+            if options:
+                self.engine.configure(options)
             return True, f"Engine initialized successfully ({os.path.basename(final_path)})."
         except PermissionError:
             return False, f"Permission denied accessing {self.engine_path}. Try running as Administrator or check file properties."
@@ -43,40 +162,83 @@ class EngineHandler:
         if not self.engine:
             return None
         
-        with self.lock:
+        with self._locked():
             try:
                 board = chess.Board(fen)
-                result = self.engine.play(board, chess.engine.Limit(time=time_limit))
+                if self._rejects(board):
+                    return None
+                with self._budget(), registry.timer("engine_search_seconds", "Time spent in engine searches"):
+                    result = self.engine.play(board, chess.engine.Limit(time=time_limit))
                 return result.move
             except Exception as e:
                 import traceback
                 traceback.print_exc()
                 print(f"Error getting best move: {e!r}")
+                registry.counter("engine_errors_total", "Failed engine calls").inc()
                 # Try to reinitialize engine if it died
-                self._try_reinit()
+                self._try_reinit(e)
                 return None
 
-    def _try_reinit(self):
-        """Attempt to reinitialize the engine if it crashed."""
+    @contextmanager
+    def _locked(self):
+        """Take the engine lock, recording how long the caller queued for it."""
+        start = time.perf_counter()
+        with self.lock:
+            registry.histogram("engine_queue_wait_seconds", "Time waiting for the engine lock").record(
+                time.perf_counter() - start)
+            yield
+
+    @staticmethod
+    def _rejects(board):
+        """True for positions that must not reach the engine: illegal ones (no king, side not to move
+        in check, ...) can crash it and send every later call through _try_reinit."""
+        if board.is_valid():
+            return False
+        registry.counter("engine_invalid_positions_total", "Invalid positions kept from the engine").inc()
+        return True
+
+    def _budget(self):
+        """Search slot of this engine's priority class: interactive searches preempt the other classes,
+        which wait while one runs. Yields a search to attach a stop function to (None without a class)."""
+        return budget.search(self.priority) if self.priority else nullcontext()
+
+    @property
+    def trace(self):
+        """UciTrace of the running engine process, or None."""
+        return self.engine.protocol.trace if self.engine else None
+
+    def _try_reinit(self, error=None):
+        """Attempt to reinitialize the engine if it crashed, saving its UCI trace first."""
+        registry.counter("engine_restarts_total", "Engine restarts after a failure").inc()
+        if self.engine:
+            path = dump_crash(self.engine.protocol.trace, f"{type(error).__name__}: {error}" if error else "failure")
+            if path:
+                print(f"UCI trace saved to {path}")
         try:
             if self.engine:
-                try:
-                    self.engine.quit()
-                except:
-                    pass
+                self._shutdown_engine()
             self.engine = None
             self.initialize_engine()
         except:
             pass
 
+    def _overrun_error(self, watchdog, error):
+        """The error to report for a failed streaming search: a timeout if the watchdog killed it."""
+        if watchdog is not None and watchdog.overrun:
+            return TimeoutError(f"search overran its limit by {self.timeout}s; engine killed")
+        return error
+
     def get_top_moves(self, fen, limit=3, time_limit=1.0):
         if not self.engine:
             return []
         
-        with self.lock:
+        with self._locked():
             try:
                 board = chess.Board(fen)
-                info = self.engine.analyse(board, chess.engine.Limit(time=time_limit), multipv=limit)
+                if self._rejects(board):
+                    return []
+                with self._budget(), registry.timer("engine_search_seconds", "Time spent in engine searches"):
+                    info = self.engine.analyse(board, chess.engine.Limit(time=time_limit), multipv=limit)
                 
                 if isinstance(info, dict):
                     info = [info]
@@ -96,13 +258,90 @@ class EngineHandler:
                 
             except Exception as e:
                 print(f"Error analyzing: {e}")
-                self._try_reinit()
+                registry.counter("engine_errors_total", "Failed engine calls").inc()
+                self._try_reinit(e)
                 return []
 
+    def analyse_stream(self, board, on_info, stop_event, limit=None, multipv=None):
+        """
+        Run one search (infinite when limit is None), passing every info dict to on_info as it arrives,
+        until the search ends or stop_event is set. Returns False if the engine failed.
+        """
+        if not self.engine or self._rejects(board):
+            return False
+
+        watchdog = None
+        with self._locked():
+            try:
+                with self._budget() as search, registry.timer("engine_search_seconds", "Time spent in engine searches"):
+                    with self.engine.analysis(board, limit, multipv=multipv) as analysis:
+                        # Deep iterations can be silent for a long time; stop from the watchdog, not between infos
+                        watchdog = _SearchWatchdog(self.engine, analysis, limit, self.timeout, stop_event)
+                        if search:
+                            search.attach(watchdog.stop)
+                        try:
+                            with watchdog:
+                                for info in analysis:
+                                    on_info(dict(info))
+                        finally:
+                            if search:
+                                search.detach()
+                self.preempted = bool(search and search.preempted)
+                return True
+            except Exception as e:
+                e = self._overrun_error(watchdog, e)
+                print(f"Error analyzing: {e}")
+                registry.counter("engine_errors_total", "Failed engine calls").inc()
+                self._try_reinit(e)
+                return False
+
+    def search_infos(self, board, limit, multipv=None, root_moves=None, game=None, stop_event=None):
+        """
+        Run one search and return (best move, every info dict the engine sent, in order).
+        For callers that need the whole search history rather than the final line.
+        root_moves restricts the search to those moves (UCI searchmoves). Pass a new `game` object
+        per game so the engine gets "ucinewgame" and drops its hash and history between games.
+        Setting stop_event stops the search early; the infos sent until then are returned.
+        """
+        if not self.engine or self._rejects(board):
+            return None, []
+
+        watchdog = None
+        with self._locked():
+            try:
+                with self._budget() as search, registry.timer("engine_search_seconds", "Time spent in engine searches"):
+                    with self.engine.analysis(board, limit, multipv=multipv, root_moves=root_moves,
+                                              game=game) as analysis:
+                        watchdog = _SearchWatchdog(self.engine, analysis, limit, self.timeout, stop_event)
+                        if search:
+                            search.attach(watchdog.stop)
+                        try:
+                            with watchdog:
+                                infos = [dict(info) for info in analysis]
+                                best = analysis.wait()
+                        finally:
+                            if search:
+                                search.detach()
+                self.preempted = bool(search and search.preempted)
+                return best.move, infos
+            except Exception as e:
+                e = self._overrun_error(watchdog, e)
+                print(f"Error in search: {e}")
+                registry.counter("engine_errors_total", "Failed engine calls").inc()
+                self._try_reinit(e)
+                return None, []
+
     def quit(self):
         if self.engine:
+            self._shutdown_engine()
+
+    def _shutdown_engine(self):
+        try:
+            self.engine.quit()
+        except:
+            # A hung engine ignores "quit": kill the process instead of leaking it
             try:
-                self.engine.quit()
+                self.engine.close()
             except:
                 pass
 
@@ -110,11 +349,82 @@ class EngineHandler:
         if not self.engine:
             return None
         
-        with self.lock:
+        with self._locked():
             try:
                 board = chess.Board(fen)
-                info = self.engine.analyse(board, chess.engine.Limit(depth=15))
+                if self._rejects(board):
+                    return None
+                with self._budget(), registry.timer("engine_search_seconds", "Time spent in engine searches"):
+                    info = self.engine.analyse(board, chess.engine.Limit(depth=15))
                 return info["score"].relative.score(mate_score=10000)
             except Exception as e:
                 print(f"Error in evaluation: {e}")
+                registry.counter("engine_errors_total", "Failed engine calls").inc()
                 return None
+
+
+class EnginePool:
+    """
+    A fixed set of EngineHandlers shared by many callers.
+    Callers borrow an idle handler with acquire(); map() spreads work over all of them.
+    """
+    def __init__(self, size=None, engine_path="stockfish.exe", engine_args=None, timeout=10.0, engine_options=None,
+                 priority=None):
+        self.size = size or max(1, (os.cpu_count() or 2) // 2)
+        self.handlers = [EngineHandler(engine_path, engine_args, timeout, engine_options, priority)
+                         for _ in range(self.size)]
+        self.idle = queue.Queue()
+
+    def initialize(self):
+        """Start all engines in parallel. Returns (success, message) like EngineHandler."""
+        with ThreadPoolExecutor(max_workers=self.size) as executor:
+            results = list(executor.map(lambda h: h.initialize_engine(), self.handlers))
+        ready = 0
+        for handler, (success, _) in zip(self.handlers, results):
+            if success:
+                self.idle.put(handler)
+                ready += 1
+        if ready == 0:
+            return False, results[0][1]
+        return True, f"Engine pool ready ({ready}/{self.size} engines)."
+
+    @contextmanager
+    def acquire(self, timeout=None):
+        """Borrow an idle engine. Raises queue.Empty if none frees up within timeout."""
+        start = time.perf_counter()
+        handler = self.idle.get(timeout=timeout)
+        registry.histogram("engine_pool_wait_seconds", "Time waiting for an idle pooled engine").record(
+            time.perf_counter() - start)
+        try:
+            yield handler
+        finally:
+            self.idle.put(handler)
+
+    def map(self, func, items, window=None):
+        """
+        Call func(handler, item) for every item, using every engine in parallel.
+        Results are yielded in input order. Only `window` items (default 2x the pool)
+        are pulled from `items` ahead of the consumer, so it can be a lazy stream.
+        """
+        def run(item):
+            with self.acquire() as handler:
+                return func(handler, item)
+
+        window = window or self.size * 2
+        items = iter(items)
+        with ThreadPoolExecutor(max_workers=self.size) as executor:
+            in_flight = collections.deque()
+            for item in items:
+                in_flight.append(executor.submit(run, item))
+                if len(in_flight) >= window:
+                    break
+            while in_flight:
+                result = in_flight.popleft().result()
+                item = next(items, _END)
+                if item is not _END:
+                    in_flight.append(executor.submit(run, item))
+                yield result
+
+    def quit(self):
+        for handler in self.handlers:
+            handler.quit()
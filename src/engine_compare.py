@@ -0,0 +1,304 @@
+"""
+Side-by-side analysis of one position by several UCI engines.
+
+Engines come from engines.json, a list of {"name", "path", "args", "options"}
+objects. Paths are resolved like EngineHandler's (a file, a directory, or a
+name on PATH; "x.exe" also matches "x" off Windows). Without a config file,
+every known engine name found next to the program or on PATH is used.
+
+The cores not reserved for the primary analysis are shared out as each
+engine's Threads option. When there are more engines than free cores, the
+engines take turns in time slices (first come, first served), so adding an
+engine slows the comparison down but never takes cores from the primary
+analysis.
+
+Usage:
+    python -m src.engine_compare --time 10
+    python -m src.engine_compare "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3" \\
+        --engine stockfish --engine lc0 --multipv 2 --time 5
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import chess
+import chess.engine
+
+from src.cpu_budget import budget
+from src.engine import EngineHandler, format_score, parse_uci_options, resolve_engine_path
+
+KNOWN_ENGINES = ["stockfish", "lc0", "komodo", "dragon", "berserk", "ethereal", "koivisto", "rubichess", "igel",
+                 "caissa", "obsidian", "torch", "fairy-stockfish"]
+MATE_SCORE = 10000
+
+
+class FairSlots:
+    """Counting semaphore that hands a released slot to the longest waiting thread, so a thread
+    releasing and re-acquiring in a loop cannot starve the others."""
+
+    def __init__(self, count):
+        self.free = count
+        self.waiters = deque()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            if self.free and not self.waiters:
+                self.free -= 1
+                return
+            event = threading.Event()
+            self.waiters.append(event)
+        event.wait()
+
+    def release(self):
+        with self.lock:
+            if self.waiters:
+                self.waiters.popleft().set()
+            else:
+                self.free += 1
+
+
+def load_engine_configs(path="engines.json"):
+    """Engine configs from a JSON file, or the engines found by discover_engines() if it does not exist."""
+    if not os.path.exists(path):
+        return discover_engines()
+    with open(path, encoding="utf-8") as f:
+        configs = json.load(f)
+    for config in configs:
+        config.setdefault("name", os.path.basename(config["path"]))
+        config.setdefault("args", [])
+        config.setdefault("options", {})
+    return configs
+
+
+def discover_engines(directory="."):
+    """Configs for known engine names in `directory` (file or sub folder) or on PATH."""
+    found, seen = [], set()
+    for name in KNOWN_ENGINES:
+        path = resolve_engine_path(os.path.join(directory, name), hint=name) or resolve_engine_path(name, hint=name)
+        if path and os.path.realpath(path) not in seen:
+            seen.add(os.path.realpath(path))
+            found.append({"name": name, "path": path, "args": [], "options": {}})
+    return found
+
+
+class EngineComparison:
+    """Runs several engines on the same position and keeps the latest lines of each."""
+
+    def __init__(self, configs, multipv=1, reserved_cores=1, cores=None, slice_seconds=1.0, priority=None):
+        self.configs = configs
+        self.multipv = multipv
+        self.slice_seconds = slice_seconds
+        # A priority class pins the engines to its CPUs, which already leave the UI's core free
+        cpus = budget.affinity(priority) if priority and cores is None else None
+        if cpus:
+            self.free_cores = len(cpus)
+        else:
+            cores = cores or os.cpu_count() or 1
+            self.free_cores = max(1, cores - reserved_cores)
+        threads = max(1, self.free_cores // max(1, len(configs)))
+        # Engines that may search at the same time; more engines than that take turns
+        self.slots = FairSlots(min(len(configs), self.free_cores))
+        self.time_sliced = len(configs) > self.free_cores
+
+        self.handlers = []
+        for config in configs:
+            options = dict(config.get("options", {}))
+            options.setdefault("Threads", threads)
+            self.handlers.append(EngineHandler(config["path"], config.get("args"), engine_options=options,
+                                               priority=priority))
+        self.state = [self._empty_state(config["name"]) for config in configs]
+        self.generation = 0
+        self.fen = None  # position the current lines belong to
+        self.stop_event = threading.Event()
+        self.threads = []
+        self._lock = threading.Lock()
+        self._analyse_lock = threading.Lock()  # one position change at a time
+
+    @staticmethod
+    def _empty_state(name):
+        return {"name": name, "ready": False, "message": "", "depth": 0, "seldepth": 0, "nodes": 0, "nps": 0,
+                "lines": {}}
+
+    def initialize(self):
+        """Start every engine in parallel. Returns [(name, success, message)]."""
+        with ThreadPoolExecutor(max_workers=max(1, len(self.handlers))) as executor:
+            results = list(executor.map(lambda h: h.initialize_engine(), self.handlers))
+        for state, (success, message) in zip(self.state, results):
+            state["ready"], state["message"] = success, message
+        return [(state["name"], success, message) for state, (success, message) in zip(self.state, results)]
+
+    def analyse(self, fen):
+        """Start analysing `fen` on every engine, replacing the previous position."""
+        with self._analyse_lock:
+            self.stop()
+            self._reset(fen)
+            generation = self.generation
+            board = chess.Board(fen)
+            self.threads = [threading.Thread(target=self._run, args=(i, board, generation, self.stop_event),
+                                             daemon=True)
+                            for i, state in enumerate(self.state) if state["ready"]]
+            for thread in self.threads:
+                thread.start()
+
+    def clear(self):
+        """Stop analysing and drop every line, e.g. once the position is over or invalid."""
+        with self._analyse_lock:
+            self.stop()
+            self._reset(None)
+
+    def _reset(self, fen):
+        with self._lock:
+            self.generation += 1
+            self.fen = fen
+            self.stop_event = threading.Event()
+            for state in self.state:
+                state.update(depth=0, seldepth=0, nodes=0, nps=0, lines={})
+
+    def _run(self, index, board, generation, stop_event):
+        handler = self.handlers[index]
+        limit = chess.engine.Limit(time=self.slice_seconds) if self.time_sliced else None
+        while not stop_event.is_set():
+            self.slots.acquire()
+            try:
+                if stop_event.is_set():
+                    break
+                ok = handler.analyse_stream(board, lambda info: self._on_info(index, generation, info), stop_event,
+                                            limit=limit, multipv=self.multipv)
+            finally:
+                self.slots.release()
+            # A preempted search (src/cpu_budget.py) is restarted once the interactive one is done
+            if not ok or (limit is None and not handler.preempted):
+                break
+
+    def _on_info(self, index, generation, info):
+        with self._lock:
+            if generation != self.generation:
+                return
+            state = self.state[index]
+            state["nps"] = info.get("nps", state["nps"])
+            depth = info.get("depth")
+            # A new time slice searches from depth 1 again; keep showing the deeper result meanwhile
+            if depth is None or depth < state["depth"]:
+                return
+            state["depth"] = depth
+            state["seldepth"] = info.get("seldepth", state["seldepth"])
+            state["nodes"] = info.get("nodes", state["nodes"])
+            if info.get("pv") and "score" in info:
+                state["lines"][info.get("multipv", 1)] = {
+                    "move": info["pv"][0],
+                    "score": info["score"].white().score(mate_score=MATE_SCORE),
+                    "pv": list(info["pv"]),
+                    "depth": depth,
+                }
+
+    def snapshot(self):
+        """Per-engine copies: name, ready, depth, seldepth, nodes, nps and lines (rank order)."""
+        return self.position()[1]
+
+    def position(self):
+        """(FEN the lines belong to, snapshot()), taken together so the lines always fit the FEN."""
+        with self._lock:
+            return self.fen, [dict(state, lines=[state["lines"][k] for k in sorted(state["lines"])])
+                              for state in self.state]
+
+    def stop(self):
+        self.stop_event.set()
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+
+    def quit(self):
+        self.stop()
+        for handler in self.handlers:
+            handler.quit()
+
+
+def _san(board, move):
+    # board.san() asserts or returns nonsense for a move from another position
+    return board.san(move) if board.is_legal(move) else move.uci()
+
+
+def format_comparison(snapshot, fen, pv_moves=6):
+    """Text table with one row per engine line, scores from White's point of view."""
+    board = chess.Board(fen)
+    rows = [f"{'Engine':<16} {'Depth':>7} {'kN/s':>8}  {'Score':>7}  Line"]
+    best_moves = {}
+    for state in snapshot:
+        if not state["ready"]:
+            rows.append(f"{state['name']:<16} {'-':>7} {'-':>8}  {'-':>7}  {state['message']}")
+            continue
+        if not state["lines"]:
+            rows.append(f"{state['name']:<16} {'':>7} {'':>8}  {'':>7}  (thinking)")
+            continue
+        for i, line in enumerate(state["lines"]):
+            name = state["name"] if i == 0 else ""
+            depth = f"{state['depth']}/{state['seldepth']}" if i == 0 else ""
+            nps = f"{state['nps'] / 1000:.0f}" if i == 0 else ""
+            try:
+                text = board.variation_san(line["pv"][:pv_moves])
+            except (ValueError, AssertionError):
+                text = " ".join(m.uci() for m in line["pv"][:pv_moves])
+            rows.append(f"{name:<16} {depth:>7} {nps:>8}  {format_score(line['score']):>7}  {text}")
+        best_moves.setdefault(state["lines"][0]["move"], []).append(state["name"])
+    if len(best_moves) > 1:
+        rows.append("Disagreement: " + ", ".join(f"{_san(board, m)} ({', '.join(n)})" for m, n in best_moves.items()))
+    elif best_moves:
+        move, names = next(iter(best_moves.items()))
+        if len(names) > 1:
+            rows.append(f"All engines agree on {_san(board, move)}")
+    return "\n".join(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyse one position with several engines side by side.")
+    parser.add_argument("fen", nargs="?", default=chess.STARTING_FEN)
+    parser.add_argument("--config", default="engines.json", help="JSON list of {name, path, args, options}")
+    parser.add_argument("--engine", action="append", default=[], metavar="PATH",
+                        help="Engine to compare (repeatable; replaces --config)")
+    parser.add_argument("--option", action="append", default=[], metavar="NAME=VALUE",
+                        help="UCI option for every --engine")
+    parser.add_argument("--multipv", type=int, default=1)
+    parser.add_argument("--time", type=float, default=5.0, help="Seconds to analyse")
+    parser.add_argument("--reserve", type=int, default=0, help="Cores to leave for other work")
+    parser.add_argument("--quiet", action="store_true", help="Only print the final table")
+    args = parser.parse_args(argv)
+
+    if args.engine:
+        options = parse_uci_options(args.option)
+        configs = [{"name": os.path.basename(path), "path": path, "args": [], "options": dict(options)}
+                   for path in args.engine]
+    else:
+        configs = load_engine_configs(args.config)
+    if not configs:
+        print("No engines configured or found", file=sys.stderr)
+        return 1
+
+    comparison = EngineComparison(configs, args.multipv, reserved_cores=args.reserve)
+    for name, success, message in comparison.initialize():
+        if not success:
+            print(f"{name}: {message}", file=sys.stderr)
+    if not any(state["ready"] for state in comparison.state):
+        return 1
+
+    try:
+        comparison.analyse(args.fen)
+        deadline = time.perf_counter() + args.time
+        while time.perf_counter() < deadline:
+            time.sleep(min(1.0, max(0.0, deadline - time.perf_counter())))
+            if not args.quiet and time.perf_counter() < deadline:
+                print(format_comparison(comparison.snapshot(), args.fen) + "\n")
+        comparison.stop()
+        print(format_comparison(comparison.snapshot(), args.fen))
+    finally:
+        comparison.quit()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
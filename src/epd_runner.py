@@ -0,0 +1,199 @@
+"""
+Headless EPD test-suite runner (WAC, STS-style files) over an engine pool.
+
+Each position is searched once with the given limit. A position counts as solved
+when the engine's final move is one of the `bm` moves and none of the `am` moves;
+solve time and depth are taken from the first info line after which the engine
+never left a correct move again.
+
+Usage:
+    python -m src.epd_runner wac.epd --engine stockfish.exe --time 1 --csv wac.csv
+    python -m src.epd_runner sts/*.epd --depth 18 --workers 4 --option Threads=1 --option Hash=64
+    python -m src.epd_runner wac.epd --nodes 2000000 --min-solved 280   # exit 1 below 280 solved
+
+Use --depth or --nodes rather than --time when results must be repeatable
+across runs and machines.
+"""
+import argparse
+import csv
+import glob
+import os
+import sys
+import time
+
+import chess
+import chess.engine
+
+from src.cpu_budget import BATCH, PRIORITY_CLASSES, budget
+from src.engine import EnginePool, parse_uci_options
+
+CSV_FIELDS = ["id", "fen", "bm", "am", "move", "solved", "solve_time", "solve_depth",
+              "depth", "nodes", "time"]
+
+
+def read_epd(paths):
+    """
+    Yield (id, board, bm moves, am moves) for every EPD line in the given files or globs.
+    A malformed line is reported as "path:line: reason" on stderr and yielded with board None,
+    so it still counts as a position (and a failure) in the suite.
+    """
+    for pattern in paths:
+        for path in sorted(glob.glob(pattern)) or [pattern]:
+            with open(path, encoding="utf-8") as f:
+                for number, line in enumerate(f, 1):
+                    line = line.strip()
+                    if not line or line.startswith("#"):
+                        continue
+                    try:
+                        board, ops = chess.Board.from_epd(line)
+                    except ValueError as e:
+                        print(f"{path}:{number}: {e}", file=sys.stderr)
+                        yield f"{os.path.basename(path)}:{number}", None, [], []
+                        continue
+                    position_id = ops.get("id") or f"{os.path.basename(path)}:{number}"
+                    yield position_id, board, list(ops.get("bm", [])), list(ops.get("am", []))
+
+
+def is_correct(move, bm, am):
+    if move is None:
+        return False
+    if bm and move not in bm:
+        return False
+    return move not in am
+
+
+def solve_position(handler, position, limit):
+    """Search one EPD position and return its CSV row."""
+    position_id, board, bm, am = position
+    if board is None:
+        # Malformed line (see read_epd): nothing to search, counted as unsolved
+        return dict({field: "" for field in CSV_FIELDS}, id=position_id, solved=0)
+    start = time.perf_counter()
+    move, infos = handler.search_infos(board, limit)
+    wall = time.perf_counter() - start
+
+    lines = [info for info in infos if info.get("pv") and info.get("multipv", 1) == 1]
+    solve_time = solve_depth = None
+    if is_correct(move, bm, am):
+        # First info of the final unbroken run of correct moves
+        for info in reversed(lines):
+            if not is_correct(info["pv"][0], bm, am):
+                break
+            solve_time = info.get("time", wall)
+            solve_depth = info.get("depth")
+        if solve_time is None:
+            solve_time = wall
+
+    last = lines[-1] if lines else {}
+    return {
+        "id": position_id,
+        "fen": board.fen(),
+        "bm": " ".join(board.san(m) for m in bm),
+        "am": " ".join(board.san(m) for m in am),
+        "move": board.san(move) if move else "",
+        "solved": int(solve_time is not None),
+        "solve_time": f"{solve_time:.3f}" if solve_time is not None else "",
+        "solve_depth": solve_depth if solve_depth is not None else "",
+        "depth": last.get("depth", ""),
+        "nodes": last.get("nodes", ""),
+        "time": f"{last.get('time', wall):.3f}",
+    }
+
+
+def run_suite(positions, pool, limit, on_result=None):
+    """Solve every position across the pool; returns the rows in input order."""
+    rows = []
+    for row in pool.map(lambda handler, position: solve_position(handler, position, limit), positions):
+        rows.append(row)
+        if on_result:
+            on_result(row)
+    return rows
+
+
+def summarize(rows, wall_seconds):
+    solved = [r for r in rows if r["solved"]]
+    times = sorted(float(r["solve_time"]) for r in solved)
+    depths = [r["solve_depth"] for r in solved if r["solve_depth"] != ""]
+    return {
+        "positions": len(rows),
+        "solved": len(solved),
+        "solved_percent": 100.0 * len(solved) / len(rows) if rows else 0.0,
+        "mean_solve_time": sum(times) / len(times) if times else None,
+        "median_solve_time": times[len(times) // 2] if times else None,
+        "mean_solve_depth": sum(depths) / len(depths) if depths else None,
+        "wall_seconds": wall_seconds,
+        "positions_per_second": len(rows) / wall_seconds if wall_seconds > 0 else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run EPD test suites across a pool of UCI engines.")
+    parser.add_argument("epd", nargs="+", help="EPD files or glob patterns")
+    parser.add_argument("--engine", default="stockfish.exe", help="Engine executable")
+    parser.add_argument("--engine-arg", action="append", default=[], help="Extra engine command line argument")
+    parser.add_argument("--option", action="append", default=[], metavar="NAME=VALUE",
+                        help="UCI option for every engine (default Threads=1)")
+    parser.add_argument("--workers", type=int, help="Engines in the pool (default: cores of the priority class / Threads)")
+    parser.add_argument("--priority", choices=list(PRIORITY_CLASSES), default=BATCH,
+                        help="Engine priority class: niceness and CPU affinity (default: batch)")
+    parser.add_argument("--time", type=float, help="Seconds per position")
+    parser.add_argument("--depth", type=int, help="Depth per position")
+    parser.add_argument("--nodes", type=int, help="Nodes per position")
+    parser.add_argument("--csv", help="Write one row per position to this CSV file")
+    parser.add_argument("--min-solved", type=int, help="Exit with status 1 when fewer positions are solved")
+    parser.add_argument("--quiet", action="store_true", help="Only print the summary")
+    args = parser.parse_args(argv)
+
+    if args.time is None and args.depth is None and args.nodes is None:
+        args.time = 1.0
+    limit = chess.engine.Limit(time=args.time, depth=args.depth, nodes=args.nodes)
+
+    options = parse_uci_options(args.option)
+    options.setdefault("Threads", "1")
+    workers = args.workers or budget.default_engines(args.priority, options["Threads"])
+
+    positions = list(read_epd(args.epd))
+    if not positions:
+        print("No EPD positions found", file=sys.stderr)
+        return 1
+
+    pool = EnginePool(workers, args.engine, args.engine_arg, engine_options=options, priority=args.priority)
+    success, msg = pool.initialize()
+    if not success:
+        print(msg, file=sys.stderr)
+        return 1
+
+    def report(row):
+        if not args.quiet:
+            status = f"solved in {row['solve_time']}s (depth {row['solve_depth']})" if row["solved"] else "FAILED"
+            target = f"bm {row['bm']}" if row["bm"] else f"am {row['am']}"
+            print(f"{row['id']:<20} {row['move']:<8} {target:<14} {status}")
+
+    start = time.perf_counter()
+    try:
+        rows = run_suite(positions, pool, limit, on_result=report)
+    finally:
+        pool.quit()
+    summary = summarize(rows, time.perf_counter() - start)
+
+    if args.csv:
+        with open(args.csv, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+
+    print(f"\nSolved {summary['solved']}/{summary['positions']} ({summary['solved_percent']:.1f}%) "
+          f"in {summary['wall_seconds']:.1f}s with {workers} engines "
+          f"({summary['positions_per_second']:.2f} positions/s)")
+    if summary["mean_solve_time"] is not None:
+        depth = f", mean depth {summary['mean_solve_depth']:.1f}" if summary["mean_solve_depth"] is not None else ""
+        print(f"Solve time: mean {summary['mean_solve_time']:.3f}s, median {summary['median_solve_time']:.3f}s{depth}")
+
+    if args.min_solved is not None and summary["solved"] < args.min_solved:
+        print(f"Regression: {summary['solved']} solved, expected at least {args.min_solved}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,28 +1,145 @@
 import chess
 
+# Why a position is illegal, for the editor's status line (chess.Board.status() flags, most basic first)
+STATUS_MESSAGES = [
+    (chess.STATUS_EMPTY, "The board is empty"),
+    (chess.STATUS_NO_WHITE_KING, "White has no king"),
+    (chess.STATUS_NO_BLACK_KING, "Black has no king"),
+    (chess.STATUS_TOO_MANY_KINGS, "Too many kings"),
+    (chess.STATUS_PAWNS_ON_BACKRANK, "Pawns on the first or last rank"),
+    (chess.STATUS_TOO_MANY_WHITE_PAWNS, "White has more than 8 pawns"),
+    (chess.STATUS_TOO_MANY_BLACK_PAWNS, "Black has more than 8 pawns"),
+    (chess.STATUS_TOO_MANY_WHITE_PIECES, "White has more than 16 pieces"),
+    (chess.STATUS_TOO_MANY_BLACK_PIECES, "Black has more than 16 pieces"),
+    (chess.STATUS_OPPOSITE_CHECK, "The side not to move is in check"),
+    (chess.STATUS_TOO_MANY_CHECKERS, "Too many pieces giving check"),
+    (chess.STATUS_IMPOSSIBLE_CHECK, "Impossible check"),
+    (chess.STATUS_BAD_CASTLING_RIGHTS, "Bad castling rights"),
+    (chess.STATUS_INVALID_EP_SQUARE, "Bad en passant square"),
+]
+
+
 class GameState:
     def __init__(self):
         self.board = chess.Board()
+        # Bumped on every change made through this class; cached per-position data is keyed on it
+        self.version = 0
+        self._move_map = None
+        self._move_map_version = -1
+        self._status = chess.STATUS_VALID
+        self._status_version = -1
+
+    def changed(self):
+        """Call after editing self.board directly, so cached position data is rebuilt."""
+        self.version += 1
 
     def reset(self):
         self.board.reset()
+        self.changed()
+
+    def push(self, move):
+        self.board.push(move)
+        self.changed()
+
+    def pop(self):
+        move = self.board.pop()
+        self.changed()
+        return move
+
+    def set_fen(self, fen):
+        self.board.set_fen(fen)
+        self.changed()
+
+    def set_turn(self, color):
+        self.board.turn = color
+        self.changed()
+
+    def edit_turn(self, color):
+        """Board editor: change the side to move, keeping the rights consistent with it."""
+        self.board.turn = color
+        self.infer_rights()
+        self.changed()
 
     def make_move(self, uci_move):
         try:
             move = chess.Move.from_uci(uci_move)
             if move in self.board.legal_moves:
-                self.board.push(move)
+                self.push(move)
                 return True
             return False
         except:
             return False
 
     def set_piece(self, square, piece):
-        """Set a piece on the board directly."""
+        """Set a piece on the board directly (board editor). Castling and en passant rights follow the
+        new placement; check status()/is_valid() before handing the position to an engine."""
         self.board.set_piece_at(square, piece)
+        self.infer_rights()
+        self.changed()
+
+    def infer_rights(self):
+        """Castling rights for every king and rook still on its home square; the en passant square is
+        kept only while a pawn could still have just made that double step."""
+        board = self.board
+        board.castling_rights = chess.BB_CORNERS
+        board.castling_rights = board.clean_castling_rights()
+        if board.ep_square is not None and board.status() & chess.STATUS_INVALID_EP_SQUARE:
+            board.ep_square = None
+
+    def status(self):
+        """chess.Board.status() flags for the current position, computed once per position."""
+        if self._status_version != self.version:
+            self._status = self.board.status()
+            self._status_version = self.version
+        return self._status
+
+    def is_valid(self):
+        return self.status() == chess.STATUS_VALID
+
+    def position_errors(self):
+        """Readable reasons the current position is illegal (empty when it is valid)."""
+        status = self.status()
+        return [message for flag, message in STATUS_MESSAGES if status & flag]
+
+    def legal_move_map(self):
+        """{from square: {to square: [legal moves]}} for the current position, generated once per position.
+        Promotions list every piece, queen first."""
+        if self._move_map_version != self.version:
+            move_map = {}
+            for move in self.board.legal_moves:
+                move_map.setdefault(move.from_square, {}).setdefault(move.to_square, []).append(move)
+            for destinations in move_map.values():
+                for moves in destinations.values():
+                    if len(moves) > 1:
+                        moves.sort(key=lambda m: -(m.promotion or 0))
+            self._move_map = move_map
+            self._move_map_version = self.version
+        return self._move_map
+
+    def destinations(self, square):
+        """{to square: [moves]} for the piece on `square` (empty if it cannot move)."""
+        return self.legal_move_map().get(square, {})
+
+    def find_move(self, from_square, to_square, promotion=chess.QUEEN):
+        """The legal move between two squares (promoting to `promotion`), or None."""
+        moves = self.destinations(from_square).get(to_square)
+        if not moves:
+            return None
+        for move in moves:
+            if move.promotion in (None, promotion):
+                return move
+        return moves[0]
 
     def get_fen(self):
         return self.board.fen()
 
+    def get_null_move_fen(self):
+        """FEN of the same position with the opponent to move, for threat analysis; None when in check."""
+        if self.board.is_check():
+            return None
+        board = self.board.copy(stack=False)
+        board.push(chess.Move.null())
+        return board.fen()
+
     def is_game_over(self):
         return self.board.is_game_over()
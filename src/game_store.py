@@ -0,0 +1,350 @@
+"""
+Compact binary game archive: PGN converted once, replayed without parsing.
+
+A store is a directory of append-only files:
+
+    moves.bin     every mainline move of every game, packed to 16 bits (src/packing.py), game after game
+    index.bin     one INDEX_DTYPE record per game: end offsets into moves.bin and headers.jsonl, flags
+    headers.jsonl one JSON object of PGN headers per game (the side table)
+    manifest.json game/move/header-byte counts, replaced atomically
+
+Readers trust only the counts in the manifest, so an interrupted conversion
+never exposes a half-written game, and reopening a store for writing cuts the
+files back to the last published state. moves.bin and index.bin are
+memory-mapped: a game's moves are a slice, and whole-archive statistics are
+NumPy operations over one array. Replaying skips SAN parsing and legality
+checks (the moves were legal when converted), which is where PGN reading
+spends its time.
+
+Only standard chess and Chess960 games are stored; comments, NAGs and
+variations are dropped.
+
+Usage:
+    python -m src.game_store convert archive/*.pgn --out data/games
+    python -m src.game_store info data/games
+    python -m src.game_store scan data/games                # replay every game, report plies/s
+    python -m src.game_store export data/games out.pgn --first 100 --count 10
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import chess
+import chess.pgn
+import numpy as np
+
+from src.game_state import GameState
+from src.packing import pack_move, unpack_move
+from src.puzzle_miner import iter_games
+
+INDEX_DTYPE = np.dtype([
+    ("moves_end", "<u8"),    # offset (in moves) just past this game's last move
+    ("headers_end", "<u8"),  # offset (in bytes) just past this game's headers.jsonl line
+    ("flags", "u1"),
+])
+FLAG_SETUP = 1      # starts from the FEN header
+FLAG_CHESS960 = 2
+MOVE_DTYPE = np.dtype("<u2")
+
+_MOVES = None  # every packed value -> chess.Move, built on first replay
+
+
+def _move_table():
+    global _MOVES
+    if _MOVES is None:
+        _MOVES = [unpack_move(value) for value in range(1 << 15)]
+    return _MOVES
+
+
+class _MainlineVisitor(chess.pgn.BaseVisitor):
+    """PGN visitor keeping only headers and packed mainline moves (no game tree)."""
+
+    def begin_game(self):
+        self.headers = {}
+        self.moves = []
+        self.errors = []
+        self.variant = None  # board class of the game; None when its start position is unreadable
+        self.chess960 = False
+
+    def visit_header(self, tagname, tagvalue):
+        self.headers[tagname] = tagvalue
+
+    def visit_board(self, board):
+        self.variant = type(board)
+        self.chess960 = board.chess960
+
+    def begin_variation(self):
+        return chess.pgn.SKIP
+
+    def visit_move(self, board, move):
+        self.moves.append(pack_move(move))
+
+    def handle_error(self, error):
+        self.errors.append(str(error))
+
+    def result(self):
+        return self
+
+
+def read_pgn(handle):
+    """Next game of an open PGN file as a visitor with .headers, .moves (packed), .variant, .chess960 and
+    .errors; or None at the end of the file."""
+    return chess.pgn.read_game(handle, Visitor=_MainlineVisitor)
+
+
+class GameStore:
+    """A game archive directory. Open it to read, or add() / add_pgn() and close() to grow it."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.manifest = {"games": 0, "moves": 0, "header_bytes": 0}
+        path = self._path("manifest.json")
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.manifest = json.load(f)
+        self._writers = None
+        self._moves = self._index = None
+        self._headers = None
+        self._headers_lock = threading.Lock()  # one file position, shared by every reading thread
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def __len__(self):
+        return self.manifest["games"]
+
+    # Writing
+
+    def _open_writers(self):
+        if self._writers is None:
+            # Drop anything written after the last published manifest (an interrupted run)
+            sizes = {"moves.bin": self.manifest["moves"] * MOVE_DTYPE.itemsize,
+                     "index.bin": self.manifest["games"] * INDEX_DTYPE.itemsize,
+                     "headers.jsonl": self.manifest["header_bytes"]}
+            self._writers = {}
+            for name, size in sizes.items():
+                f = open(self._path(name), "ab")
+                f.truncate(size)
+                self._writers[name] = f
+            self._moves = self._index = None  # memory maps are stale from here on
+        return self._writers
+
+    def add(self, headers, moves, chess960=False):
+        """Append one game: a header dict and its mainline as chess.Move objects or packed ints."""
+        writers = self._open_writers()
+        packed = np.array([m if isinstance(m, (int, np.integer)) else pack_move(m) for m in moves], dtype=MOVE_DTYPE)
+        line = (json.dumps(headers, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        flags = (FLAG_SETUP if "FEN" in headers else 0) | (FLAG_CHESS960 if chess960 else 0)
+        writers["moves.bin"].write(packed.tobytes())
+        writers["headers.jsonl"].write(line)
+        self.manifest["moves"] += len(packed)
+        self.manifest["header_bytes"] += len(line)
+        self.manifest["games"] += 1
+        record = np.array([(self.manifest["moves"], self.manifest["header_bytes"], flags)], dtype=INDEX_DTYPE)
+        writers["index.bin"].write(record.tobytes())
+        self._moves = self._index = None
+
+    def add_pgn(self, paths, flush_every=10000, on_progress=None):
+        """Convert every game of the PGN files/globs. Returns (games added, games skipped)."""
+        added = skipped = 0
+        for _, game in iter_games(paths, read=read_pgn):
+            if game.variant is not chess.Board:  # other variants, or an unreadable FEN
+                skipped += 1
+                continue
+            self.add(game.headers, game.moves, game.chess960)
+            added += 1
+            if added % flush_every == 0:
+                self.flush()
+                if on_progress:
+                    on_progress(added, skipped)
+        self.flush()
+        return added, skipped
+
+    def flush(self):
+        """Make every game added so far visible to readers."""
+        if self._writers is None:
+            return
+        for f in self._writers.values():
+            f.flush()
+            os.fsync(f.fileno())
+        tmp = self._path("manifest.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f)
+        os.replace(tmp, self._path("manifest.json"))
+        self._moves = self._index = None
+
+    def close(self):
+        self.flush()
+        if self._writers is not None:
+            for f in self._writers.values():
+                f.close()
+            self._writers = None
+        with self._headers_lock:
+            if self._headers is not None:
+                self._headers.close()
+                self._headers = None
+
+    # Reading
+
+    @property
+    def moves(self):
+        """All packed moves of the store, memory-mapped (uint16)."""
+        if self._moves is None:
+            self._moves = self._map("moves.bin", MOVE_DTYPE, self.manifest["moves"])
+        return self._moves
+
+    @property
+    def index(self):
+        """One INDEX_DTYPE record per game, memory-mapped."""
+        if self._index is None:
+            self._index = self._map("index.bin", INDEX_DTYPE, self.manifest["games"])
+        return self._index
+
+    def _map(self, name, dtype, count):
+        if self._writers is not None:
+            self._writers[name].flush()  # games added but not yet flushed are readable by this instance
+        if count == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(self._path(name), dtype=dtype, mode="r", shape=(count,))
+
+    def lengths(self):
+        """Number of plies of every game."""
+        ends = self.index["moves_end"].astype(np.int64)
+        return np.diff(ends, prepend=0)
+
+    def game_moves(self, game):
+        """Packed moves of one game (a view into the memory map)."""
+        end = int(self.index[game]["moves_end"])
+        start = int(self.index[game - 1]["moves_end"]) if game else 0
+        return self.moves[start:end]
+
+    def headers(self, game):
+        end = int(self.index[game]["headers_end"])
+        start = int(self.index[game - 1]["headers_end"]) if game else 0
+        with self._headers_lock:
+            if self._writers is not None:
+                self._writers["headers.jsonl"].flush()
+            if self._headers is None:
+                self._headers = open(self._path("headers.jsonl"), "rb")
+            self._headers.seek(start)
+            data = self._headers.read(end - start)
+        return json.loads(data)
+
+    def start_board(self, game):
+        flags = int(self.index[game]["flags"])
+        if flags & FLAG_SETUP:
+            board = chess.pgn.Headers(self.headers(game)).board()
+        else:
+            board = chess.Board()
+        board.chess960 = bool(flags & FLAG_CHESS960)
+        return board
+
+    def replay(self, game, board=None):
+        """
+        Yield the board before each move and the final position, i.e. len(game) + 1 times.
+        The same board object is updated in place; copy it to keep a position.
+        """
+        table = _move_table()
+        board = board if board is not None else self.start_board(game)
+        yield board
+        for value in self.game_moves(game).tolist():
+            board.push(table[value])
+            yield board
+
+    def board(self, game, ply=None):
+        """chess.Board after `ply` moves of a game (default: the final position), with its move stack."""
+        moves = self.game_moves(game).tolist()
+        board = self.start_board(game)
+        table = _move_table()
+        for value in moves[:ply]:
+            board.push(table[value])
+        return board
+
+    def game_state(self, game, ply=None):
+        """A GameState at that point of the game, e.g. to open it on the board."""
+        state = GameState()
+        state.board = self.board(game, ply)
+        state.changed()
+        return state
+
+    def to_pgn(self, game):
+        """chess.pgn.Game with the stored headers and mainline."""
+        pgn = chess.pgn.Game.from_board(self.board(game))
+        pgn.headers.clear()
+        pgn.headers.update(self.headers(game))
+        return pgn
+
+    def iter_positions(self, games=None):
+        """Yield (game, ply, board) for every position of the given games (default: all), board reused."""
+        for game in range(len(self)) if games is None else games:
+            for ply, board in enumerate(self.replay(game)):
+                yield game, ply, board
+
+
+def is_game_store(path):
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, "manifest.json")) and \
+        os.path.exists(os.path.join(path, "moves.bin"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert PGN archives to a binary game store and read them back.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    convert = sub.add_parser("convert", help="Append PGN files (globs allowed) to a store")
+    convert.add_argument("pgn", nargs="+")
+    convert.add_argument("--out", required=True, help="Store directory (created, or appended to)")
+    info = sub.add_parser("info", help="Games, moves and size on disk")
+    info.add_argument("store")
+    scan = sub.add_parser("scan", help="Replay every position, as batch analysis would")
+    scan.add_argument("store")
+    export = sub.add_parser("export", help="Games back to PGN")
+    export.add_argument("store")
+    export.add_argument("pgn")
+    export.add_argument("--first", type=int, default=0)
+    export.add_argument("--count", type=int)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.command == "convert":
+        store = GameStore(args.out)
+
+        def _progress(added, skipped):
+            rate = added / max(1e-9, time.perf_counter() - start)
+            print(f"{added} games ({rate:.0f}/s), {skipped} skipped", file=sys.stderr)
+
+        try:
+            added, skipped = store.add_pgn(args.pgn, on_progress=_progress)
+        finally:
+            store.close()
+        print(f"{added} games added ({skipped} skipped) in {time.perf_counter() - start:.1f}s; "
+              f"{len(store)} games in {args.out}")
+        return 0
+
+    store = GameStore(args.store)
+    if args.command == "info":
+        size = sum(os.path.getsize(store._path(name)) for name in ["moves.bin", "index.bin", "headers.jsonl"]
+                   if os.path.exists(store._path(name)))
+        lengths = store.lengths()
+        print(f"{len(store)} games, {store.manifest['moves']} moves, {size / 1e6:.1f} MB; "
+              f"average {lengths.mean() if len(lengths) else 0:.1f} plies, longest {lengths.max(initial=0)}")
+        return 0
+    if args.command == "scan":
+        positions = sum(1 for _ in store.iter_positions())
+        elapsed = time.perf_counter() - start
+        print(f"{positions} positions from {len(store)} games in {elapsed:.2f}s "
+              f"({positions / max(1e-9, elapsed):.0f} positions/s)")
+        return 0
+
+    last = len(store) if args.count is None else min(len(store), args.first + args.count)
+    with open(args.pgn, "w", encoding="utf-8") as f:
+        for game in range(args.first, last):
+            print(store.to_pgn(game), file=f, end="\n\n")
+    print(f"{max(0, last - args.first)} games written to {args.pgn}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,8 @@
 import customtkinter as ctk
+from tkinter import filedialog
 import threading
 import chess
+import os
 import time
 from src.game_state import GameState
 from src.engine import EngineHandler
@@ -8,8 +10,23 @@ from src.board_ui import BoardUI
 from src.overlay import SelectionOverlay, ProjectionOverlay
 from src.vision import VisionHandler
 from src.mirror import MirrorHandler
+from src.metrics_panel import MetricsPanel
+from src.profiler import SamplingProfiler
+from src.move_ranker import MoveRanker
+from src.move_list import MoveList
+from src.engine import EnginePool
+from src.analysis_cache import AnalysisCache
+from src.analysis_scheduler import AnalysisScheduler
+from src.analysis_tab import AnalysisTab
+from src.compare_panel import ComparePanel
+from src.similar_panel import SimilarPanel
+from src.position_index import PositionIndex
+from src.cpu_budget import BACKGROUND, INTERACTIVE
 
 class ChessApp(ctk.CTk):
+    # Quiet time after the last board-editor change before the position is analysed
+    EDIT_ANALYSIS_DELAY_MS = 400
+
     def __init__(self):
         super().__init__()
         
@@ -19,7 +36,19 @@ class ChessApp(ctk.CTk):
         
         # Initialize Logic
         self.game_state = GameState()
-        self.engine = EngineHandler()
+        # Interactive engines preempt background work (analysis tabs, engine comparison) while they search
+        self.engine = EngineHandler(priority=INTERACTIVE)
+        # Second engine slot for threat analysis (null-move position), so it never queues behind best moves
+        self.threat_engine = EngineHandler(engine_options={"Threads": 1}, priority=INTERACTIVE)
+        self.analysis_generation = 0  # bumped per request; late results for older positions are dropped
+        self.ranking_stop = threading.Event()  # set with each new generation to abort the running ranking pass
+        self.edit_analysis_job = None  # pending debounced analysis of an edited position
+        # Analysis board tabs share one engine pool (started with the first tab) and one cache
+        self.analysis_cache = AnalysisCache()
+        self.analysis_pool = None
+        self.scheduler = None
+        self.analysis_tabs = {}
+        self.board_count = 0
         self.vision = VisionHandler()
         self.mirror = MirrorHandler()
         
@@ -52,6 +81,27 @@ class ChessApp(ctk.CTk):
         self.status_label = ctk.CTkLabel(self.sidebar, text="Status: Idle", anchor="w")
         self.status_label.grid(row=4, column=0, padx=20, pady=(20, 0), sticky="ew")
 
+        self.metrics_btn = ctk.CTkButton(self.sidebar, text="Metrics", command=self.open_metrics_panel,
+                                         fg_color="gray30", hover_color="gray40")
+        self.metrics_btn.grid(row=5, column=0, padx=20, pady=(20, 10))
+        self.metrics_panel = None
+
+        self.profile_btn = ctk.CTkButton(self.sidebar, text="Profile (10s)", command=self.toggle_profiling,
+                                         fg_color="gray30", hover_color="gray40")
+        self.profile_btn.grid(row=6, column=0, padx=20, pady=10)
+        self.profiler = None
+
+        self.new_board_btn = ctk.CTkButton(self.sidebar, text="New Analysis Board", command=self.add_analysis_board,
+                                           fg_color="gray30", hover_color="gray40")
+        self.new_board_btn.grid(row=7, column=0, padx=20, pady=10)
+
+        self.compare_btn = ctk.CTkButton(self.sidebar, text="Compare Engines", command=self.open_compare_panel,
+                                         fg_color="gray30", hover_color="gray40")
+        self.compare_btn.grid(row=8, column=0, padx=20, pady=10)
+        self.compare_panel = None
+        self.similar_panel = None
+        self.position_index = None  # game store searched by the analysis boards' Similar button
+
         # Content Area
         self.content_frame = ctk.CTkFrame(self, corner_radius=0, fg_color="transparent")
         self.content_frame.grid(row=0, column=1, sticky="nsew")
@@ -75,6 +125,20 @@ class ChessApp(ctk.CTk):
         self.board_ui = None
         self.start_local_game()
 
+        self.closing = False
+        self.protocol("WM_DELETE_WINDOW", self.on_closing)
+
+    def on_closing(self):
+        """Stop the analysis scheduler and quit every engine before the window goes away."""
+        self.closing = True
+        if self.scheduler is not None:
+            self.scheduler.stop()
+        if self.analysis_pool is not None:
+            self.analysis_pool.quit()
+        self.engine.quit()
+        self.threat_engine.quit()
+        self.destroy()
+
     def toggle_sidebar(self):
         if self.sidebar_visible:
             self.sidebar.grid_remove()
@@ -88,12 +152,74 @@ class ChessApp(ctk.CTk):
             self.sidebar_visible = True
             self.sidebar_toggle_btn.configure(fg_color="gray20")
 
+    def open_metrics_panel(self):
+        if self.metrics_panel is not None and self.metrics_panel.winfo_exists():
+            self.metrics_panel.focus()
+            return
+        self.metrics_panel = MetricsPanel(self)
+
+    def open_compare_panel(self):
+        """Side-by-side analysis of the game position by every engine in engines.json."""
+        if self.compare_panel is not None and self.compare_panel.winfo_exists():
+            self.compare_panel.focus()
+            return
+        self.compare_panel = ComparePanel(self, self.game_state)
+
+    def open_similar_panel(self, tab):
+        """Games of a game store with positions like the tab's; the store is asked for on first use."""
+        if self.position_index is None:
+            directory = filedialog.askdirectory(parent=self, title="Game store to search")
+            if not directory:
+                return
+            index = PositionIndex(directory)
+            if not index.built:
+                self.status_label.configure(text="No position signatures: run python -m src.position_index build")
+                return
+            self.position_index = index
+        if self.similar_panel is not None and self.similar_panel.winfo_exists():
+            self.similar_panel.destroy()
+        self.similar_panel = SimilarPanel(self, tab, self.position_index)
+
+    def current_mode(self):
+        """Short label for what the app is doing, used to tag profiles."""
+        if self.mirroring:
+            return "mirroring"
+        if hasattr(self, 'edit_mode_var') and self.edit_mode_var.get():
+            return "edit"
+        if hasattr(self, 'analysis_var') and self.analysis_var.get():
+            return "analysis"
+        if hasattr(self, 'two_player_var') and self.two_player_var.get():
+            return "two-player"
+        return "vs-ai"
+
+    def toggle_profiling(self, duration=10.0):
+        """Start a time-boxed capture of all threads, or stop the running one early."""
+        if self.profiler is not None and self.profiler.is_running:
+            # Don't join the sampler here: its on_finish posts back to this (Tk) thread
+            self.profiler.stop(wait=False)
+            return
+        self.profiler = SamplingProfiler(label=self.current_mode())
+        self.profile_btn.configure(text="Stop Profiling")
+        self.profiler.start(duration, on_finish=lambda p: self.after(0, lambda: self.on_profile_finished(p)))
+
+    def on_profile_finished(self, profiler):
+        path = profiler.write(profiler.default_path())
+        self.profile_btn.configure(text="Profile (10s)")
+        self.status_label.configure(text=f"Profile saved: {os.path.basename(path)}")
+        print(f"Profile: {profiler.sample_count} samples over {profiler.elapsed:.1f}s -> {path}")
+        for line in profiler.summary(5):
+            print(f"  {line}")
+
     def init_engine_thread(self):
         def _init():
             success, msg = self.engine.initialize_engine()
             self.after(0, lambda: self.status_label.configure(text="Engine: Ready" if success else "Engine: Not Found"))
             if not success:
                 print(msg)
+                return
+            threat_success, threat_msg = self.threat_engine.initialize_engine()
+            if not threat_success:
+                print(f"Threat analysis disabled: {threat_msg}")
         threading.Thread(target=_init, daemon=True).start()
 
     def start_local_game(self):
@@ -102,11 +228,19 @@ class ChessApp(ctk.CTk):
         # Clear content
         for widget in self.content_frame.winfo_children():
             widget.destroy()
+        self.analysis_tabs = {}
             
         self.game_state.reset()
+
+        # One tab for the game, more for analysis boards
+        self.tabview = ctk.CTkTabview(self.content_frame, command=self.on_tab_change)
+        self.tabview.grid(row=0, column=0, sticky="nsew")
+        game_tab = self.tabview.add("Game")
+        game_tab.grid_rowconfigure(0, weight=1)
+        game_tab.grid_columnconfigure(0, weight=1)
         
         # Controls Frame (horizontal layout for controls)
-        self.controls_frame = ctk.CTkFrame(self.content_frame, fg_color="transparent")
+        self.controls_frame = ctk.CTkFrame(game_tab, fg_color="transparent")
         self.controls_frame.grid(row=1, column=0, pady=10, sticky="ew")
         
         # Left controls
@@ -146,17 +280,17 @@ class ChessApp(ctk.CTk):
         moves_label.pack(side="left", padx=(0, 5))
         self.best_moves_var = ctk.StringVar(value="3")
         self.best_moves_menu = ctk.CTkOptionMenu(right_frame, variable=self.best_moves_var, 
-                                                  values=["1", "2", "3"],
+                                                  values=["1", "2", "3", "5", "All"],
                                                   command=self.on_best_moves_change,
                                                   width=60)
         self.best_moves_menu.pack(side="left", padx=5)
         
         # Board UI
-        self.board_ui = BoardUI(self.content_frame, self.game_state)
+        self.board_ui = BoardUI(game_tab, self.game_state)
         self.board_ui.grid(row=0, column=0, padx=20, pady=20, sticky="nsew")
         
         # Toggles Frame
-        toggles_frame = ctk.CTkFrame(self.content_frame, fg_color="transparent")
+        toggles_frame = ctk.CTkFrame(game_tab, fg_color="transparent")
         toggles_frame.grid(row=2, column=0, pady=5)
         
         # Analysis Toggle
@@ -182,20 +316,79 @@ class ChessApp(ctk.CTk):
         self.edit_mode_switch.pack(side="left", padx=15)
         
         # Piece Palette (Hidden by default)
-        self.palette_frame = ctk.CTkFrame(self.content_frame, fg_color="transparent")
+        self.palette_frame = ctk.CTkFrame(game_tab, fg_color="transparent")
         self.palette_frame.grid(row=3, column=0, pady=5)
         self.palette_frame.grid_remove()
         
         self.init_palette()
 
         # Score display label
-        self.score_label = ctk.CTkLabel(self.content_frame, text="", font=("Arial", 12))
+        self.score_label = ctk.CTkLabel(game_tab, text="", font=("Arial", 12))
         self.score_label.grid(row=4, column=0, pady=5)
+
+        # Threat display label (dashed red arrows on the board)
+        self.threat_label = ctk.CTkLabel(game_tab, text="", font=("Arial", 12), text_color="#FF6060")
+        self.threat_label.grid(row=5, column=0, pady=(0, 5))
+
+        # Ranking of every legal move ("Show Best Moves: All"), hidden otherwise
+        self.move_list = MoveList(game_tab, width=420)
+        self.move_list.grid(row=0, column=1, rowspan=6, padx=(0, 20), pady=20, sticky="ns")
+        self.move_list.grid_remove()
         
         # Bind move event
         self.bind("<<MoveMade>>", self.on_move_made)
+        self.bind("<<PositionEdited>>", self.on_position_edited)
         self.status_label.configure(text="Mode: vs AI (White)")
 
+    def ensure_scheduler(self):
+        """Create the shared analysis scheduler; its engine pool starts in the background."""
+        if self.scheduler is None:
+            self.analysis_pool = EnginePool(priority=BACKGROUND)
+            self.scheduler = AnalysisScheduler(self.analysis_pool, self.analysis_cache)
+
+            def _init():
+                success, msg = self.analysis_pool.initialize()
+                if self.closing:
+                    self.analysis_pool.quit()  # the window closed while the engines were starting
+                    return
+                if success:
+                    self.scheduler.start()
+                self.after(0, lambda: self.status_label.configure(text=msg))
+            threading.Thread(target=_init, daemon=True).start()
+        return self.scheduler
+
+    def add_analysis_board(self):
+        """Open a new analysis tab on the current game position and show it."""
+        if self.mirroring or not hasattr(self, 'tabview'):
+            return
+        self.board_count += 1
+        name = f"Board {self.board_count}"
+        frame = self.tabview.add(name)
+        frame.grid_rowconfigure(0, weight=1)
+        frame.grid_columnconfigure(0, weight=1)
+        tab = AnalysisTab(frame, name, self.ensure_scheduler(), fen=self.game_state.get_fen(),
+                          find_similar=self.open_similar_panel, on_close=self.close_analysis_board)
+        tab.grid(row=0, column=0, sticky="nsew")
+        self.analysis_tabs[name] = tab
+        self.tabview.set(name)
+        self.on_tab_change()
+
+    def close_analysis_board(self, tab):
+        """Remove one analysis tab; destroying it cancels its scheduler job."""
+        if self.analysis_tabs.get(tab.name) is not tab:
+            return
+        del self.analysis_tabs[tab.name]
+        if self.tabview.get() == tab.name:
+            self.tabview.set("Game")
+        self.tabview.delete(tab.name)
+        self.on_tab_change()
+
+    def on_tab_change(self):
+        """The visible analysis board gets first call on the engines; the others deepen with what is left."""
+        if self.scheduler is not None:
+            name = self.tabview.get()
+            self.scheduler.set_visible(name if name in self.analysis_tabs else None)
+
     def start_screen_mirroring(self):
         self.status_label.configure(text="Select Region to Mirror to...")
         self.withdraw() # Hide main win
@@ -248,7 +441,25 @@ class ChessApp(ctk.CTk):
         if self.analysis_var.get():
             self.update_analysis()
         else:
-            self.board_ui.canvas.delete("arrow")
+            self.clear_analysis()
+
+    def next_analysis_generation(self):
+        """Start a new analysis generation: older results are dropped and a running ranking is stopped."""
+        self.analysis_generation += 1
+        self.ranking_stop.set()
+        self.ranking_stop = threading.Event()
+        return self.analysis_generation
+
+    def clear_analysis(self):
+        """Remove arrows, scores and the move list; results still in flight are dropped."""
+        self.next_analysis_generation()
+        self.board_ui.last_analysis_moves = []
+        self.board_ui.last_threat_moves = []
+        self.board_ui.canvas.delete("arrow")
+        self.board_ui.canvas.delete("threat")
+        self.threat_label.configure(text="")
+        self.score_label.configure(text="")
+        self.move_list.clear()
 
     def toggle_two_player(self):
         if self.two_player_var.get():
@@ -316,14 +527,39 @@ class ChessApp(ctk.CTk):
         else:
             self.palette_frame.grid_remove()
             self.status_label.configure(text="Edit Mode Disabled")
+            if not self.game_state.is_valid():
+                self.status_label.configure(text="Invalid position: " + "; ".join(self.game_state.position_errors()))
+                return
             # Resume game logic state
             turn_str = "White" if self.game_state.board.turn == chess.WHITE else "Black"
             self.status_label.configure(text=f"Your Turn ({turn_str})")
 
+    def on_position_edited(self, event=None):
+        """Board editor change: report whether the position is legal and analyse it once edits pause."""
+        if self.edit_analysis_job is not None:
+            self.after_cancel(self.edit_analysis_job)
+            self.edit_analysis_job = None
+        errors = self.game_state.position_errors()
+        if errors:
+            self.status_label.configure(text="Invalid position: " + "; ".join(errors))
+            self.clear_analysis()
+            return
+        turn = "White" if self.game_state.board.turn == chess.WHITE else "Black"
+        self.status_label.configure(text=f"Edit Mode: valid position, {turn} to move")
+        if self.analysis_var.get():
+            self.edit_analysis_job = self.after(self.EDIT_ANALYSIS_DELAY_MS, self.run_edit_analysis)
+
+    def run_edit_analysis(self):
+        self.edit_analysis_job = None
+        self.update_analysis()
+
     def on_first_move_change(self, value):
         """Handle first move color change."""
         if self.edit_mode_var.get():
-             return # Do not reset if editing
+            # Editing: only the side to move changes (it decides e.g. whether a check is legal)
+            self.game_state.edit_turn(chess.BLACK if value == "Black" else chess.WHITE)
+            self.on_position_edited()
+            return
         self.reset_game()
 
     def reset_game(self):
@@ -332,7 +568,7 @@ class ChessApp(ctk.CTk):
         
         # Set turn based on First Move selection
         first_move_color = chess.BLACK if self.first_move_var.get() == "Black" else chess.WHITE
-        self.game_state.board.turn = first_move_color
+        self.game_state.set_turn(first_move_color)
         
         play_as = self.play_as_var.get()
         
@@ -356,23 +592,71 @@ class ChessApp(ctk.CTk):
         
     def on_best_moves_change(self, value):
         """Handle best moves count change."""
+        if value == "All":
+            self.move_list.grid()
+        else:
+            self.move_list.grid_remove()
+            self.move_list.clear()
         if self.analysis_var.get():
             self.update_analysis()
 
     def update_analysis(self):
         if not self.analysis_var.get():
             return
-            
+        if not self.game_state.is_valid():
+            self.clear_analysis()  # an illegal position never reaches the engine
+            return
+
+        generation = self.next_analysis_generation()
+        ranking_stop = self.ranking_stop
+        fen = self.game_state.get_fen()
+        threat_fen = self.game_state.get_null_move_fen()
+        limit = self.best_moves_var.get() if hasattr(self, 'best_moves_var') else "3"
+        # With a single core the threat search would compete with the best-move search, so it waits its turn
+        threats_in_parallel = (os.cpu_count() or 1) > 1
+
+        def _threats():
+            threats = self.threat_engine.get_top_moves(threat_fen, limit=2, time_limit=0.5) if threat_fen else []
+            self.after(0, lambda: self.display_threat_results(threats, generation))
+
         def _analyze():
-            fen = self.game_state.get_fen()
-            limit = int(self.best_moves_var.get()) if hasattr(self, 'best_moves_var') else 3
-            top_moves = self.engine.get_top_moves(fen, limit=limit)
-            self.after(0, lambda: self.display_analysis_results(top_moves))
-            
+            if limit == "All":
+                # Shallow pass over every move first, then deeper passes over the best; each one is shown
+                def _show(ranking):
+                    self.after(0, lambda: self.display_ranking(fen, ranking, generation))
+
+                MoveRanker(self.engine).rank(fen, on_update=_show, stop_event=ranking_stop)
+            else:
+                top_moves = self.engine.get_top_moves(fen, limit=int(limit))
+                self.after(0, lambda: self.display_analysis_results(top_moves, generation))
+            if not threats_in_parallel:
+                _threats()
+
         threading.Thread(target=_analyze, daemon=True).start()
+        if threats_in_parallel:
+            threading.Thread(target=_threats, daemon=True).start()
 
-    def display_analysis_results(self, top_moves):
+    def display_threat_results(self, threats, generation=None):
+        """Show the opponent's threats (their best moves if it were their turn)."""
+        if generation is not None and generation != self.analysis_generation:
+            return
+        if hasattr(self, 'board_ui') and self.board_ui:
+            self.board_ui.display_threats(threats)
+        if hasattr(self, 'threat_label'):
+            text = "  |  ".join(f"Threat: {t['move']}" for t in threats[:1])
+            self.threat_label.configure(text=text)
+
+    def display_ranking(self, fen, ranking, generation=None):
+        """Show a (partial) all-moves ranking in the move list and the best three on the board."""
+        if generation is not None and generation != self.analysis_generation:
+            return
+        self.move_list.set_lines(fen, ranking)
+        self.display_analysis_results(ranking[:3], generation)
+
+    def display_analysis_results(self, top_moves, generation=None):
         """Display analysis results with scores."""
+        if generation is not None and generation != self.analysis_generation:
+            return
         if hasattr(self, 'board_ui') and self.board_ui:
             self.board_ui.display_analysis(top_moves)
         
@@ -398,8 +682,8 @@ class ChessApp(ctk.CTk):
                 else:
                     score_str = f"{score/100:+.2f}"
                     
-                colors = ["🟢", "🔵", "🟡"]
-                score_texts.append(f"{colors[i]} {move}: {score_str}")
+                colors = ["🟢", "🔵", "🟡", "🟠", "🟣"]
+                score_texts.append(f"{colors[i % len(colors)]} {move}: {score_str}")
             
             self.score_label.configure(text="  |  ".join(score_texts))
             
@@ -415,6 +699,9 @@ class ChessApp(ctk.CTk):
             self.score_label.configure(text="")
 
     def on_move_made(self, event=None):
+        if isinstance(getattr(event, "widget", None), AnalysisTab):
+            event.widget.request_analysis()  # a move on an analysis board, not in the game
+            return
         # Check for game over
         if self.game_state.is_game_over():
             result = self.game_state.board.result()
@@ -468,13 +755,13 @@ class ChessApp(ctk.CTk):
                 self.status_label.configure(text="Your Turn (White)")
 
     def make_ai_move(self):
-        if self.edit_mode_var.get():
+        if self.edit_mode_var.get() or not self.game_state.is_valid():
             return
             
         # AI plays best move
         best_move = self.engine.get_best_move(self.game_state.get_fen())
         if best_move:
-            self.game_state.board.push(best_move)
+            self.game_state.push(best_move)
             self.after(0, self.update_board_after_ai)
         else:
             self.after(0, lambda: self.status_label.configure(text="Engine Error"))
@@ -0,0 +1,343 @@
+"""
+Headless engine-vs-engine match runner with SPRT early stopping.
+
+Every opening is played twice with colours reversed. Games run concurrently,
+each on its own pair of engines borrowed from two EnginePools. Because only one
+side of a game is thinking at any moment, the default concurrency is one game
+per core divided by the engines' Threads, so the machine is fully used but not
+oversubscribed. Finished games are appended to the PGN file immediately.
+
+Usage:
+    python -m src.match_runner --first sf_new --second sf_old --games 2000 --nodes 20000 \\
+        --openings book.epd --pgn match.pgn --sprt 0 5
+    python -m src.match_runner --first a.exe --second b.exe --time 0.1 --first-option Hash=64 \\
+        --syzygy /tb/345 --resign-score 800 --draw-score 10
+"""
+import argparse
+import math
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import chess
+import chess.engine
+import chess.pgn
+
+from src.cpu_budget import BATCH, PRIORITY_CLASSES, budget
+from src.engine import EnginePool, parse_uci_options
+from src.game_state import GameState
+
+
+def load_openings(path):
+    """List of (start fen, [moves]) from an EPD/FEN file or the mainlines of a PGN file."""
+    openings = []
+    if path.lower().endswith(".pgn"):
+        with open(path, encoding="utf-8") as f:
+            while True:
+                game = chess.pgn.read_game(f)
+                if game is None:
+                    break
+                openings.append((game.board().fen(), list(game.mainline_moves())))
+    else:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    try:
+                        board = chess.Board(line)
+                    except ValueError:
+                        board, _ = chess.Board.from_epd(line)  # EPD with operations
+                    openings.append((board.fen(), []))
+    return openings
+
+
+class Adjudicator:
+    """
+    Ends games early: by tablebase when few pieces remain, resignation when both
+    engines agree one side is winning, or a draw when both see a dead-level score.
+    Scores are centipawns from White's point of view, one per ply.
+    """
+
+    def __init__(self, resign_score=None, resign_moves=3, draw_score=None, draw_moves=8,
+                 draw_min_ply=60, syzygy_path=None, max_plies=400):
+        self.resign_score = resign_score
+        self.resign_moves = resign_moves
+        self.draw_score = draw_score
+        self.draw_moves = draw_moves
+        self.draw_min_ply = draw_min_ply
+        self.max_plies = max_plies
+        self.tablebase = None
+        self.tablebase_lock = threading.Lock()
+        if syzygy_path:
+            import chess.syzygy
+            self.tablebase = chess.syzygy.open_tablebase(syzygy_path)
+
+    def check(self, board, scores):
+        """Return (result, reason) if the game should stop now, else None."""
+        outcome = board.outcome(claim_draw=True)
+        if outcome is not None:
+            return outcome.result(), outcome.termination.name.lower().replace("_", " ")
+
+        if self.tablebase is not None and chess.popcount(board.occupied) <= 7:
+            try:
+                with self.tablebase_lock:
+                    wdl = self.tablebase.probe_wdl(board)
+            except (KeyError, IndexError, OSError):
+                wdl = None
+            if wdl is not None:
+                if wdl == 0 or abs(wdl) == 1:  # cursed wins and blessed losses are draws under the 50-move rule
+                    return "1/2-1/2", "tablebase"
+                white_wins = (wdl > 0) == (board.turn == chess.WHITE)
+                return ("1-0" if white_wins else "0-1"), "tablebase"
+
+        plies = len(board.move_stack)
+        if self.resign_score is not None and len(scores) >= 2 * self.resign_moves:
+            recent = scores[-2 * self.resign_moves:]
+            if all(s is not None and s >= self.resign_score for s in recent):
+                return "1-0", "adjudication"
+            if all(s is not None and s <= -self.resign_score for s in recent):
+                return "0-1", "adjudication"
+
+        if self.draw_score is not None and plies >= self.draw_min_ply and len(scores) >= 2 * self.draw_moves:
+            if all(s is not None and abs(s) <= self.draw_score for s in scores[-2 * self.draw_moves:]):
+                return "1/2-1/2", "adjudication"
+
+        if plies >= self.max_plies:
+            return "1/2-1/2", "max plies"
+        return None
+
+
+def play_game(white, black, opening, limit, adjudicator):
+    """Play one game between two EngineHandlers; returns (GameState, result, reason)."""
+    state = GameState()
+    start_fen, opening_moves = opening
+    state.board.set_fen(start_fen)
+    for move in opening_moves:
+        state.make_move(move.uci())
+
+    game = object()  # a new identity per game makes python-chess send "ucinewgame"
+    scores = []
+    while True:
+        verdict = adjudicator.check(state.board, scores)
+        if verdict:
+            return state, verdict[0], verdict[1]
+
+        engine = white if state.board.turn == chess.WHITE else black
+        move, infos = engine.search_infos(state.board, limit, game=game)
+        if move is None or not state.make_move(move.uci()):
+            # A crashed, hung or illegal-moving engine loses the game
+            loser_is_white = engine is white
+            return state, ("0-1" if loser_is_white else "1-0"), "engine failure"
+
+        score = None
+        for info in reversed(infos):
+            if "score" in info and info.get("multipv", 1) == 1:
+                score = info["score"].white().score(mate_score=10000)
+                break
+        scores.append(score)
+
+
+class SPRT:
+    """
+    Sequential probability ratio test on game results (trinomial, logistic Elo),
+    H0: elo = elo0 vs H1: elo = elo1, from the first engine's point of view.
+    """
+
+    def __init__(self, elo0=0.0, elo1=5.0, alpha=0.05, beta=0.05):
+        self.elo0 = elo0
+        self.elo1 = elo1
+        self.lower = math.log(beta / (1 - alpha))
+        self.upper = math.log((1 - beta) / alpha)
+
+    @staticmethod
+    def expected_score(elo):
+        return 1.0 / (1.0 + 10.0 ** (-elo / 400.0))
+
+    def llr(self, wins, draws, losses):
+        n = wins + draws + losses
+        if n == 0 or wins + draws == 0 or losses + draws == 0:
+            return 0.0
+        score = (wins + 0.5 * draws) / n
+        variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / n
+        if variance <= 0:
+            return 0.0
+        s0, s1 = self.expected_score(self.elo0), self.expected_score(self.elo1)
+        return n * (s1 - s0) * (2 * score - s0 - s1) / (2 * variance)
+
+    def status(self, wins, draws, losses):
+        """'H1' (accept elo1), 'H0' (accept elo0) or None to continue."""
+        value = self.llr(wins, draws, losses)
+        if value >= self.upper:
+            return "H1"
+        if value <= self.lower:
+            return "H0"
+        return None
+
+
+def elo_estimate(wins, draws, losses):
+    """(elo difference, 95% error margin) for the first engine, or (None, None) while undefined."""
+    n = wins + draws + losses
+    if n == 0:
+        return None, None
+    score = (wins + 0.5 * draws) / n
+    if score <= 0 or score >= 1:
+        return None, None
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / n
+    margin = 1.96 * math.sqrt(variance / n)
+
+    def to_elo(s):
+        s = min(max(s, 1e-6), 1 - 1e-6)
+        return -400.0 * math.log10(1.0 / s - 1.0) + 0.0  # no "-0.0" at even scores
+
+    return to_elo(score), (to_elo(score + margin) - to_elo(score - margin)) / 2.0
+
+
+class MatchRunner:
+    def __init__(self, first_pool, second_pool, openings, limit, adjudicator, names=("first", "second"),
+                 sprt=None, pgn_path=None, concurrency=1, on_game=None):
+        self.pools = (first_pool, second_pool)
+        self.openings = openings or [(chess.STARTING_FEN, [])]
+        self.limit = limit
+        self.adjudicator = adjudicator
+        self.names = names
+        self.sprt = sprt
+        self.pgn_path = pgn_path
+        self.concurrency = concurrency
+        self.on_game = on_game
+        self.wins = self.draws = self.losses = 0  # from the first engine's point of view
+        self.games_played = 0
+        self.decision = None
+        self._pgn_lock = threading.Lock()
+
+    def _play(self, index):
+        opening = self.openings[(index // 2) % len(self.openings)]
+        first_is_white = index % 2 == 0
+        with self.pools[0].acquire() as first, self.pools[1].acquire() as second:
+            white, black = (first, second) if first_is_white else (second, first)
+            state, result, reason = play_game(white, black, opening, self.limit, self.adjudicator)
+        return index, first_is_white, state, result, reason
+
+    def _record(self, index, first_is_white, state, result, reason):
+        if result == "1/2-1/2":
+            self.draws += 1
+        elif (result == "1-0") == first_is_white:
+            self.wins += 1
+        else:
+            self.losses += 1
+        self.games_played += 1
+
+        if self.pgn_path:
+            game = chess.pgn.Game.from_board(state.board)
+            white, black = self.names if first_is_white else self.names[::-1]
+            game.headers.update({"Event": "CheckerChesser match", "Round": str(index + 1), "White": white,
+                                 "Black": black, "Result": result, "Termination": reason})
+            with self._pgn_lock, open(self.pgn_path, "a", encoding="utf-8") as f:
+                print(game, file=f, end="\n\n")
+
+        if self.sprt:
+            self.decision = self.sprt.status(self.wins, self.draws, self.losses)
+        if self.on_game:
+            self.on_game(self, index, result, reason)
+
+    def run(self, games):
+        """Play up to `games` games (rounded up to full opening pairs); stops early on an SPRT decision."""
+        games += games % 2
+        next_index = 0
+        running = set()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            while running or (next_index < games and self.decision is None):
+                while next_index < games and self.decision is None and len(running) < self.concurrency:
+                    running.add(executor.submit(self._play, next_index))
+                    next_index += 1
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self._record(*future.result())
+        return self.wins, self.draws, self.losses
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play concurrent engine-vs-engine matches with SPRT.")
+    for side in ("first", "second"):
+        parser.add_argument(f"--{side}", required=True, help=f"{side.title()} engine executable")
+        parser.add_argument(f"--{side}-name", help="Name in the PGN (default: engine file name)")
+        parser.add_argument(f"--{side}-arg", action="append", default=[], help="Extra engine command line argument")
+        parser.add_argument(f"--{side}-option", action="append", default=[], metavar="NAME=VALUE", help="UCI option")
+    parser.add_argument("--games", type=int, default=1000, help="Maximum number of games")
+    parser.add_argument("--concurrency", type=int, help="Games in parallel (default: cores of the priority class / Threads)")
+    parser.add_argument("--priority", choices=list(PRIORITY_CLASSES), default=BATCH,
+                        help="Engine priority class: niceness and CPU affinity (default: batch)")
+    parser.add_argument("--time", type=float, help="Seconds per move")
+    parser.add_argument("--nodes", type=int, help="Nodes per move")
+    parser.add_argument("--depth", type=int, help="Depth per move")
+    parser.add_argument("--openings", help="EPD/FEN or PGN file of openings; each is played with both colours")
+    parser.add_argument("--pgn", help="Append finished games to this PGN file")
+    parser.add_argument("--sprt", nargs=2, type=float, metavar=("ELO0", "ELO1"), help="Stop early with an SPRT")
+    parser.add_argument("--alpha", type=float, default=0.05)
+    parser.add_argument("--beta", type=float, default=0.05)
+    parser.add_argument("--resign-score", type=int, help="Adjudicate a win when both engines agree on this many cp")
+    parser.add_argument("--resign-moves", type=int, default=3)
+    parser.add_argument("--draw-score", type=int, help="Adjudicate a draw when scores stay within this many cp")
+    parser.add_argument("--draw-moves", type=int, default=8)
+    parser.add_argument("--draw-min-ply", type=int, default=60)
+    parser.add_argument("--max-plies", type=int, default=400)
+    parser.add_argument("--syzygy", help="Syzygy tablebase directory for adjudication")
+    args = parser.parse_args(argv)
+
+    if args.time is None and args.nodes is None and args.depth is None:
+        args.time = 0.1
+    limit = chess.engine.Limit(time=args.time, nodes=args.nodes, depth=args.depth)
+
+    options = [parse_uci_options(args.first_option), parse_uci_options(args.second_option)]
+    threads = 1
+    for opts in options:
+        opts.setdefault("Threads", "1")
+        threads = max(threads, int(opts["Threads"]))
+    concurrency = args.concurrency or budget.default_engines(args.priority, threads)
+
+    pools = []
+    for path, engine_args, opts in [(args.first, args.first_arg, options[0]), (args.second, args.second_arg, options[1])]:
+        pool = EnginePool(concurrency, path, engine_args, engine_options=opts, priority=args.priority)
+        success, msg = pool.initialize()
+        if not success:
+            print(msg, file=sys.stderr)
+            for p in pools:
+                p.quit()
+            return 1
+        pools.append(pool)
+
+    names = (args.first_name or os.path.basename(args.first), args.second_name or os.path.basename(args.second))
+    adjudicator = Adjudicator(args.resign_score, args.resign_moves, args.draw_score, args.draw_moves,
+                              args.draw_min_ply, args.syzygy, args.max_plies)
+    sprt = SPRT(args.sprt[0], args.sprt[1], args.alpha, args.beta) if args.sprt else None
+
+    def report(runner, index, result, reason):
+        elo, margin = elo_estimate(runner.wins, runner.draws, runner.losses)
+        elo_text = f"Elo {elo:+.1f} +/- {margin:.1f}" if elo is not None else "Elo n/a"
+        line = (f"Game {index + 1:>4} {result:<7} ({reason}) | {names[0]} vs {names[1]}: "
+                f"+{runner.wins} ={runner.draws} -{runner.losses} | {elo_text}")
+        if sprt:
+            line += f" | LLR {sprt.llr(runner.wins, runner.draws, runner.losses):+.2f} ({sprt.lower:.2f}, {sprt.upper:.2f})"
+        print(line)
+
+    runner = MatchRunner(pools[0], pools[1], load_openings(args.openings) if args.openings else None, limit,
+                         adjudicator, names, sprt, args.pgn, concurrency, on_game=report)
+    start = time.perf_counter()
+    try:
+        runner.run(args.games)
+    finally:
+        for pool in pools:
+            pool.quit()
+
+    elapsed = time.perf_counter() - start
+    print(f"\n{runner.games_played} games in {elapsed:.1f}s ({runner.games_played / elapsed:.2f} games/s, "
+          f"concurrency {concurrency})")
+    if runner.decision:
+        accepted = args.sprt[1] if runner.decision == "H1" else args.sprt[0]
+        print(f"SPRT: {runner.decision} accepted (elo = {accepted:g})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
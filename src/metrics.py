@@ -0,0 +1,223 @@
+"""
+Always-on counters and latency histograms for the hot paths.
+
+Histograms are HDR-style log-linear: values are recorded in microseconds into
+fixed buckets that are exact below 32us and keep ~6% relative precision above,
+so recording is a few integer operations and a list increment, and percentiles
+stay meaningful from microseconds to minutes without storing samples.
+
+Usage:
+    from src.metrics import registry
+
+    with registry.timer("engine_search_seconds"):
+        ...
+    registry.counter("engine_errors_total").inc()
+    registry.write("metrics.prom")   # or metrics.json
+"""
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+SUB_BITS = 5
+SUB_COUNT = 1 << SUB_BITS          # values below this get one bucket each
+HALF_COUNT = SUB_COUNT // 2        # buckets per power of two above that
+MAX_SHIFT = 40                     # ~12 days in microseconds; larger values are clamped
+BUCKET_COUNT = MAX_SHIFT * HALF_COUNT + SUB_COUNT
+
+
+def _bucket_index(micros):
+    if micros < SUB_COUNT:
+        return micros
+    shift = micros.bit_length() - SUB_BITS
+    if shift > MAX_SHIFT:
+        return BUCKET_COUNT - 1
+    return shift * HALF_COUNT + (micros >> shift)
+
+
+def _bucket_bounds(index):
+    """[low, high) in microseconds for a bucket index."""
+    if index < SUB_COUNT:
+        return index, index + 1
+    shift = (index - HALF_COUNT) // HALF_COUNT
+    mantissa = index - shift * HALF_COUNT
+    return mantissa << shift, (mantissa + 1) << shift
+
+
+class Counter:
+    def __init__(self, name, help=""):
+        self.name = name
+        self.help = help
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def snapshot(self):
+        return {"type": "counter", "value": self.value}
+
+    def reset(self):
+        with self._lock:
+            self.value = 0
+
+
+class Histogram:
+    """Latency histogram; record() takes seconds."""
+
+    def __init__(self, name, help=""):
+        self.name = name
+        self.help = help
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.buckets = [0] * BUCKET_COUNT
+            self.count = 0
+            self.total = 0.0
+            self.min = None
+            self.max = None
+
+    def record(self, seconds):
+        index = _bucket_index(max(0, int(seconds * 1e6)))
+        with self._lock:
+            self.buckets[index] += 1
+            self.count += 1
+            self.total += seconds
+            if self.min is None or seconds < self.min:
+                self.min = seconds
+            if self.max is None or seconds > self.max:
+                self.max = seconds
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(time.perf_counter() - start)
+
+    def percentile(self, p):
+        """Value in seconds below which p percent of recordings fall (bucket midpoint)."""
+        with self._lock:
+            if self.count == 0:
+                return None
+            target = max(1, int(round(p / 100.0 * self.count)))
+            seen = 0
+            for index, n in enumerate(self.buckets):
+                seen += n
+                if seen >= target:
+                    low, high = _bucket_bounds(index)
+                    value = (low + high - 1) / 2e6
+                    return min(max(value, self.min), self.max)
+        return self.max
+
+    def snapshot(self):
+        return {
+            "type": "histogram",
+            "count": self.count,
+            "sum": self.total,
+            "min": self.min,
+            "max": self.max,
+            "mean": self.total / self.count if self.count else None,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+        }
+
+    def cumulative_buckets(self):
+        """[(upper bound in seconds, cumulative count)] for the non-empty buckets."""
+        with self._lock:
+            buckets = list(self.buckets)
+        result, seen = [], 0
+        for index, n in enumerate(buckets):
+            if n:
+                seen += n
+                result.append((_bucket_bounds(index)[1] / 1e6, seen))
+        return result
+
+
+class MetricsRegistry:
+    def __init__(self, prefix="checkerchesser"):
+        self.prefix = prefix
+        self.metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help):
+        metric = self.metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self.metrics.setdefault(name, cls(name, help))
+        if not isinstance(metric, cls):
+            raise TypeError(f"Metric {name} is a {type(metric).__name__}, not a {cls.__name__}")
+        return metric
+
+    def counter(self, name, help=""):
+        return self._get(Counter, name, help)
+
+    def histogram(self, name, help=""):
+        return self._get(Histogram, name, help)
+
+    def timer(self, name, help=""):
+        """Context manager recording the elapsed time into histogram `name`."""
+        return self.histogram(name, help).time()
+
+    def _items(self):
+        """Sorted (name, metric) pairs, copied under the lock so other threads can keep registering."""
+        with self._lock:
+            return sorted(self.metrics.items())
+
+    def snapshot(self):
+        return {name: metric.snapshot() for name, metric in self._items()}
+
+    def reset(self):
+        for _, metric in self._items():
+            metric.reset()
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self):
+        """Prometheus text exposition format."""
+        lines = []
+        for name, metric in self._items():
+            full = f"{self.prefix}_{name}" if self.prefix else name
+            if metric.help:
+                lines.append(f"# HELP {full} {metric.help}")
+            if isinstance(metric, Counter):
+                lines.append(f"# TYPE {full} counter")
+                lines.append(f"{full} {metric.value}")
+            else:
+                lines.append(f"# TYPE {full} histogram")
+                for upper, cumulative in metric.cumulative_buckets():
+                    lines.append(f'{full}_bucket{{le="{upper:.6g}"}} {cumulative}')
+                lines.append(f'{full}_bucket{{le="+Inf"}} {metric.count}')
+                lines.append(f"{full}_sum {metric.total:.6f}")
+                lines.append(f"{full}_count {metric.count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Write a JSON (.json) or Prometheus text (anything else) snapshot to path."""
+        text = self.to_json() if path.lower().endswith(".json") else self.to_prometheus()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def format_table(self):
+        """Human-readable summary, for the debug panel."""
+        lines = []
+        for name, snap in self.snapshot().items():
+            if snap["type"] == "counter":
+                lines.append(f"{name:<36} {snap['value']:>10}")
+            elif snap["count"]:
+                lines.append(f"{name:<36} n={snap['count']:<7} mean {snap['mean'] * 1000:8.2f} ms  "
+                             f"p50 {snap['p50'] * 1000:8.2f}  p99 {snap['p99'] * 1000:8.2f}  "
+                             f"max {snap['max'] * 1000:8.2f}")
+            else:
+                lines.append(f"{name:<36} n=0")
+        return "\n".join(lines)
+
+
+# Process-wide registry used by the app
+registry = MetricsRegistry()
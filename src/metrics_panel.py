@@ -0,0 +1,59 @@
+import customtkinter as ctk
+from tkinter import filedialog
+
+from src.metrics import registry
+from src.uci_trace import dump_all
+
+
+class MetricsPanel(ctk.CTkToplevel):
+    """Debug window showing the live metrics registry, refreshed every second."""
+
+    REFRESH_MS = 1000
+
+    def __init__(self, master):
+        super().__init__(master)
+        self.title("Metrics")
+        self.geometry("760x360")
+
+        self.textbox = ctk.CTkTextbox(self, font=("Courier New", 12), wrap="none")
+        self.textbox.pack(fill="both", expand=True, padx=10, pady=(10, 5))
+
+        buttons = ctk.CTkFrame(self, fg_color="transparent")
+        buttons.pack(fill="x", padx=10, pady=(0, 10))
+        ctk.CTkButton(buttons, text="Export...", width=100, command=self.export).pack(side="left")
+        ctk.CTkButton(buttons, text="Reset", width=100, command=self.reset).pack(side="left", padx=10)
+        ctk.CTkButton(buttons, text="UCI Traces...", width=100, command=self.dump_traces).pack(side="left")
+        self.status_label = ctk.CTkLabel(buttons, text="", anchor="w")
+        self.status_label.pack(side="left", padx=10)
+
+        self.refresh()
+
+    def refresh(self):
+        if not self.winfo_exists():
+            return
+        self.render()
+        self.after(self.REFRESH_MS, self.refresh)
+
+    def render(self):
+        self.textbox.configure(state="normal")
+        self.textbox.delete("1.0", "end")
+        self.textbox.insert("1.0", registry.format_table() or "No metrics recorded yet.")
+        self.textbox.configure(state="disabled")
+
+    def export(self):
+        path = filedialog.asksaveasfilename(
+            parent=self, defaultextension=".prom", initialfile="metrics.prom",
+            filetypes=[("Prometheus text", "*.prom"), ("JSON", "*.json")])
+        if path:
+            registry.write(path)
+
+    def dump_traces(self):
+        """Save the recent UCI conversation of every running engine, one file each."""
+        directory = filedialog.askdirectory(parent=self, title="Folder for UCI traces")
+        if directory:
+            paths = dump_all(directory)
+            self.status_label.configure(text=f"{len(paths)} traces saved")
+
+    def reset(self):
+        registry.reset()
+        self.render()
@@ -0,0 +1,76 @@
+import customtkinter as ctk
+from tkinter import ttk
+
+import chess
+
+from src.engine import format_score
+
+
+class MoveList(ctk.CTkFrame):
+    """Sortable table of ranked moves; rows are replaced in place as the ranking is refined."""
+
+    COLUMNS = [("rank", "#", 36), ("move", "Move", 70), ("score", "Score", 64), ("depth", "Depth", 48),
+               ("line", "Line", 200)]
+
+    def __init__(self, master, **kwargs):
+        super().__init__(master, **kwargs)
+        self.sort_column = "rank"
+        self.sort_reverse = False
+        self.lines = []
+        self.fen = None
+
+        self.title_label = ctk.CTkLabel(self, text="All Moves", font=("Arial", 13, "bold"))
+        self.title_label.pack(anchor="w", padx=8, pady=(6, 2))
+
+        self.tree = ttk.Treeview(self, columns=[c[0] for c in self.COLUMNS], show="headings", height=20)
+        for column, heading, width in self.COLUMNS:
+            self.tree.heading(column, text=heading, command=lambda c=column: self.sort_by(c))
+            self.tree.column(column, width=width, anchor="w" if column == "line" else "center",
+                             stretch=column == "line")
+        scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.pack(side="left", fill="both", expand=True, padx=(8, 0), pady=(0, 8))
+        scrollbar.pack(side="right", fill="y", pady=(0, 8))
+
+    def set_lines(self, fen, lines):
+        """Show a ranking (MoveRanker / get_top_moves format) for the position `fen`."""
+        self.fen = fen
+        self.lines = list(lines)
+        self.render()
+
+    def clear(self):
+        self.set_lines(None, [])
+
+    def sort_by(self, column):
+        """Heading click: sort by that column, clicking again reverses."""
+        if column == self.sort_column:
+            self.sort_reverse = not self.sort_reverse
+        else:
+            self.sort_column = column
+            self.sort_reverse = column == "depth"  # deepest first is the useful default
+        self.render()
+
+    def render(self):
+        board = chess.Board(self.fen) if self.fen else None
+        rows = []
+        for line in self.lines:
+            move = line["move"]
+            rows.append({
+                "rank": line["rank"],
+                "move": board.san(move) if board else move.uci(),
+                "score": line["score"],
+                "depth": line.get("depth", ""),
+                "line": board.variation_san(line["pv"][:6]) if board and line.get("pv") else "",
+            })
+        if self.sort_column in ("move", "line"):
+            rows.sort(key=lambda row: row[self.sort_column], reverse=self.sort_reverse)
+        else:
+            rows.sort(key=lambda row: row[self.sort_column] if row[self.sort_column] != "" else -1,
+                      reverse=self.sort_reverse)
+
+        self.tree.delete(*self.tree.get_children())
+        for row in rows:
+            self.tree.insert("", "end", values=(row["rank"], row["move"], format_score(row["score"]),
+                                                row["depth"], row["line"]))
+        refined = max((row["depth"] for row in rows if row["depth"] != ""), default=None)
+        self.title_label.configure(text=f"All Moves ({len(rows)})" + (f"  depth {refined}" if refined else ""))
@@ -0,0 +1,91 @@
+"""
+Ranks every legal move of a position with iterative refinement.
+
+A single multipv search at a shallow depth scores all legal moves at once,
+which is far cheaper than one deep multipv=all search. The best `keep` moves
+are then searched again, restricted to themselves (UCI searchmoves), a few
+plies deeper; each round halves the candidate set and goes deeper still. After
+every pass the full ranking is reported, so a move list can show all moves
+almost immediately and let the top of the list firm up as the deeper passes
+come in.
+"""
+import chess
+import chess.engine
+
+MATE_SCORE = 10000
+
+
+class MoveRanker:
+    def __init__(self, handler, shallow_depth=8, depth_step=4, rounds=3, keep=8):
+        self.handler = handler
+        self.shallow_depth = shallow_depth
+        self.depth_step = depth_step
+        self.rounds = rounds
+        self.keep = keep
+
+    def _search(self, board, moves, depth, ranking, stop_event=None):
+        """
+        One multipv pass over `moves`; updates ranking in place. Returns False if the engine failed
+        or stop_event was set, leaving the ranking as it was (a cut-off pass scores moves unevenly).
+        """
+        if stop_event is not None and stop_event.is_set():
+            return False
+        _, infos = self.handler.search_infos(board, chess.engine.Limit(depth=depth), multipv=len(moves),
+                                             root_moves=moves, stop_event=stop_event)
+        if stop_event is not None and stop_event.is_set():
+            return False
+        lines = {}
+        for info in infos:
+            if info.get("pv") and "score" in info:
+                lines[info.get("multipv", 1)] = info
+        if not lines:
+            return False
+        for info in lines.values():
+            move = info["pv"][0]
+            ranking[move] = {
+                "move": move,
+                "score": info["score"].relative.score(mate_score=MATE_SCORE),
+                "depth": info.get("depth", depth),
+                "pv": list(info["pv"]),
+            }
+        return True
+
+    def rank(self, fen, on_update=None, should_continue=None, stop_event=None):
+        """
+        Rank all legal moves of `fen`, best first, in the format of EngineHandler.get_top_moves
+        plus "depth". on_update(ranking) is called after every pass; should_continue() is checked
+        before each refinement pass so a stale request can be dropped early. Setting stop_event
+        also aborts the pass that is running; the ranking of the last finished pass is returned.
+        """
+        board = chess.Board(fen)
+        legal = list(board.legal_moves)
+        if not legal:
+            return []
+
+        ranking = {}
+        if not self._search(board, legal, self.shallow_depth, ranking, stop_event):
+            return []
+        ordered = self._ordered(ranking)
+        if on_update:
+            on_update(ordered)
+
+        candidates = [line["move"] for line in ordered[:self.keep]]
+        depth = self.shallow_depth
+        for _ in range(self.rounds):
+            if should_continue and not should_continue():
+                break
+            depth += self.depth_step
+            if not self._search(board, candidates, depth, ranking, stop_event):
+                break
+            ordered = self._ordered(ranking)
+            if on_update:
+                on_update(ordered)
+            refined = [line["move"] for line in ordered if line["move"] in candidates]
+            candidates = refined[:max(1, len(refined) // 2)]
+        return ordered
+
+    @staticmethod
+    def _ordered(ranking):
+        # Deeper results first on ties, so a refined move is not displaced by an equal shallow guess
+        lines = sorted(ranking.values(), key=lambda line: (-line["score"], -line["depth"], line["move"].uci()))
+        return [dict(line, rank=i + 1) for i, line in enumerate(lines)]
@@ -0,0 +1,88 @@
+"""
+Compact binary encodings for moves and positions.
+
+A move packs into 16 bits: from (6) | to (6) << 6 | promotion piece type (3) << 12.
+A board packs into 32 bytes, one 4-bit piece code per square (a1 first, low
+nibble first); side to move, castling rights and en passant square travel as
+separate small integers so they fit fixed-width record fields.
+"""
+import chess
+import numpy as np
+
+# 0 = empty, 1..6 = white P N B R Q K, 7..12 = black p n b r q k
+PIECE_SYMBOLS = ".PNBRQKpnbrqk"
+NO_EP = 64
+
+CASTLING_BITS = [(chess.BB_H1, 1), (chess.BB_A1, 2), (chess.BB_H8, 4), (chess.BB_A8, 8)]
+
+
+def pack_move(move):
+    """chess.Move -> int in [0, 65535]; the null move packs to 0."""
+    return move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12)
+
+
+def unpack_move(value):
+    value = int(value)
+    promotion = (value >> 12) & 7
+    return chess.Move(value & 63, (value >> 6) & 63, promotion or None)
+
+
+def piece_code(piece):
+    if piece is None:
+        return 0
+    return piece.piece_type + (0 if piece.color == chess.WHITE else 6)
+
+
+def board_codes(board):
+    """(64,) uint8 piece codes, a1..h8."""
+    codes = np.zeros(64, dtype=np.uint8)
+    for square, piece in board.piece_map().items():
+        codes[square] = piece_code(piece)
+    return codes
+
+
+def pack_board(board):
+    """32-byte uint8 array: square 2i in the low nibble of byte i, 2i+1 in the high nibble."""
+    codes = board_codes(board)
+    return (codes[0::2] | (codes[1::2] << 4)).astype(np.uint8)
+
+
+def unpack_codes(packed):
+    """Inverse of pack_board: (64,) uint8 piece codes."""
+    packed = np.asarray(packed, dtype=np.uint8)
+    codes = np.empty(64, dtype=np.uint8)
+    codes[0::2] = packed & 15
+    codes[1::2] = packed >> 4
+    return codes
+
+
+def pack_castling(board):
+    rights = 0
+    for square_bb, bit in CASTLING_BITS:
+        if board.castling_rights & square_bb:
+            rights |= bit
+    return rights
+
+
+def pack_state(board):
+    """(packed board, turn, castling, en passant square or NO_EP) for fixed-width records."""
+    ep = board.ep_square if board.ep_square is not None and board.has_legal_en_passant() else NO_EP
+    return pack_board(board), int(board.turn), pack_castling(board), ep
+
+
+def unpack_state(packed, turn, castling, ep, halfmove=0, fullmove=1):
+    """Rebuild a chess.Board from pack_state() fields."""
+    board = chess.Board(None)
+    for square, code in enumerate(unpack_codes(packed)):
+        if code:
+            board.set_piece_at(square, chess.Piece.from_symbol(PIECE_SYMBOLS[code]))
+    board.turn = bool(turn)
+    rights = 0
+    for square_bb, bit in CASTLING_BITS:
+        if castling & bit:
+            rights |= square_bb
+    board.castling_rights = rights
+    board.ep_square = None if ep == NO_EP else int(ep)
+    board.halfmove_clock = int(halfmove)
+    board.fullmove_number = int(fullmove)
+    return board
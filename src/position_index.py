@@ -0,0 +1,374 @@
+"""
+Similarity search over every position of a game store (src/game_store.py).
+
+Each position gets a compact structure signature:
+
+    pawns     white and black pawn bitboards (2 x uint64)
+    material  piece counts of both sides packed into one key (uint32, see material_counts())
+    sketch    piece placement sketch: for each piece type and colour (pawns excluded), one bit per 2x2
+              block of the board holding such a piece; 10 x 16 bits in 3 x uint64
+
+Signatures are built once per store (`build`) and saved next to it, in
+<store>/signatures/, as one memory-mapped .npy file per column plus the
+game/ply of each position. A query scans them in chunks with NumPy:
+Jaccard similarity of the pawn and sketch bits (popcounts of AND over OR) and
+a material similarity from the value-weighted difference in piece counts.
+Each game is reported once, with its closest position.
+
+The material key doubles as a coarse inverted index: positions are also
+stored sorted by key, with one (key, start) entry per distinct key, so a
+`same_material` query only touches the positions with exactly the query's
+material.
+
+Usage:
+    python -m src.position_index build data/games
+    python -m src.position_index query data/games "<fen>" --kind pawns --count 20
+    python -m src.position_index query data/games "<fen>" --same-material
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+
+import chess
+import numpy as np
+
+from src.game_store import GameStore
+
+COLUMNS = {"game": "<u4", "ply": "<u2", "material": "<u4", "pawns": "<u8", "sketch": "<u8"}
+WIDTHS = {"pawns": 2, "sketch": 3}
+CHUNK = 1 << 20  # positions per query scan step
+BUILD_BATCH = 1 << 16  # positions converted to signatures at once while building
+
+# (colour, piece type, bits) of each field of the material key, lowest bits first
+MATERIAL_FIELDS = [(color, piece_type, 4 if piece_type == chess.PAWN else 2)
+                   for color in chess.COLORS for piece_type in range(chess.PAWN, chess.KING)]
+PIECE_VALUES = {chess.PAWN: 1, chess.KNIGHT: 3, chess.BISHOP: 3, chess.ROOK: 5, chess.QUEEN: 9}
+SKETCH_PIECES = [(color, piece_type) for color in chess.COLORS for piece_type in range(chess.KNIGHT, chess.KING + 1)]
+
+# One mask per 2x2 block of the board, a1-b2 first
+_BLOCKS = np.array([sum(1 << chess.square(file + df, rank + dr) for df in (0, 1) for dr in (0, 1))
+                    for rank in range(0, 8, 2) for file in range(0, 8, 2)], dtype=np.uint64)
+
+# Weights of (pawns, material, sketch) in the combined similarity
+KINDS = {
+    "all": (1.0, 1.0, 1.0),
+    "pawns": (1.0, 0.0, 0.0),
+    "material": (0.0, 1.0, 0.0),
+    "pieces": (0.0, 0.0, 1.0),
+}
+
+if hasattr(np, "bitwise_count"):
+    def _popcount(words):
+        """Set bits per row of an (N, W) uint64 array, W <= 3 (fits uint8)."""
+        counts = np.bitwise_count(words)
+        total = counts[:, 0].copy()
+        for i in range(1, counts.shape[1]):
+            total += counts[:, i]
+        return total
+else:  # NumPy < 2.0
+    _BYTE_COUNTS = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def _popcount(words):
+        words = np.ascontiguousarray(words)
+        return _BYTE_COUNTS[words.view(np.uint8)].reshape(len(words), -1).sum(axis=-1, dtype=np.uint8)
+
+
+def _bitboards(board):
+    """The 12 piece bitboards of a board, white P..K then black P..K."""
+    white, black = board.occupied_co[chess.WHITE], board.occupied_co[chess.BLACK]
+    by_type = [board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings]
+    return [bb & white for bb in by_type] + [bb & black for bb in by_type]
+
+
+def signatures(bitboards):
+    """
+    Signature columns for an (N, 12) uint64 array of _bitboards() rows:
+    {"pawns": (N, 2), "material": (N,), "sketch": (N, 3)}.
+    """
+    bitboards = np.asarray(bitboards, dtype=np.uint64).reshape(-1, 12)
+    counts = _popcount(bitboards.reshape(-1, 1)).reshape(-1, 12).astype(np.uint32)
+    material = np.zeros(len(bitboards), dtype=np.uint32)
+    shift = 0
+    for color, piece_type, bits in MATERIAL_FIELDS:
+        column = (0 if color == chess.WHITE else 6) + piece_type - 1
+        material |= np.minimum(counts[:, column], (1 << bits) - 1) << np.uint32(shift)
+        shift += bits
+
+    pieces = bitboards[:, [(0 if color == chess.WHITE else 6) + piece_type - 1 for color, piece_type in SKETCH_PIECES]]
+    bits = np.zeros((len(bitboards), 192), dtype=bool)  # bit 16 * piece + block; the last 32 stay zero
+    for block, mask in enumerate(_BLOCKS):
+        bits[:, block:160:16] = (pieces & mask) != 0
+    sketch = np.packbits(bits, axis=1, bitorder="little").view("<u8")
+    return {"pawns": bitboards[:, [0, 6]], "material": material, "sketch": sketch}
+
+
+def board_signature(board):
+    return {name: values[0] for name, values in signatures([_bitboards(board)]).items()}
+
+
+def material_counts(keys):
+    """(N, 10) piece counts (white P N B R Q, black P N B R Q) decoded from material keys."""
+    keys = np.asarray(keys, dtype=np.uint32)
+    out = np.empty((len(keys), len(MATERIAL_FIELDS)), dtype=np.int16)
+    shift = 0
+    for i, (_, _, bits) in enumerate(MATERIAL_FIELDS):
+        out[:, i] = (keys >> np.uint32(shift)) & np.uint32((1 << bits) - 1)
+        shift += bits
+    return out
+
+
+def _jaccard(words, query):
+    """|a & b| / |a | b| per row; 1 where both are empty."""
+    union = _popcount(words | query)
+    similarity = _popcount(words & query).astype(np.float32) / np.maximum(union, 1)
+    similarity[union == 0] = 1.0
+    return similarity
+
+
+_SIDE_BITS = sum(bits for color, _, bits in MATERIAL_FIELDS if color == chess.WHITE)
+
+
+def _material_similarity(keys, query_key):
+    """1 for equal material, 0.75 a pawn apart, 0.5 a minor piece apart, ..."""
+    # Each side's half of the key indexes a table of its value-weighted distance to the query
+    values = np.array([PIECE_VALUES[piece_type] for _, piece_type, _ in MATERIAL_FIELDS], dtype=np.int16)
+    halves = np.arange(1 << _SIDE_BITS, dtype=np.uint32)
+    query = material_counts([query_key])[0]
+    side = len(values) // 2
+    white = np.abs(material_counts(halves)[:, :side] - query[:side]) @ values[:side]
+    black = np.abs(material_counts(halves)[:, :side] - query[side:]) @ values[side:]
+    mask = np.uint32((1 << _SIDE_BITS) - 1)
+    keys = np.asarray(keys, dtype=np.uint32)
+    distance = white[keys & mask] + black[keys >> np.uint32(_SIDE_BITS)]
+    return 1.0 / (1.0 + distance.astype(np.float32) / 3.0)
+
+
+class PositionIndex:
+    """Signatures of every position of a game store; build() them once, then search()."""
+
+    def __init__(self, store_directory):
+        self.store = GameStore(store_directory)
+        self.directory = os.path.join(store_directory, "signatures")
+        self.manifest = None
+        self._columns = {}
+        path = os.path.join(self.directory, "manifest.json")
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.manifest = json.load(f)
+
+    def __len__(self):
+        return self.manifest["positions"] if self.manifest else 0
+
+    @property
+    def built(self):
+        return self.manifest is not None
+
+    @property
+    def stale(self):
+        """True when games were added to the store after the signatures were built."""
+        return not self.built or self.manifest["games"] != len(self.store)
+
+    # Building
+
+    def build(self, on_progress=None):
+        """(Re)compute the signatures of every position in the store. Returns the number of positions."""
+        total = self.store.manifest["moves"] + len(self.store)  # every game has one more position than moves
+        tmp = self.directory + ".tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        columns = {name: np.lib.format.open_memmap(
+            os.path.join(tmp, f"{name}.npy"), mode="w+", dtype=dtype,
+            shape=(total, WIDTHS[name]) if name in WIDTHS else (total,))
+            for name, dtype in COLUMNS.items()}
+
+        done = 0
+        rows, games, plies = [], [], []
+
+        def _write():
+            nonlocal done
+            if not rows:
+                return
+            end = done + len(rows)
+            columns["game"][done:end] = games
+            columns["ply"][done:end] = plies
+            for name, values in signatures(rows).items():
+                columns[name][done:end] = values
+            done = end
+            rows.clear()
+            games.clear()
+            plies.clear()
+            if on_progress:
+                on_progress(done, total)
+
+        for game, ply, board in self.store.iter_positions():
+            rows.append(_bitboards(board))
+            games.append(game)
+            plies.append(min(ply, 0xFFFF))
+            if len(rows) >= BUILD_BATCH:
+                _write()
+        _write()
+        for values in columns.values():
+            values.flush()
+        del columns
+
+        # Coarse inverted index: positions grouped by material key
+        material = np.load(os.path.join(tmp, "material.npy"), mmap_mode="r")
+        order = np.argsort(material, kind="stable").astype(np.uint32 if total < 1 << 32 else np.uint64)
+        keys, starts = np.unique(material[order], return_index=True)
+        np.save(os.path.join(tmp, "material_order.npy"), order)
+        np.save(os.path.join(tmp, "material_keys.npy"), keys.astype(np.uint32))
+        np.save(os.path.join(tmp, "material_starts.npy"), np.append(starts, total).astype(np.uint64))
+        del material
+
+        self.manifest = {"games": len(self.store), "positions": total}
+        with open(os.path.join(tmp, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f)
+        self._columns = {}
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.replace(tmp, self.directory)
+        return total
+
+    # Searching
+
+    def column(self, name):
+        """One signature column (or material_order/_keys/_starts), memory-mapped."""
+        if name not in self._columns:
+            self._columns[name] = np.load(os.path.join(self.directory, f"{name}.npy"), mmap_mode="r")
+        return self._columns[name]
+
+    def material_bucket(self, key):
+        """Positions (sorted) whose material key equals `key`, from the inverted index."""
+        keys = self.column("material_keys")
+        i = int(np.searchsorted(keys, key))
+        if i == len(keys) or keys[i] != key:
+            return np.zeros(0, dtype=np.uint32)
+        starts = self.column("material_starts")
+        return self.column("material_order")[int(starts[i]):int(starts[i + 1])]
+
+    def _score(self, query, weights, rows):
+        """Similarity of the query to the positions `rows` (a slice or sorted index array)."""
+        total = None
+        for weight, name, similarity in [(weights[0], "pawns", _jaccard), (weights[1], "material", None),
+                                         (weights[2], "sketch", _jaccard)]:
+            if not weight:
+                continue
+            values = self.column(name)[rows]
+            part = _material_similarity(values, query[name]) if similarity is None else \
+                similarity(values, query[name][None, :])
+            total = weight * part if total is None else total + weight * part
+        return total / sum(weights)
+
+    def search(self, board, count=10, kind="all", same_material=False):
+        """
+        The `count` games with positions most similar to `board`, best first: for each game its closest
+        position, as a dict with game, ply, similarity and the pawns / material / pieces similarities.
+        """
+        if not self.built:
+            raise ValueError("no signatures: run `python -m src.position_index build` on the store first")
+        weights = KINDS[kind]
+        query = board_signature(board)
+
+        if same_material:
+            bucket = self.material_bucket(query["material"])
+            chunks = [np.asarray(bucket[i:i + CHUNK]) for i in range(0, len(bucket), CHUNK)]
+        else:
+            chunks = [slice(i, min(i + CHUNK, len(self))) for i in range(0, len(self), CHUNK)]
+        best_rows, best_scores = [], []
+        for rows in chunks:
+            scores = self._score(query, weights, rows)
+            rows = np.arange(rows.start, rows.stop) if isinstance(rows, slice) else rows
+            # Best position of each game; rows are in store order, so a game's positions are contiguous
+            games = self.column("game")[rows]
+            starts = np.flatnonzero(np.diff(games.astype(np.int64), prepend=-1) != 0)
+            best = np.maximum.reduceat(scores, starts)
+            hits = np.flatnonzero(scores == np.repeat(best, np.diff(starts, append=len(scores))))
+            first = hits[np.unique(games[hits], return_index=True)[1]]
+            # A game can straddle two chunks, hence twice `count` per chunk
+            if len(first) > 2 * count:
+                first = first[np.argpartition(-scores[first], 2 * count)[:2 * count]]
+            best_rows.append(rows[first])
+            best_scores.append(scores[first])
+        if not best_rows:
+            return []
+
+        rows = np.concatenate(best_rows)
+        scores = np.concatenate(best_scores)
+        results, seen = [], set()
+        for i in np.lexsort((rows, -scores)):  # best first, earlier games first among equals
+            game = int(self.column("game")[rows[i]])
+            if game in seen:
+                continue
+            seen.add(game)
+            results.append(self._result(query, int(rows[i]), float(scores[i])))
+            if len(results) == count:
+                break
+        return results
+
+    def _result(self, query, row, similarity):
+        return {
+            "game": int(self.column("game")[row]),
+            "ply": int(self.column("ply")[row]),
+            "similarity": similarity,
+            "pawns": float(_jaccard(self.column("pawns")[row:row + 1], query["pawns"][None, :])[0]),
+            "material": float(_material_similarity(self.column("material")[row:row + 1], query["material"])[0]),
+            "pieces": float(_jaccard(self.column("sketch")[row:row + 1], query["sketch"][None, :])[0]),
+        }
+
+
+def describe(store, result):
+    """One line for a search result: similarity, players, event and move number."""
+    headers = store.headers(result["game"])
+    players = f"{headers.get('White', '?')} - {headers.get('Black', '?')}"
+    move = result["ply"] // 2 + 1
+    return (f"{result['similarity']:.2f}  (pawns {result['pawns']:.2f}, material {result['material']:.2f}, "
+            f"pieces {result['pieces']:.2f})  game {result['game']} move {move}: {players}, "
+            f"{headers.get('Event', '?')}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find games with positions structurally similar to a FEN.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Compute the signatures of every position of a game store")
+    build.add_argument("store")
+    query = sub.add_parser("query", help="Most similar positions to a FEN")
+    query.add_argument("store")
+    query.add_argument("fen")
+    query.add_argument("--kind", choices=list(KINDS), default="all")
+    query.add_argument("--count", type=int, default=10)
+    query.add_argument("--same-material", action="store_true", help="Only positions with exactly this material")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    index = PositionIndex(args.store)
+    if args.command == "build":
+        def _progress(done, total):
+            print(f"{done}/{total} positions", file=sys.stderr)
+
+        total = index.build(on_progress=_progress)
+        print(f"{total} positions from {len(index.store)} games in {time.perf_counter() - start:.1f}s")
+        return 0
+
+    if not index.built:
+        print(f"No signatures in {args.store}: run `python -m src.position_index build {args.store}` first")
+        return 1
+    if index.stale:
+        print(f"Signatures cover {index.manifest['games']} of {len(index.store)} games; rebuild to include the rest",
+              file=sys.stderr)
+    try:
+        board = chess.Board(args.fen)
+    except ValueError as e:
+        print(f"Invalid FEN: {e}")
+        return 1
+    results = index.search(board, args.count, args.kind, args.same_material)
+    for result in results:
+        print(describe(index.store, result))
+    print(f"{len(results)} results from {len(index)} positions in {(time.perf_counter() - start) * 1000:.0f} ms",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
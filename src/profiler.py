@@ -0,0 +1,148 @@
+"""
+Time-boxed sampling profiler covering every Python thread.
+
+cProfile only sees the thread that enabled it, but UI stalls usually involve the
+Tk thread waiting on a worker. Instead, a background thread snapshots all stacks
+with sys._current_frames() every few milliseconds and counts identical stacks.
+The result is written as collapsed stacks ("frame;frame;frame count" per line),
+which flamegraph.pl, speedscope and inferno read directly. Each stack is rooted
+at the capture label (e.g. the app mode) and the thread name.
+
+Usage:
+    python main.py --profile 10                 # profile the first 10s of a session
+    python -m src.profiler [--out FILE] 5 script.py [script args]   # profile the first 5s of a script
+"""
+import argparse
+import os
+import runpy
+import sys
+import threading
+import time
+from collections import Counter
+
+DEFAULT_PROFILE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "profiles"))
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    def __init__(self, interval=0.005, label=None):
+        self.interval = interval
+        self.label = label
+        self.samples = Counter()  # (thread name, frame, frame, ...) root first -> count
+        self.sample_count = 0
+        self.started_at = None
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, duration=None, on_finish=None):
+        """Start sampling in the background; stops by itself after duration seconds."""
+        if self.is_running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(duration, on_finish),
+                                        name="SamplingProfiler", daemon=True)
+        self._thread.start()
+
+    def stop(self, wait=True):
+        """
+        End the capture. With wait=False only signal the sampler: on_finish then runs on the sampler
+        thread when it exits. Use that from a UI thread whose on_finish posts back to it, which a
+        join() would deadlock.
+        """
+        self._stop.set()
+        if wait and self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def _run(self, duration, on_finish):
+        own_id = threading.get_ident()
+        self.started_at = time.time()
+        start = time.perf_counter()
+        deadline = start + duration if duration else None
+        while not self._stop.is_set():
+            self.sample(exclude=own_id)
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            self._stop.wait(self.interval)
+        self.elapsed = time.perf_counter() - start
+        if on_finish:
+            on_finish(self)
+
+    def sample(self, exclude=None):
+        """Record the current stack of every thread once."""
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == exclude:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            stack.append(names.get(ident, f"thread-{ident}"))
+            self.samples[tuple(reversed(stack))] += 1
+        self.sample_count += 1
+
+    def collapsed(self):
+        """Collapsed-stack lines, most frequent first."""
+        prefix = [self.label] if self.label else []
+        return [";".join(prefix + [f.replace(";", ":") for f in stack]) + f" {count}"
+                for stack, count in self.samples.most_common()]
+
+    def write(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(self.collapsed()) + "\n")
+        return path
+
+    def default_path(self, directory=DEFAULT_PROFILE_DIR):
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started_at or time.time()))
+        label = (self.label or "profile").replace(" ", "-")
+        return os.path.join(directory, f"{label}-{stamp}.collapsed")
+
+    def summary(self, top=10):
+        """Leaf frames that appear most often, with their share of samples, per thread."""
+        leaves = Counter()
+        for stack, count in self.samples.items():
+            leaves[(stack[0], stack[-1])] += count
+        total = max(1, self.sample_count)
+        return [f"{100.0 * count / total:5.1f}%  {thread}: {frame}"
+                for (thread, frame), count in leaves.most_common(top)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile a Python script with the sampling profiler.")
+    parser.add_argument("duration", type=float, help="Seconds to sample (the script keeps running afterwards)")
+    parser.add_argument("script", help="Script to run")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="Arguments for the script")
+    parser.add_argument("--out", help="Collapsed-stack output file (default: profiles/<script>-<time>.collapsed)")
+    parser.add_argument("--interval", type=float, default=0.005, help="Seconds between samples")
+    args = parser.parse_args(argv)
+
+    profiler = SamplingProfiler(args.interval, label=os.path.splitext(os.path.basename(args.script))[0])
+
+    def finished(p):
+        path = p.write(args.out or p.default_path())
+        print(f"Profile: {p.sample_count} samples over {p.elapsed:.1f}s -> {path}", file=sys.stderr)
+
+    profiler.start(args.duration, on_finish=finished)
+    sys.argv = [args.script] + args.args
+    try:
+        runpy.run_path(args.script, run_name="__main__")
+    finally:
+        if profiler.is_running:
+            profiler.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
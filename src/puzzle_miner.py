@@ -0,0 +1,235 @@
+"""
+Two-stage tactics miner over PGN archives.
+
+Stage 1 gives every position of a game a cheap, shallow evaluation. A ply
+becomes a candidate when the move just played threw away at least --swing
+centipawns and left the opponent clearly better. Stage 2 runs the expensive
+multipv search only on those candidates and keeps the ones with a single good
+move: the best line must win by --min-advantage and beat the second choice by
+--unique-margin. The solution is then extended move by move as long as the
+solver's move stays unique.
+
+Games are streamed from the PGN files and mined in parallel across an engine
+pool, one game per engine, so a game's positions share that engine's hash.
+
+Usage:
+    python -m src.puzzle_miner archive/*.pgn --engine stockfish.exe --out puzzles.epd
+    python -m src.puzzle_miner games.pgn --shallow-depth 8 --deep-depth 22 --workers 6 --out puzzles.jsonl
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+import chess
+import chess.engine
+import chess.pgn
+
+from src.cpu_budget import BATCH, PRIORITY_CLASSES, budget
+from src.engine import EnginePool, parse_uci_options
+
+MATE_SCORE = 10000
+
+
+def iter_games(paths, read=chess.pgn.read_game):
+    """Yield (source, game) for every game in the given PGN files or globs, lazily.
+    `read` parses one game from the open file (e.g. read_game with a custom visitor)."""
+    for pattern in paths:
+        for path in sorted(glob.glob(pattern)) or [pattern]:
+            with open(path, encoding="utf-8", errors="replace") as f:
+                index = 0
+                while True:
+                    game = read(f)
+                    if game is None:
+                        break
+                    index += 1
+                    yield f"{os.path.basename(path)}#{index}", game
+
+
+def _score(infos, multipv=1):
+    """Side-to-move centipawns of the last line `multipv` in a search, or None."""
+    for info in reversed(infos):
+        if info.get("multipv", 1) == multipv and "score" in info:
+            return info["score"].relative.score(mate_score=MATE_SCORE)
+    return None
+
+
+def _lines(infos):
+    """Final {multipv: info} from a multipv search."""
+    lines = {}
+    for info in infos:
+        if "pv" in info and "score" in info:
+            lines[info.get("multipv", 1)] = info
+    return lines
+
+
+class PuzzleMiner:
+    def __init__(self, shallow_limit, deep_limit, swing=200, min_advantage=150, unique_margin=150,
+                 max_solution_moves=4, min_ply=10):
+        self.shallow_limit = shallow_limit
+        self.deep_limit = deep_limit
+        self.swing = swing
+        self.min_advantage = min_advantage
+        self.unique_margin = unique_margin
+        self.max_solution_moves = max_solution_moves
+        self.min_ply = min_ply
+
+    def candidates(self, handler, game):
+        """Stage 1: boards (after a blunder) worth a deep look. Returns (candidates, positions searched)."""
+        board = game.board()
+        previous = None  # shallow score of the position before the last move, for the side that moved
+        found, searched = [], 0
+        for move in game.mainline_moves():
+            board.push(move)
+            if board.is_game_over():
+                break
+            _, infos = handler.search_infos(board, self.shallow_limit)
+            searched += 1
+            score = _score(infos)
+            if score is None:
+                previous = None
+                continue
+            # The mover expected `previous`; the opponent now sees `score`. Their sum is what the move lost.
+            if (previous is not None and len(board.move_stack) >= self.min_ply
+                    and previous + score >= self.swing and score >= self.min_advantage):
+                found.append(board.copy(stack=False))
+            previous = score
+        return found, searched
+
+    def unique_best(self, handler, board):
+        """Stage 2 check: (best line info, score) if exactly one move wins, else None."""
+        _, infos = handler.search_infos(board, self.deep_limit, multipv=2)
+        lines = _lines(infos)
+        best = lines.get(1)
+        if best is None:
+            return None
+        best_score = best["score"].relative.score(mate_score=MATE_SCORE)
+        if best_score < self.min_advantage:
+            return None
+        second = lines.get(2)
+        if second is not None:
+            second_score = second["score"].relative.score(mate_score=MATE_SCORE)
+            if best_score - second_score < self.unique_margin and second_score >= self.min_advantage:
+                return None
+        return best, best_score
+
+    def verify(self, handler, board):
+        """Stage 2: the puzzle dict for a candidate, or None."""
+        first = self.unique_best(handler, board)
+        if first is None:
+            return None
+        info, score = first
+        solution = []
+        position = board.copy(stack=False)
+        pv = list(info["pv"])
+        for solver_moves in range(1, self.max_solution_moves + 1):
+            solution.append(pv[0])
+            position.push(pv[0])
+            if solver_moves == self.max_solution_moves or position.is_game_over() or len(pv) < 2:
+                break
+            # Opponent's best defence, then the solver's next move must be unique as well
+            solution.append(pv[1])
+            position.push(pv[1])
+            if position.is_game_over():
+                break
+            following = self.unique_best(handler, position)
+            if following is None:
+                # Drop the defence too: puzzles end on the solver's move
+                solution.pop()
+                break
+            pv = list(following[0]["pv"])
+        return {"fen": board.fen(), "moves": solution, "score": score}
+
+    def mine(self, handler, item):
+        """Both stages for one game. Returns (puzzles, stats)."""
+        source, game = item
+        start = time.perf_counter()
+        candidates, shallow = self.candidates(handler, game)
+        shallow_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        puzzles = []
+        for board in candidates:
+            puzzle = self.verify(handler, board)
+            if puzzle is not None:
+                puzzle["source"] = source
+                puzzle["game"] = f"{game.headers.get('White', '?')} - {game.headers.get('Black', '?')}"
+                puzzles.append(puzzle)
+        stats = {"shallow": shallow, "deep": len(candidates), "shallow_seconds": shallow_seconds,
+                 "deep_seconds": time.perf_counter() - start}
+        return puzzles, stats
+
+
+def format_puzzle(puzzle, fmt, number):
+    if fmt == "jsonl":
+        return json.dumps(dict(puzzle, moves=[m.uci() for m in puzzle["moves"]]))
+    board = chess.Board(puzzle["fen"])
+    return board.epd(id=f"puzzle {number}", bm=puzzle["moves"][0], pv=puzzle["moves"], ce=puzzle["score"],
+                     c0=puzzle["source"], c1=puzzle["game"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mine tactical puzzles from PGN archives.")
+    parser.add_argument("pgn", nargs="+", help="PGN files or glob patterns")
+    parser.add_argument("--engine", default="stockfish.exe", help="Engine executable")
+    parser.add_argument("--engine-arg", action="append", default=[], help="Extra engine command line argument")
+    parser.add_argument("--option", action="append", default=[], metavar="NAME=VALUE", help="UCI option")
+    parser.add_argument("--workers", type=int, help="Engines in the pool (default: cores of the priority class / Threads)")
+    parser.add_argument("--priority", choices=list(PRIORITY_CLASSES), default=BATCH,
+                        help="Engine priority class: niceness and CPU affinity (default: batch)")
+    parser.add_argument("--out", default="-", help="Output file (.epd or .jsonl), '-' for stdout")
+    parser.add_argument("--format", choices=["epd", "jsonl"], help="Output format (default: from --out extension)")
+    parser.add_argument("--shallow-depth", type=int, default=8, help="Stage 1 depth per position")
+    parser.add_argument("--deep-depth", type=int, default=20, help="Stage 2 multipv depth per candidate")
+    parser.add_argument("--swing", type=int, default=200, help="Centipawns a move must lose to be a candidate")
+    parser.add_argument("--min-advantage", type=int, default=150, help="Centipawns the solver must end up ahead")
+    parser.add_argument("--unique-margin", type=int, default=150, help="Best move must beat the second by this")
+    parser.add_argument("--max-solution-moves", type=int, default=4, help="Solver moves in the solution line")
+    parser.add_argument("--min-ply", type=int, default=10, help="Ignore the opening plies")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ("jsonl" if args.out.lower().endswith(".jsonl") else "epd")
+    options = parse_uci_options(args.option)
+    options.setdefault("Threads", "1")
+    workers = args.workers or budget.default_engines(args.priority, options["Threads"])
+
+    pool = EnginePool(workers, args.engine, args.engine_arg, engine_options=options, priority=args.priority)
+    success, msg = pool.initialize()
+    if not success:
+        print(msg, file=sys.stderr)
+        return 1
+
+    miner = PuzzleMiner(chess.engine.Limit(depth=args.shallow_depth), chess.engine.Limit(depth=args.deep_depth),
+                        args.swing, args.min_advantage, args.unique_margin, args.max_solution_moves, args.min_ply)
+    out = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8")
+    games = found = 0
+    totals = {"shallow": 0, "deep": 0, "shallow_seconds": 0.0, "deep_seconds": 0.0}
+    start = time.perf_counter()
+    try:
+        for puzzles, stats in pool.map(miner.mine, iter_games(args.pgn)):
+            games += 1
+            for key, value in stats.items():
+                totals[key] += value
+            for puzzle in puzzles:
+                found += 1
+                out.write(format_puzzle(puzzle, fmt, found) + "\n")
+            out.flush()
+    finally:
+        pool.quit()
+        if out is not sys.stdout:
+            out.close()
+
+    elapsed = time.perf_counter() - start
+    engine_seconds = totals["shallow_seconds"] + totals["deep_seconds"]
+    fraction = 100.0 * totals["deep"] / totals["shallow"] if totals["shallow"] else 0.0
+    deep_share = 100.0 * totals["deep_seconds"] / engine_seconds if engine_seconds else 0.0
+    print(f"{games} games, {totals['shallow']} positions pre-filtered, {totals['deep']} deep-verified "
+          f"({fraction:.1f}% of plies, {deep_share:.1f}% of engine time), {found} puzzles in {elapsed:.1f}s",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,24 @@
+"""
+Reproducible random chess positions for tests and benchmarks.
+
+Only python-chess is needed, so engine benchmarks can draw positions without
+the imaging dependencies of the vision code (src/vision_synth.py).
+"""
+import random
+
+import chess
+
+
+def random_fens(count, seed=0, min_plies=4, max_plies=80):
+    """Positions reached by random legal play from the initial position."""
+    rng = random.Random(seed)
+    fens = []
+    while len(fens) < count:
+        board = chess.Board()
+        for _ in range(rng.randint(min_plies, max_plies)):
+            moves = list(board.legal_moves)
+            if not moves:
+                break
+            board.push(rng.choice(moves))
+        fens.append(board.fen())
+    return fens
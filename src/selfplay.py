@@ -0,0 +1,283 @@
+"""
+Streaming self-play generator for labelled training positions.
+
+Worker processes each own one single-threaded engine and play games from
+randomized openings at a fixed node count per move. Every position is stored
+with the engine's score and best move, and the game result is filled in once
+the game ends. Records are fixed-width NumPy structs (55 bytes, board packed
+to nibbles, see src/packing.py) written in .npy chunks; positions already seen
+(same Zobrist key) are dropped.
+
+Chunks and progress.json are written atomically after whole games, so an
+interrupted run continues where it stopped when started again with the same
+--out directory. Game n always uses seed + n, so resumed runs reproduce the
+same games.
+
+Usage:
+    python -m src.selfplay --engine stockfish.exe --out data/selfplay --games 10000 --nodes 5000
+    python -m src.selfplay --engine sf.exe --out data/sp --openings book.epd --random-plies 2 6 --workers 8
+"""
+import argparse
+import collections
+import glob
+import json
+import multiprocessing.util
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import chess
+import chess.engine
+import chess.polyglot
+import numpy as np
+
+from src.cpu_budget import BATCH, PRIORITY_CLASSES, budget
+from src.engine import EngineHandler, parse_uci_options
+from src.match_runner import Adjudicator, load_openings
+from src.packing import pack_move, pack_state, unpack_move, unpack_state
+
+RECORD_DTYPE = np.dtype([
+    ("key", "<u8"),         # Zobrist (polyglot) hash, for deduplication
+    ("board", "u1", 32),    # 4-bit piece codes, see src/packing.py
+    ("turn", "u1"),
+    ("castling", "u1"),
+    ("ep", "u1"),
+    ("halfmove", "u1"),
+    ("score", "<i2"),       # centipawns for the side to move, mates clipped to +/-32000
+    ("move", "<u2"),        # packed best move
+    ("result", "i1"),       # game result for White: 1, 0, -1
+    ("ply", "<u2"),
+    ("game", "<u4"),
+])
+
+_worker_engine = None
+
+
+def _init_worker(engine_path, engine_args, engine_options, priority=None):
+    global _worker_engine
+    _worker_engine = EngineHandler(engine_path, engine_args, engine_options=engine_options, priority=priority)
+    success, msg = _worker_engine.initialize_engine()
+    if not success:
+        raise RuntimeError(msg)
+    # Pool workers skip atexit; without this the engine keeps the worker alive at shutdown
+    multiprocessing.util.Finalize(_worker_engine, _worker_engine.quit, exitpriority=10)
+
+
+def random_opening(rng, openings, random_plies):
+    """Board after a (book) opening plus a random number of uniformly random legal moves."""
+    while True:
+        board = chess.Board()
+        if openings:
+            fen, moves = rng.choice(openings)
+            board.set_fen(fen)
+            for move in moves:
+                board.push(move)
+        for _ in range(rng.randint(*random_plies)):
+            moves = list(board.legal_moves)
+            if not moves:
+                break
+            board.push(rng.choice(moves))
+        if not board.is_game_over():
+            return board
+
+
+def play_selfplay_game(game_id, seed, nodes, random_plies, openings, max_plies):
+    """
+    Play one game in a worker. Returns (game_id, records) with records deduplicated within the game.
+    A game the engine fails in has no result to label its positions with, so it returns no records.
+    """
+    rng = random.Random(seed + game_id)
+    board = random_opening(rng, openings, random_plies)
+    adjudicator = Adjudicator(max_plies=len(board.move_stack) + max_plies)
+    limit = chess.engine.Limit(nodes=nodes)
+
+    game = object()  # a new identity per game makes python-chess send "ucinewgame"
+    rows, seen, scores = [], set(), []
+    while True:
+        verdict = adjudicator.check(board, scores)
+        if verdict:
+            result = verdict[0]
+            break
+        move, infos = _worker_engine.search_infos(board, limit, game=game)
+        if move is None:
+            return game_id, np.zeros(0, dtype=RECORD_DTYPE)  # engine failure: the game has no result
+        score = next((info["score"] for info in reversed(infos) if "score" in info), None)
+        key = chess.polyglot.zobrist_hash(board)
+        if key not in seen and score is not None:
+            seen.add(key)
+            packed, turn, castling, ep = pack_state(board)
+            cp = max(-32000, min(32000, score.relative.score(mate_score=32000)))
+            rows.append((key, packed, turn, castling, ep, min(board.halfmove_clock, 255), cp,
+                         pack_move(move), 0, len(board.move_stack), game_id))
+        scores.append(score.white().score(mate_score=32000) if score is not None else None)
+        board.push(move)
+
+    records = np.array(rows, dtype=RECORD_DTYPE)
+    records["result"] = {"1-0": 1, "0-1": -1}.get(result, 0)
+    return game_id, records
+
+
+class ChunkWriter:
+    """Buffers records and writes them as numbered .npy chunks; remembers keys and progress for resuming."""
+
+    def __init__(self, directory, chunk_size=100000):
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.buffer = []
+        self.buffered = 0
+        self.keys = set()
+        self.next_game = 0
+        self.records_written = 0
+        os.makedirs(directory, exist_ok=True)
+
+        chunks = chunk_paths(directory)
+        for path in chunks:
+            data = np.load(path, mmap_mode="r")
+            self.keys.update(data["key"].tolist())
+            self.records_written += len(data)
+        self.next_chunk = len(chunks)
+        progress = os.path.join(directory, "progress.json")
+        if os.path.exists(progress):
+            with open(progress, encoding="utf-8") as f:
+                self.next_game = json.load(f)["next_game"]
+
+    def add_game(self, game_id, records):
+        """Add one finished game; returns how many of its records were new."""
+        keep = np.array([k not in self.keys for k in records["key"].tolist()], dtype=bool)
+        fresh = records[keep] if len(records) else records
+        self.keys.update(fresh["key"].tolist())
+        if len(fresh):
+            self.buffer.append(fresh)
+            self.buffered += len(fresh)
+        self.next_game = game_id + 1
+        if self.buffered >= self.chunk_size:
+            self.flush()
+        return len(fresh)
+
+    def flush(self):
+        if self.buffer:
+            data = np.concatenate(self.buffer)
+            path = os.path.join(self.directory, f"chunk_{self.next_chunk:06d}.npy")
+            _atomic_write(path, lambda f: np.save(f, data))
+            self.next_chunk += 1
+            self.records_written += len(data)
+            self.buffer, self.buffered = [], 0
+        progress = json.dumps({"next_game": self.next_game, "records": self.records_written})
+        _atomic_write(os.path.join(self.directory, "progress.json"), lambda f: f.write(progress.encode("utf-8")))
+
+
+def _atomic_write(path, write):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        write(f)
+    os.replace(tmp, path)
+
+
+def chunk_paths(directory):
+    return sorted(glob.glob(os.path.join(directory, "chunk_*.npy")))
+
+
+def load_records(directory):
+    """All records of a self-play directory as one structured array."""
+    chunks = [np.load(path, mmap_mode="r") for path in chunk_paths(directory)]
+    return np.concatenate(chunks) if chunks else np.zeros(0, dtype=RECORD_DTYPE)
+
+
+def record_board(record):
+    """chess.Board for one record."""
+    return unpack_state(record["board"], record["turn"], record["castling"], record["ep"], record["halfmove"])
+
+
+def record_move(record):
+    return unpack_move(record["move"])
+
+
+def run_selfplay(out_dir, games, engine_path, engine_args=None, engine_options=None, workers=None, nodes=5000,
+                 random_plies=(4, 10), openings=None, max_plies=300, seed=0, chunk_size=100000, on_progress=None,
+                 priority=None):
+    """Generate games until `games` have been played in total (counting earlier runs into out_dir)."""
+    workers = workers or budget.default_engines(priority, (engine_options or {}).get("Threads", 1))
+    writer = ChunkWriter(out_dir, chunk_size)
+    game_ids = iter(range(writer.next_game, games))
+    window = workers * 2
+    start = time.perf_counter()
+    positions = 0
+
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                               initargs=(engine_path, engine_args or [], engine_options or {}, priority))
+    in_flight = collections.deque()
+    try:
+        def refill():
+            while len(in_flight) < window:
+                game_id = next(game_ids, None)
+                if game_id is None:
+                    return
+                in_flight.append(pool.submit(play_selfplay_game, game_id, seed, nodes, random_plies,
+                                             openings or [], max_plies))
+
+        refill()
+        while in_flight:
+            # Results are consumed in game order so progress.json never skips a game
+            game_id, records = in_flight.popleft().result()
+            refill()
+            positions += writer.add_game(game_id, records)
+            if on_progress:
+                on_progress(writer, positions, time.perf_counter() - start, workers)
+    finally:
+        for future in in_flight:
+            future.cancel()
+        writer.flush()
+        pool.shutdown(wait=True, cancel_futures=True)
+    return writer, positions, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate labelled positions by engine self-play.")
+    parser.add_argument("--out", required=True, help="Output directory (resumed if it already has chunks)")
+    parser.add_argument("--games", type=int, default=1000, help="Total games, including earlier runs")
+    parser.add_argument("--engine", default="stockfish.exe", help="Engine executable")
+    parser.add_argument("--engine-arg", action="append", default=[], help="Extra engine command line argument")
+    parser.add_argument("--option", action="append", default=[], metavar="NAME=VALUE", help="UCI option")
+    parser.add_argument("--workers", type=int, help="Worker processes, one engine each (default: cores of the priority class)")
+    parser.add_argument("--priority", choices=list(PRIORITY_CLASSES), default=BATCH,
+                        help="Engine priority class: niceness and CPU affinity (default: batch)")
+    parser.add_argument("--nodes", type=int, default=5000, help="Nodes per move")
+    parser.add_argument("--random-plies", type=int, nargs=2, default=[4, 10], metavar=("MIN", "MAX"),
+                        help="Random moves played after the opening")
+    parser.add_argument("--openings", help="EPD/FEN or PGN openings to start from")
+    parser.add_argument("--max-plies", type=int, default=300, help="Adjudicate a draw after this many plies")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=100000, help="Records per .npy chunk")
+    args = parser.parse_args(argv)
+
+    options = parse_uci_options(args.option)
+    options.setdefault("Threads", "1")
+    openings = load_openings(args.openings) if args.openings else None
+
+    last_report = [0.0]
+
+    def report(writer, positions, elapsed, workers):
+        if elapsed - last_report[0] >= 5.0 or writer.next_game >= args.games:
+            last_report[0] = elapsed
+            rate = positions / elapsed if elapsed > 0 else 0.0
+            print(f"games {writer.next_game}/{args.games}  positions {positions}  "
+                  f"{rate:.1f} pos/s  {rate / workers:.1f} pos/s/core", file=sys.stderr)
+
+    try:
+        writer, positions, elapsed = run_selfplay(
+            args.out, args.games, args.engine, args.engine_arg, options, args.workers, args.nodes,
+            tuple(args.random_plies), openings, args.max_plies, args.seed, args.chunk_size, on_progress=report,
+            priority=args.priority)
+    except KeyboardInterrupt:
+        print("Interrupted; finished games were saved. Run the same command again to resume.", file=sys.stderr)
+        return 130
+
+    print(f"{positions} new positions in {elapsed:.1f}s; {writer.records_written} total in {args.out}",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
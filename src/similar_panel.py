@@ -0,0 +1,79 @@
+import threading
+import time
+
+import customtkinter as ctk
+
+from src.position_index import KINDS, describe
+
+
+class SimilarPanel(ctk.CTkToplevel):
+    """Window listing games of a game store with positions similar to an analysis board's."""
+
+    def __init__(self, master, tab, index):
+        super().__init__(master)
+        self.title("Similar Games")
+        self.geometry("760x420")
+        self.tab = tab
+        self.index = index
+        self.generation = 0  # bumped per search; results of older searches are dropped
+
+        controls = ctk.CTkFrame(self, fg_color="transparent")
+        controls.pack(fill="x", padx=10, pady=(10, 5))
+        ctk.CTkLabel(controls, text="Match:").pack(side="left")
+        self.kind_var = ctk.StringVar(value="all")
+        ctk.CTkOptionMenu(controls, variable=self.kind_var, values=list(KINDS), width=90,
+                          command=lambda value: self.search()).pack(side="left", padx=5)
+        self.same_material_var = ctk.BooleanVar(value=False)
+        ctk.CTkCheckBox(controls, text="Same material", variable=self.same_material_var,
+                        command=self.search).pack(side="left", padx=10)
+        ctk.CTkButton(controls, text="Search", width=80, command=self.search).pack(side="left", padx=5)
+        self.status_label = ctk.CTkLabel(controls, text="", anchor="w")
+        self.status_label.pack(side="left", padx=10)
+
+        self.results_frame = ctk.CTkScrollableFrame(self)
+        self.results_frame.pack(fill="both", expand=True, padx=10, pady=(0, 10))
+
+        if self.index.stale:
+            self.status_label.configure(text="Signatures are out of date: rebuild them to include new games")
+        self.search()
+
+    def search(self):
+        """Search for the tab's current position on a worker thread."""
+        self.generation += 1
+        generation = self.generation
+        board = self.tab.game_state.board.copy(stack=False)
+        kind, same_material = self.kind_var.get(), self.same_material_var.get()
+        self.status_label.configure(text="Searching...")
+
+        def _run():
+            start = time.perf_counter()
+            try:
+                results = self.index.search(board, 20, kind, same_material)
+                lines = [describe(self.index.store, result) for result in results]
+            except Exception as e:
+                message = f"Search failed: {e}"
+                self.after(0, lambda: self.show_error(generation, message))
+                return
+            elapsed = time.perf_counter() - start
+            self.after(0, lambda: self.show_results(generation, results, lines, elapsed))
+        threading.Thread(target=_run, daemon=True).start()
+
+    def show_error(self, generation, message):
+        if self.winfo_exists() and generation == self.generation:
+            self.status_label.configure(text=message)
+
+    def show_results(self, generation, results, lines, elapsed):
+        if not self.winfo_exists() or generation != self.generation:
+            return
+        for widget in self.results_frame.winfo_children():
+            widget.destroy()
+        for result, line in zip(results, lines):
+            ctk.CTkButton(self.results_frame, text=line, anchor="w", fg_color="gray25", hover_color="gray35",
+                          command=lambda r=result: self.open_result(r)).pack(fill="x", pady=2)
+        self.status_label.configure(text=f"{len(results)} games from {len(self.index)} positions "
+                                         f"in {elapsed * 1000:.0f} ms")
+
+    def open_result(self, result):
+        """Show that game, up to the matching position, on the analysis board."""
+        if self.tab.winfo_exists():
+            self.tab.open_board(self.index.store.board(result["game"], result["ply"]))
@@ -0,0 +1,221 @@
+"""
+Small learned square classifier, an alternative to template MSE matching.
+
+Each square becomes a compact feature vector (a 16x16 patch relative to the
+square's own background plus an 8x8 gradient-magnitude map), and a one-hidden-
+layer MLP written in NumPy maps it to one of 13 classes. All 64 squares of a
+board are classified with a single batched forward pass.
+
+Usage:
+    python -m src.square_classifier train --out models/square_classifier.npz
+    python -m src.square_classifier train --calibration my_site_start.png --boards 600
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import chess
+import cv2
+import numpy as np
+
+DEFAULT_MODEL_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "models", "square_classifier.npz"))
+
+CLASSES = ['.', 'P', 'N', 'B', 'R', 'Q', 'K', 'p', 'n', 'b', 'r', 'q', 'k']
+
+PATCH = 16
+MARGIN = 2  # matches split_board's 10% crop at 20px cells
+CELL = PATCH + 2 * MARGIN
+
+
+def board_features(board_image):
+    """(64, F) float32 feature matrix for every square, in split_board order."""
+    gray = cv2.cvtColor(board_image, cv2.COLOR_BGR2GRAY) if board_image.ndim == 3 else board_image
+    small = cv2.resize(gray, (8 * CELL, 8 * CELL), interpolation=cv2.INTER_AREA).astype(np.float32)
+    cells = small.reshape(8, CELL, 8, CELL).transpose(0, 2, 1, 3).reshape(64, CELL, CELL)
+
+    # The margin ring is almost always bare square colour: use it as the reference level
+    ring = np.concatenate([cells[:, :MARGIN, :].reshape(64, -1), cells[:, -MARGIN:, :].reshape(64, -1),
+                           cells[:, :, :MARGIN].reshape(64, -1), cells[:, :, -MARGIN:].reshape(64, -1)], axis=1)
+    background = np.median(ring, axis=1)[:, None, None]
+    inner = cells[:, MARGIN:-MARGIN, MARGIN:-MARGIN]
+    relative = (inner - background) / 64.0
+
+    gy, gx = np.gradient(inner, axis=(1, 2))
+    magnitude = np.sqrt(gx * gx + gy * gy).reshape(64, PATCH // 2, 2, PATCH // 2, 2).mean(axis=(2, 4)) / 64.0
+
+    absolute = background.reshape(64, 1) / 255.0
+    return np.concatenate([relative.reshape(64, -1), magnitude.reshape(64, -1), absolute], axis=1).astype(np.float32)
+
+
+def board_labels(fen):
+    """(64,) class indices for a FEN, in split_board order."""
+    board = chess.Board(fen)
+    labels = np.zeros(64, dtype=np.int64)
+    for r in range(8):
+        for c in range(8):
+            piece = board.piece_at(chess.square(c, 7 - r))
+            labels[r * 8 + c] = CLASSES.index(piece.symbol()) if piece else 0
+    return labels
+
+
+class SquareClassifier:
+    def __init__(self, n_features=None, hidden=64, seed=0):
+        self.hidden = hidden
+        self.params = None
+        if n_features is not None:
+            self._init_params(n_features, seed)
+
+    def _init_params(self, n_features, seed):
+        rng = np.random.default_rng(seed)
+        self.params = {
+            "W1": (rng.standard_normal((n_features, self.hidden)) * np.sqrt(2.0 / n_features)).astype(np.float32),
+            "b1": np.zeros(self.hidden, dtype=np.float32),
+            "W2": (rng.standard_normal((self.hidden, len(CLASSES))) * np.sqrt(1.0 / self.hidden)).astype(np.float32),
+            "b2": np.zeros(len(CLASSES), dtype=np.float32),
+        }
+
+    def save(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # float16 halves the file; the network is far less precise than that anyway
+        np.savez_compressed(path, **{k: v.astype(np.float16) for k, v in self.params.items()})
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            params = {k: data[k].astype(np.float32) for k in data.files}
+        model = cls(hidden=params["W1"].shape[1])
+        model.params = params
+        return model
+
+    def _forward(self, x):
+        p = self.params
+        h = np.maximum(x @ p["W1"] + p["b1"], 0.0)
+        logits = h @ p["W2"] + p["b2"]
+        logits -= logits.max(axis=1, keepdims=True)
+        exp = np.exp(logits)
+        return h, exp / exp.sum(axis=1, keepdims=True)
+
+    def predict_proba(self, features):
+        return self._forward(features)[1]
+
+    def classify_board(self, board_image):
+        """Return (8x8 grid of piece symbols, (64,) confidences) from one forward pass."""
+        probs = self.predict_proba(board_features(board_image))
+        best = probs.argmax(axis=1)
+        grid = [[CLASSES[best[r * 8 + c]] for c in range(8)] for r in range(8)]
+        return grid, probs.max(axis=1)
+
+    def train(self, features, labels, epochs=20, batch_size=256, lr=0.003, weight_decay=1e-4, seed=0, verbose=False):
+        """Mini-batch Adam on cross-entropy."""
+        if self.params is None:
+            self._init_params(features.shape[1], seed)
+        rng = np.random.default_rng(seed)
+        moments = {k: (np.zeros_like(v), np.zeros_like(v)) for k, v in self.params.items()}
+        beta1, beta2, eps = 0.9, 0.999, 1e-8
+        step = 0
+        n = len(features)
+
+        for epoch in range(epochs):
+            order = rng.permutation(n)
+            total_loss = 0.0
+            for start in range(0, n, batch_size):
+                idx = order[start:start + batch_size]
+                x, y = features[idx], labels[idx]
+                h, probs = self._forward(x)
+                total_loss += -np.log(probs[np.arange(len(y)), y] + 1e-9).sum()
+
+                d_logits = probs
+                d_logits[np.arange(len(y)), y] -= 1.0
+                d_logits /= len(y)
+                p = self.params
+                grads = {"W2": h.T @ d_logits + weight_decay * p["W2"], "b2": d_logits.sum(axis=0)}
+                d_h = (d_logits @ p["W2"].T) * (h > 0)
+                grads["W1"] = x.T @ d_h + weight_decay * p["W1"]
+                grads["b1"] = d_h.sum(axis=0)
+
+                step += 1
+                for k, g in grads.items():
+                    m, v = moments[k]
+                    m *= beta1
+                    m += (1 - beta1) * g
+                    v *= beta2
+                    v += (1 - beta2) * g * g
+                    m_hat = m / (1 - beta1 ** step)
+                    v_hat = v / (1 - beta2 ** step)
+                    p[k] -= (lr * m_hat / (np.sqrt(v_hat) + eps)).astype(np.float32)
+            if verbose:
+                print(f"epoch {epoch + 1}/{epochs}: loss {total_loss / n:.4f}")
+
+
+def build_training_set(boards=400, seed=0, calibration_images=(), styles=None, sizes=(32, 48, 64)):
+    """
+    Features and labels from synthetic renders in random looks, plus the squares of
+    any user calibration images (starting positions), which are repeated with small
+    shifts so they carry weight next to the synthetic data.
+    """
+    from src.random_positions import random_fens
+    from src.vision_synth import SQUARE_THEMES, available_styles, render_board
+
+    rng = random.Random(seed)
+    styles = styles or available_styles()
+    features, labels = [], []
+    for i, fen in enumerate(random_fens(boards, seed=seed, min_plies=0)):
+        highlights = tuple(rng.sample(chess.SQUARES, 2)) if rng.random() < 0.3 else ()
+        image = render_board(fen, rng.choice(sizes), rng.choice(styles), rng.choice(list(SQUARE_THEMES)),
+                             noise=rng.choice([0.0, 0.0, 4.0, 8.0]), blur=rng.choice([0.0, 0.0, 0.7]),
+                             highlights=highlights, seed=seed + i)
+        features.append(board_features(image))
+        labels.append(board_labels(fen))
+
+    start_labels = board_labels(chess.STARTING_FEN)
+    for image in calibration_images:
+        h, w = image.shape[:2]
+        for dx in (-2, 0, 2):
+            for dy in (-2, 0, 2):
+                shifted = cv2.warpAffine(image, np.float32([[1, 0, dx], [0, 1, dy]]), (w, h),
+                                         borderMode=cv2.BORDER_REPLICATE)
+                features.append(board_features(shifted))
+                labels.append(start_labels)
+
+    return np.concatenate(features), np.concatenate(labels)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the square classifier.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    train = sub.add_parser("train", help="Train from synthetic renders (plus optional calibration images)")
+    train.add_argument("--out", default=DEFAULT_MODEL_PATH, help="Weight file to write")
+    train.add_argument("--boards", type=int, default=400, help="Synthetic boards to render")
+    train.add_argument("--calibration", nargs="*", default=[], help="Starting-position images from real sources")
+    train.add_argument("--epochs", type=int, default=20)
+    train.add_argument("--hidden", type=int, default=64)
+    train.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    calibration_images = []
+    for path in args.calibration:
+        image = cv2.imread(path)
+        if image is None:
+            print(f"Could not read {path}", file=sys.stderr)
+            return 1
+        calibration_images.append(image)
+
+    start = time.perf_counter()
+    features, labels = build_training_set(args.boards, args.seed, calibration_images)
+    print(f"Built {len(labels)} samples in {time.perf_counter() - start:.1f}s")
+
+    model = SquareClassifier(features.shape[1], hidden=args.hidden, seed=args.seed)
+    start = time.perf_counter()
+    model.train(features, labels, epochs=args.epochs, seed=args.seed, verbose=True)
+    print(f"Trained in {time.perf_counter() - start:.1f}s")
+    model.save(args.out)
+    print(f"Saved weights to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
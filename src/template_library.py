@@ -0,0 +1,179 @@
+"""
+On-disk library of calibrated piece sets.
+
+Each piece set is one compressed .npz file of grayscale templates, so offline
+jobs can start without a calibration image and positions from the middle of a
+game can be read directly.
+
+Usage:
+    python -m src.template_library save lichess-cburnett start.png
+    python -m src.template_library list
+    python -m src.template_library select position.png
+"""
+import argparse
+import os
+import sys
+
+import cv2
+import numpy as np
+
+DEFAULT_LIBRARY_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "piece_sets"))
+
+# Side of the downsampled squares used by the piece-set selector
+SELECT_SIZE = 16
+
+
+def _template_key(p_char):
+    # .npz keys are file names, so keep upper/lower case pieces apart on case-insensitive filesystems
+    if p_char == '.':
+        return "empty"
+    return ("w" if p_char.isupper() else "b") + p_char.lower()
+
+
+def _template_piece(key):
+    if key == "empty":
+        return '.'
+    return key[1].upper() if key[0] == "w" else key[1]
+
+
+def save_template_file(path, templates):
+    np.savez_compressed(path, **{_template_key(p): t for p, t in templates.items()})
+
+
+def load_template_file(path):
+    with np.load(path) as data:
+        return {_template_piece(k): data[k] for k in data.files}
+
+
+def _board_thumbnails(board_image):
+    """(64, S*S) float32 matrix of downsampled square interiors, in split_board order."""
+    gray = cv2.cvtColor(board_image, cv2.COLOR_BGR2GRAY) if board_image.ndim == 3 else board_image
+    # 10% margins like split_board: a 20px cell keeps its inner 16px
+    cell = SELECT_SIZE + 4
+    small = cv2.resize(gray, (8 * cell, 8 * cell), interpolation=cv2.INTER_AREA).astype(np.float32)
+    cells = small.reshape(8, cell, 8, cell).transpose(0, 2, 1, 3)[:, :, 2:-2, 2:-2]
+    return cells.reshape(64, -1)
+
+
+def _template_thumbnails(templates):
+    return np.stack([
+        cv2.resize(t, (SELECT_SIZE, SELECT_SIZE), interpolation=cv2.INTER_AREA).astype(np.float32).ravel()
+        for t in templates.values()
+    ])
+
+
+class TemplateLibrary:
+    def __init__(self, directory=DEFAULT_LIBRARY_DIR):
+        self.directory = directory
+        self._sets = {}        # name -> templates, loaded lazily
+        self._thumbnails = {}  # name -> (T, S*S) matrix for the selector
+
+    def path_for(self, name):
+        return os.path.join(self.directory, f"{name}.npz")
+
+    def list_sets(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(f[:-4] for f in os.listdir(self.directory) if f.endswith(".npz"))
+
+    def save(self, name, templates):
+        os.makedirs(self.directory, exist_ok=True)
+        save_template_file(self.path_for(name), templates)
+        self._sets[name] = templates
+        self._thumbnails.pop(name, None)
+
+    def load(self, name):
+        if name not in self._sets:
+            path = self.path_for(name)
+            if not os.path.exists(path):
+                raise KeyError(f"No piece set named '{name}' in {self.directory}")
+            self._sets[name] = load_template_file(path)
+        return self._sets[name]
+
+    def load_all(self):
+        return {name: self.load(name) for name in self.list_sets()}
+
+    def score_sets(self, board_image):
+        """
+        Score every stored set against a board image (lower is better).
+        Each set's score is the mean over the 64 squares of the best template MSE,
+        computed on 16x16 thumbnails with a single matrix product per set.
+        """
+        squares = _board_thumbnails(board_image)
+        square_norms = (squares ** 2).sum(axis=1)[:, None]
+        pixels = squares.shape[1]
+
+        scores = {}
+        for name in self.list_sets():
+            if name not in self._thumbnails:
+                self._thumbnails[name] = _template_thumbnails(self.load(name))
+            thumbs = self._thumbnails[name]
+            sq_err = square_norms + (thumbs ** 2).sum(axis=1)[None, :] - 2.0 * squares @ thumbs.T
+            scores[name] = float(sq_err.min(axis=1).mean() / pixels)
+        return scores
+
+    def select(self, board_image):
+        """Return (name, score) of the best matching piece set, or (None, inf) if the library is empty."""
+        scores = self.score_sets(board_image)
+        if not scores:
+            return None, float('inf')
+        name = min(scores, key=scores.get)
+        return name, scores[name]
+
+
+def resolve_templates(spec, library=None):
+    """Load templates from a .npz path or a piece set name in the library."""
+    if os.path.isfile(spec):
+        return load_template_file(spec)
+    return (library or TemplateLibrary()).load(spec)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the calibrated piece-set library.")
+    parser.add_argument("--library", default=DEFAULT_LIBRARY_DIR, help="Library directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    save = sub.add_parser("save", help="Calibrate from a starting-position image and store the set")
+    save.add_argument("name")
+    save.add_argument("image")
+    save.add_argument("--auto-locate", action="store_true", help="Find the board in the image first")
+
+    sub.add_parser("list", help="List stored piece sets")
+
+    select = sub.add_parser("select", help="Pick the best stored set for a board image")
+    select.add_argument("image")
+    select.add_argument("--auto-locate", action="store_true", help="Find the board in the image first")
+    args = parser.parse_args(argv)
+
+    library = TemplateLibrary(args.library)
+    if args.command == "list":
+        for name in library.list_sets():
+            print(name)
+        return 0
+
+    from src.vision import VisionHandler
+
+    image = cv2.imread(args.image)
+    if image is None:
+        print(f"Could not read {args.image}", file=sys.stderr)
+        return 1
+    if args.auto_locate:
+        from src.board_locator import BoardLocator
+        image = BoardLocator().extract_board(image)
+        if image is None:
+            print(f"No board found in {args.image}", file=sys.stderr)
+            return 1
+
+    if args.command == "save":
+        vision = VisionHandler()
+        vision.calibrate(image)
+        library.save(args.name, vision.templates)
+        print(f"Saved piece set '{args.name}' to {library.path_for(args.name)}")
+    else:
+        for name, score in sorted(library.score_sets(image).items(), key=lambda kv: kv[1]):
+            print(f"{score:10.1f}  {name}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+"""
+Always-on tracing of the UCI conversation with each engine process.
+
+TracingProtocol is python-chess's UciProtocol plus a bounded ring buffer
+(UciTrace) of timestamped lines: commands sent (">"), engine output ("<"),
+engine stderr ("!") and process events ("-"). Recording is one clock read and
+one deque append per line, so it stays on in production; only the last
+`capacity` lines are kept.
+
+Each search also feeds the metrics registry: time from "go" to the first
+"info" and to "bestmove", the longest silence during the search, and the idle
+time between searches. stats() derives the same figures from what is still in
+the buffer, for a dump.
+
+EngineHandler writes a dump to CRASH_DIR whenever an engine fails (the last
+MAX_CRASH_DUMPS are kept); the Metrics window's "UCI Traces..." button dumps
+every live engine on demand (dump_all()). The CHECKERCHESSER_TRACE_DIR
+environment variable moves CRASH_DIR, e.g. away from $TMPDIR for test runs.
+"""
+import collections
+import os
+import tempfile
+import threading
+import time
+import weakref
+
+import chess.engine
+
+from src.metrics import registry
+
+CRASH_DIR = os.environ.get("CHECKERCHESSER_TRACE_DIR") or os.path.join(tempfile.gettempdir(), "checkerchesser_traces")
+MAX_CRASH_DUMPS = 20
+
+_traces = weakref.WeakSet()  # every trace whose engine process is still referenced
+_traces_lock = threading.Lock()
+
+
+class UciTrace:
+    """Ring buffer of (perf_counter time, direction, line) for one engine process."""
+
+    def __init__(self, capacity=4000, label="engine"):
+        self.label = label
+        self.entries = collections.deque(maxlen=capacity)
+        self.total = 0  # lines ever recorded, to report how many fell out of the buffer
+        self.started = time.perf_counter()
+        self.started_wall = time.time()
+        self.last_received = self.started  # time of the engine's latest line, for hang detection
+        # Per-search state for the live metrics; only touched by the engine's event loop thread
+        self._go = None
+        self._first_info = False
+        self._last = None
+        self._silence = 0.0
+        self._bestmove = None
+        with _traces_lock:
+            _traces.add(self)
+
+    def record(self, direction, line):
+        now = time.perf_counter()
+        self.entries.append((now, direction, line))
+        self.total += 1
+        if direction == ">":
+            if line.startswith("go"):
+                if self._bestmove is not None:
+                    registry.histogram("uci_idle_seconds",
+                                       "Engine idle time between bestmove and the next go").record(now - self._bestmove)
+                self._go, self._first_info, self._last, self._silence = now, False, now, 0.0
+        elif direction == "<":
+            self.last_received = now
+            if self._go is None:
+                return
+            self._silence = max(self._silence, now - self._last)
+            self._last = now
+            if not self._first_info and line.startswith("info"):
+                self._first_info = True
+                registry.histogram("uci_go_to_first_info_seconds",
+                                   "Time from go to the engine's first info").record(now - self._go)
+            elif line.startswith("bestmove"):
+                registry.histogram("uci_go_to_bestmove_seconds", "Time from go to bestmove").record(now - self._go)
+                registry.histogram("uci_search_silence_seconds",
+                                   "Longest gap between engine lines in a search").record(self._silence)
+                self._go, self._bestmove = None, now
+
+    def lines(self):
+        """Copy of the buffer (deque.copy() is atomic, so the engine can keep writing)."""
+        return list(self.entries.copy())
+
+    def stats(self):
+        """Per-search timings derived from the buffered lines: {name: [seconds, ...]} plus 'unfinished'."""
+        stats = {"go_to_first_info": [], "go_to_bestmove": [], "search_silence": [], "idle": [], "unfinished": 0}
+        go = last = bestmove = None
+        first_info = False
+        silence = 0.0
+        for t, direction, line in self.lines():
+            if direction == ">" and line.startswith("go"):
+                if bestmove is not None:
+                    stats["idle"].append(t - bestmove)
+                go, last, first_info, silence = t, t, False, 0.0
+            elif direction == "<" and go is not None:
+                silence = max(silence, t - last)
+                last = t
+                if not first_info and line.startswith("info"):
+                    first_info = True
+                    stats["go_to_first_info"].append(t - go)
+                elif line.startswith("bestmove"):
+                    stats["go_to_bestmove"].append(t - go)
+                    stats["search_silence"].append(silence)
+                    go, bestmove = None, t
+            elif direction == "<" and line.startswith("bestmove"):
+                bestmove = t  # its go fell out of the buffer, but the idle time still starts here
+        stats["unfinished"] = int(go is not None)
+        return stats
+
+    def format_stats(self):
+        stats = self.stats()
+        rows = [f"searches: {len(stats['go_to_bestmove'])} finished, {stats['unfinished']} in progress"]
+        for name in ["go_to_first_info", "go_to_bestmove", "search_silence", "idle"]:
+            values = stats[name]
+            if values:
+                rows.append(f"{name:<17} n={len(values):<5} mean {sum(values) / len(values) * 1000:9.2f} ms  "
+                            f"max {max(values) * 1000:9.2f} ms")
+        return "\n".join(rows)
+
+    def format(self, reason=None):
+        """Text dump: header, derived stats, then every buffered line with its time since the trace started."""
+        lines = self.lines()
+        started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.started_wall))
+        header = [f"UCI trace of {self.label}, started {started}"]
+        if reason:
+            header.append(f"reason: {reason}")
+        header.append(f"{len(lines)} lines kept of {self.total} recorded")
+        body = [f"{t - self.started:12.4f}s {direction} {line}" for t, direction, line in lines]
+        return "\n".join(header + ["", self.format_stats(), ""] + body) + "\n"
+
+    def dump(self, path, reason=None):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.format(reason))
+        return path
+
+
+class TracingProtocol(chess.engine.UciProtocol):
+    """UciProtocol that records every line in a UciTrace (self.trace)."""
+
+    capacity = 4000
+
+    def __init__(self):
+        super().__init__()
+        self.trace = UciTrace(self.capacity)
+
+    def connection_made(self, transport):
+        super().connection_made(transport)
+        self.trace.label = f"pid {transport.get_pid()}"
+        self.trace.record("-", "process started")
+
+    def send_line(self, line):
+        self.trace.record(">", line)
+        super().send_line(line)
+
+    def line_received(self, line):
+        self.trace.record("<", line)
+        super().line_received(line)
+
+    def error_line_received(self, line):
+        self.trace.record("!", line)
+        super().error_line_received(line)
+
+    def connection_lost(self, exc):
+        code = self.transport.get_returncode() if self.transport else None
+        self.trace.record("-", f"process exited (code {code})" + (f": {exc!r}" if exc else ""))
+        super().connection_lost(exc)
+
+
+def live_traces():
+    with _traces_lock:
+        return sorted(_traces, key=lambda trace: trace.started)
+
+
+def _file_name(trace, suffix=""):
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime())
+    label = "".join(c if c.isalnum() or c in "-_." else "_" for c in trace.label)
+    return f"uci-{stamp}-{label}{suffix}.log"
+
+
+def dump_all(directory):
+    """Write every live engine's trace into `directory`. Returns the paths written."""
+    os.makedirs(directory, exist_ok=True)
+    return [trace.dump(os.path.join(directory, _file_name(trace, f"-{i}")), "requested")
+            for i, trace in enumerate(live_traces())]
+
+
+def dump_crash(trace, reason):
+    """Save a failed engine's trace to CRASH_DIR, keeping only the newest MAX_CRASH_DUMPS files."""
+    try:
+        os.makedirs(CRASH_DIR, exist_ok=True)
+        path = trace.dump(os.path.join(CRASH_DIR, _file_name(trace, f"-{time.time_ns() % 1000000:06d}")), reason)
+        dumps = sorted((os.path.join(CRASH_DIR, name) for name in os.listdir(CRASH_DIR) if name.startswith("uci-")),
+                       key=os.path.getmtime)
+        for old in dumps[:-MAX_CRASH_DUMPS]:
+            os.remove(old)
+        return path
+    except OSError as e:
+        print(f"Could not save UCI trace: {e}")
+        return None
@@ -0,0 +1,314 @@
+"""
+Reconstruct a PGN from a recorded chess video.
+
+Usage:
+    python -m src.video_pgn lecture.mp4 --out lecture.pgn
+    python -m src.video_pgn otb.mp4 --crop 420,80,640,640 --templates pieces.npz --sample-fps 4
+    python -m src.video_pgn stream.mp4 --auto-locate
+
+The video is read as a stream. Each sampled frame is reduced to a tiny per-square
+signature; frames that match the previous one are cheap to skip, and only the
+squares whose signature changed since the last accepted position are
+re-classified. Every stable board change is matched against the legal moves of
+the current chess.Board, which keeps turn, castling and en passant rights right.
+"""
+import argparse
+import sys
+import time
+
+import chess
+import chess.pgn
+import cv2
+import numpy as np
+
+from src.board_locator import BoardLocator
+from src.square_classifier import DEFAULT_MODEL_PATH
+from src.template_library import DEFAULT_LIBRARY_DIR, TemplateLibrary, resolve_templates
+from src.vision import VisionHandler
+
+# Pixels per square side in the signature thumbnail
+SIGNATURE_SIZE = 8
+
+
+def square_signatures(board_image):
+    """Downsample the board to an (8, 8, S*S) array of per-square grayscale thumbnails."""
+    gray = cv2.cvtColor(board_image, cv2.COLOR_BGR2GRAY)
+    side = 8 * SIGNATURE_SIZE
+    small = cv2.resize(gray, (side, side), interpolation=cv2.INTER_AREA).astype(np.int16)
+    # (row, y, col, x) -> (row, col, y*x)
+    return small.reshape(8, SIGNATURE_SIZE, 8, SIGNATURE_SIZE).transpose(0, 2, 1, 3).reshape(8, 8, -1)
+
+
+def changed_squares(sig_a, sig_b, threshold):
+    """
+    Boolean (8, 8) mask of changed squares.
+    Pieces rarely fill a square, so the score is the mean of the largest quarter of
+    the pixel differences rather than the plain mean.
+    """
+    diff = np.abs(sig_a - sig_b)
+    k = diff.shape[2] // 4
+    return np.partition(diff, -k, axis=2)[:, :, -k:].mean(axis=2) > threshold
+
+
+def format_timestamp(seconds):
+    minutes, secs = divmod(seconds, 60)
+    hours, minutes = divmod(int(minutes), 60)
+    return f"{hours}:{minutes:02d}:{secs:04.1f}"
+
+
+def _visual_to_square(r, c):
+    # split_board order: row 0 is rank 8, col 0 is file a
+    return chess.square(c, 7 - r)
+
+
+def move_diff(board, move):
+    """Squares whose contents change when `move` is played, with the resulting pieces."""
+    after = board.copy(stack=False)
+    after.push(move)
+    touched = {move.from_square, move.to_square}
+    if board.is_castling(move):
+        touched |= {sq for sq in chess.SQUARES if board.piece_at(sq) != after.piece_at(sq)}
+    elif board.is_en_passant(move):
+        touched.add(move.to_square + (-8 if board.turn == chess.WHITE else 8))
+    return {sq: after.piece_at(sq) for sq in touched}
+
+
+class VideoPGNReconstructor:
+    """
+    Turns a stream of board images into a game.
+
+    The reconstructor is independent of where frames come from; feed it cropped
+    board images with feed_frame() and read the result from self.game.
+    """
+
+    def __init__(self, vision, start_board=None, diff_threshold=8.0, stable_frames=2):
+        self.vision = vision
+        self.board = start_board.copy() if start_board else chess.Board()
+        self.diff_threshold = diff_threshold
+        self.stable_frames = stable_frames
+
+        self.game = chess.pgn.Game()
+        self.game.setup(self.board)
+        self.node = self.game
+
+        self.committed_sig = None
+        self.previous_sig = None
+        self.still_count = 0
+
+        self.stats = {"frames": 0, "skipped": 0, "classified_squares": 0, "moves": 0, "unmatched": 0}
+
+    def feed_frame(self, board_image, timestamp):
+        """Process one board image. Returns the list of moves accepted from this frame."""
+        self.stats["frames"] += 1
+        sig = square_signatures(board_image)
+
+        if self.committed_sig is None:
+            self.committed_sig = sig
+            self.previous_sig = sig
+            return []
+
+        # Cheap skip: the frame looks like the previous one and we already handled it
+        if not changed_squares(sig, self.previous_sig, self.diff_threshold).any():
+            self.still_count += 1
+        else:
+            # Motion (a hand, a piece in flight): wait for the board to settle
+            self.still_count = 0
+        self.previous_sig = sig
+
+        if self.still_count != self.stable_frames:
+            self.stats["skipped"] += 1
+            return []
+
+        mask = changed_squares(sig, self.committed_sig, self.diff_threshold)
+        if not mask.any():
+            return []
+
+        changed = self._classify_changed(board_image, mask)
+        moves = self._match_moves(changed)
+        if not moves:
+            self.stats["unmatched"] += 1
+            return []
+
+        for move in moves:
+            self.node = self.node.add_variation(move, comment=f"[%ts {format_timestamp(timestamp)}]")
+            self.board.push(move)
+        self.stats["moves"] += len(moves)
+        self.committed_sig = sig
+        return moves
+
+    def _classify_changed(self, board_image, mask):
+        changed = {}
+        if self.vision.classifier is not None:
+            # The learned classifier does all 64 squares in one matrix product anyway
+            grid = self.vision.classifier.classify_board(board_image)[0]
+            symbols = {(r, c): grid[r][c] for r, c in zip(*np.nonzero(mask))}
+        else:
+            squares = self.vision.split_board(board_image)
+            symbols = {(r, c): self.vision.match_square(squares[r][c]) for r, c in zip(*np.nonzero(mask))}
+        for (r, c), symbol in symbols.items():
+            changed[_visual_to_square(r, c)] = None if symbol == '.' else chess.Piece.from_symbol(symbol)
+        self.stats["classified_squares"] += len(changed)
+        return changed
+
+    def _score(self, diff, changed):
+        """How many of the move's resulting pieces agree with the classifier."""
+        return sum(1 for sq, piece in diff.items() if changed.get(sq) == piece)
+
+    def _match_moves(self, changed):
+        """
+        Find the move (or move pair, if one was missed) explaining the changed squares.
+
+        The set of changed squares almost always pins down the move on its own, so
+        classifier mistakes only matter for choosing between promotion pieces.
+        """
+        changed_set = set(changed)
+
+        candidates = []
+        for move in self.board.legal_moves:
+            diff = move_diff(self.board, move)
+            if set(diff) == changed_set:
+                candidates.append((self._score(diff, changed), move))
+        if candidates:
+            return [max(candidates, key=lambda c: c[0])[1]]
+
+        # A move played too quickly to settle: try two plies
+        pairs = []
+        for first in self.board.legal_moves:
+            first_diff = move_diff(self.board, first)
+            if not set(first_diff) <= changed_set:
+                continue
+            self.board.push(first)
+            for second in self.board.legal_moves:
+                second_diff = move_diff(self.board, second)
+                combined = dict(first_diff)
+                combined.update(second_diff)
+                if set(combined) == changed_set:
+                    pairs.append((self._score(combined, changed), first, second))
+            self.board.pop()
+        if pairs:
+            best = max(pairs, key=lambda p: p[0])
+            return [best[1], best[2]]
+
+        # Fall back to the best-agreeing move touching only changed squares (sensor noise elsewhere)
+        partial = []
+        for move in self.board.legal_moves:
+            diff = move_diff(self.board, move)
+            if set(diff) <= changed_set:
+                score = self._score(diff, changed)
+                if score == len(diff):
+                    partial.append((score, move))
+        if partial:
+            return [max(partial, key=lambda c: c[0])[1]]
+        return []
+
+
+def crop_frame(frame, crop):
+    if crop is None:
+        return frame
+    left, top, width, height = crop
+    return frame[top:top + height, left:left + width]
+
+
+def reconstruct_video(path, vision=None, crop=None, sample_fps=5.0, start_fen=None,
+                      diff_threshold=8.0, stable_frames=2, auto_locate=False):
+    """
+    Run the whole pipeline over a video file. Returns (game, stats).
+    If `vision` is not calibrated, the first frame is used as a starting-position calibration.
+    With auto_locate, the board is found in the first frame and the cached geometry
+    is reused (and re-verified) for the rest of the video.
+    """
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video {path}")
+
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+    step = max(1, int(round(fps / sample_fps))) if sample_fps else 1
+    vision = vision or VisionHandler()
+    locator = BoardLocator() if auto_locate and crop is None else None
+    start_board = chess.Board(start_fen) if start_fen else chess.Board()
+
+    reconstructor = None
+    frame_index = 0
+    start = time.perf_counter()
+    try:
+        while True:
+            # grab() skips decoding into a numpy array for frames we do not sample
+            if not cap.grab():
+                break
+            if frame_index % step == 0:
+                ok, frame = cap.retrieve()
+                if not ok:
+                    break
+                if locator is not None:
+                    board_image = locator.extract_board(frame, source_key=path, square_size=48)
+                    if board_image is None:
+                        frame_index += 1
+                        continue
+                else:
+                    board_image = crop_frame(frame, crop)
+                if reconstructor is None:
+                    if not vision.is_calibrated:
+                        vision.calibrate(board_image)
+                    reconstructor = VideoPGNReconstructor(vision, start_board, diff_threshold, stable_frames)
+                reconstructor.feed_frame(board_image, frame_index / fps)
+            frame_index += 1
+    finally:
+        cap.release()
+
+    if reconstructor is None:
+        raise ValueError(f"No frames could be read from {path}")
+
+    stats = dict(reconstructor.stats)
+    stats["video_seconds"] = frame_index / fps
+    stats["elapsed_seconds"] = time.perf_counter() - start
+    game = reconstructor.game
+    game.headers["Event"] = "Video reconstruction"
+    game.headers["Site"] = path
+    game.headers["Result"] = reconstructor.board.result(claim_draw=True) if reconstructor.board.is_game_over() else "*"
+    return game, stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reconstruct a PGN from a chess video.")
+    parser.add_argument("video", help="Local video file")
+    parser.add_argument("--out", default="-", help="Output PGN file, '-' for stdout")
+    parser.add_argument("--crop", help="Board region in the frame as left,top,width,height")
+    parser.add_argument("--auto-locate", action="store_true", help="Find the board in the frame automatically")
+    parser.add_argument("--templates", help="Template .npz file or piece set name (default: calibrate from the first frame)")
+    parser.add_argument("--classifier", nargs="?", const=DEFAULT_MODEL_PATH,
+                        help="Use the learned square classifier (optionally a weight file path)")
+    parser.add_argument("--library", default=DEFAULT_LIBRARY_DIR, help="Piece set library directory")
+    parser.add_argument("--start-fen", help="Position at the start of the video (default: initial position)")
+    parser.add_argument("--sample-fps", type=float, default=5.0, help="Frames per second to inspect")
+    parser.add_argument("--threshold", type=float, default=8.0, help="Per-square change threshold (gray levels)")
+    parser.add_argument("--stable-frames", type=int, default=2, help="Still frames required before accepting a change")
+    args = parser.parse_args(argv)
+
+    crop = tuple(int(v) for v in args.crop.split(",")) if args.crop else None
+    vision = VisionHandler()
+    if args.classifier is not None:
+        vision.use_classifier(args.classifier)
+    elif args.templates:
+        vision.templates = resolve_templates(args.templates, TemplateLibrary(args.library))
+        vision.is_calibrated = True
+
+    game, stats = reconstruct_video(args.video, vision, crop=crop, sample_fps=args.sample_fps,
+                                    start_fen=args.start_fen, diff_threshold=args.threshold,
+                                    stable_frames=args.stable_frames, auto_locate=args.auto_locate)
+
+    text = str(game) + "\n"
+    if args.out == "-":
+        sys.stdout.write(text)
+    else:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    speed = stats["video_seconds"] / stats["elapsed_seconds"] if stats["elapsed_seconds"] > 0 else 0.0
+    print(f"{stats['moves']} moves from {stats['video_seconds']:.0f}s of video in "
+          f"{stats['elapsed_seconds']:.1f}s ({speed:.0f}x real time), "
+          f"{stats['unmatched']} unmatched changes.", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,67 @@
+import time
+
 import cv2
 import numpy as np
 import mss
 
+from src.metrics import registry
+from src.template_library import TemplateLibrary, load_template_file, save_template_file
+
+# Gray levels within this distance of a template's background level count as background
+BACKGROUND_TOLERANCE = 12
+# Weight of a template's antialiased piece outline in the match error
+RIM_WEIGHT = 0.1
+
+
+def _background_level(gray):
+    """Square colour of a grayscale square crop: the median of its outer ring of pixels."""
+    ring = np.concatenate([gray[0], gray[-1], gray[1:-1, 0], gray[1:-1, -1]])
+    return float(np.median(ring))
+
+
+def _prepare_template(template, shape):
+    """
+    (template, background mask, weight) for matching squares of `shape` on either square colour:
+    the template as float32, the pixels to repaint with each square's colour, and weights that
+    play down the antialiased rim of the piece, which blends with the template's own colour.
+    """
+    if template.shape != shape:
+        template = cv2.resize(template, (shape[1], shape[0]))
+    template = template.astype(np.float32)
+    foreground = (np.abs(template - _background_level(template)) > BACKGROUND_TOLERANCE).astype(np.uint8)
+    kernel = np.ones((3, 3), np.uint8)
+    rim = cv2.dilate(foreground, kernel) != cv2.erode(foreground, kernel)
+    return template, foreground == 0, np.where(rim, RIM_WEIGHT, 1.0)
+
+
 class VisionHandler:
-    def __init__(self):
+    def __init__(self, classifier=None):
         self.templates = {}
         self.is_calibrated = False
+        # Optional learned classifier (src/square_classifier.py); replaces template matching when set
+        self.classifier = classifier
+        if classifier is not None:
+            self.is_calibrated = True
+
+    @property
+    def templates(self):
+        return self._templates
+
+    @templates.setter
+    def templates(self, templates):
+        # Assign a new dict to change templates: the prepared forms are cached per square shape
+        self._templates = templates
+        self._prepared = {}
+
+    def _prepared_templates(self, shape):
+        """[(piece, template, background mask, weight, weight sum)] for squares of `shape`."""
+        if shape not in self._prepared:
+            prepared = []
+            for p_char, template in self._templates.items():
+                template, background, weight = _prepare_template(template, shape)
+                prepared.append((p_char, template, background, weight, float(max(weight.sum(), 1))))
+            self._prepared[shape] = prepared
+        return self._prepared[shape]
 
     def capture_screen(self, region):
         """
@@ -65,7 +121,7 @@ class VisionHandler:
         R N B Q K B N R
         """
         squares = self.split_board(board_image)
-        self.templates = {}
+        templates = {}
 
         # Dictionary mapping piece chars to list of coordinates (row, col) in start pos
         # We'll take the average or just the first instance as template
@@ -107,53 +163,131 @@ class VisionHandler:
             gray_template = cv2.cvtColor(template, cv2.COLOR_BGR2GRAY)
             
             # Store just one template for now
-            self.templates[p_char] = gray_template
+            templates[p_char] = gray_template
+
+        self.templates = templates
 
         self.is_calibrated = True
         print("Calibration complete.")
 
     def match_square(self, square_img):
+        return self.match_square_scored(square_img)[0]
+
+    def match_square_scored(self, square_img):
+        """
+        Match a square against all templates.
+        Returns (piece, confidence) where confidence is in [0, 1] and measures how
+        clearly the best template beat the runner-up (0 = tie, 1 = perfect match).
+        """
         if not self.templates:
-            return '.'
+            return '.', 0.0
             
         gray_sq = cv2.cvtColor(square_img, cv2.COLOR_BGR2GRAY)
         
         best_score = float('inf')
+        second_score = float('inf')
         best_piece = '.'
         
         # Compare against all templates using MSE
-        # Note: Templates must be same size. If slightly different due to rounding, resize.
-        
-        target_h, target_w = gray_sq.shape
-        
-        for p_char, template in self.templates.items():
-            # Resize template to match square if needed (should be identical if grid is uniform)
-            if template.shape != gray_sq.shape:
-                template = cv2.resize(template, (target_w, target_h))
-                
-            # Mean Squared Error
-            err = np.sum((gray_sq.astype("float") - template.astype("float")) ** 2)
-            err /= float(gray_sq.shape[0] * gray_sq.shape[1])
+        # Templates are prepared (resized if the grid is not uniform, masks computed) once per square shape
+        gray_sq = gray_sq.astype(np.float32)
+
+        # Templates are cut from one square colour; repaint their background with this square's
+        # so a piece matches on light and dark squares alike
+        square_bg = _background_level(gray_sq)
+
+        for p_char, template, background, weight, weight_sum in self._prepared_templates(gray_sq.shape):
+            template = np.where(background, np.float32(square_bg), template)
+
+            # Weighted Mean Squared Error
+            err = float(np.sum((gray_sq - template) ** 2 * weight)) / weight_sum
             
             if err < best_score:
+                second_score = best_score
                 best_score = err
                 best_piece = p_char
+            elif err < second_score:
+                second_score = err
+        
+        if second_score == float('inf'):
+            confidence = 1.0
+        elif second_score == 0:
+            confidence = 0.0
+        else:
+            confidence = 1.0 - best_score / second_score
                 
-        return best_piece
+        return best_piece, confidence
+
+    def save_templates(self, path):
+        """Save calibrated templates to a compressed .npz file."""
+        save_template_file(path, self.templates)
+
+    def load_templates(self, path):
+        """Load templates previously written by save_templates."""
+        self.templates = load_template_file(path)
+        self.is_calibrated = bool(self.templates)
+
+    def use_classifier(self, path=None):
+        """Load a trained SquareClassifier weight file and use it for recognition."""
+        from src.square_classifier import DEFAULT_MODEL_PATH, SquareClassifier
+        self.classifier = SquareClassifier.load(path or DEFAULT_MODEL_PATH)
+        self.is_calibrated = True
+
+    def use_piece_set(self, name, library=None):
+        """Load a stored piece set from the template library instead of calibrating."""
+        library = library or TemplateLibrary()
+        self.templates = library.load(name)
+        self.is_calibrated = bool(self.templates)
+
+    def auto_select_piece_set(self, board_image, library=None):
+        """
+        Pick the stored piece set that best matches board_image and load it.
+        Works on any position, so no starting-position image is needed.
+        Returns the chosen set name, or None if the library is empty.
+        """
+        library = library or TemplateLibrary()
+        name, _ = library.select(board_image)
+        if name is not None:
+            self.use_piece_set(name, library)
+        return name
 
     def get_fen_from_image(self, board_image):
         if not self.is_calibrated:
             # Fallback or error
             return None
+        return self.get_fen_with_confidence(board_image)[0]
+
+    def get_fen_with_confidence(self, board_image):
+        """
+        Like get_fen_from_image, but also returns the confidence of the weakest square,
+        so callers can flag images that need a manual check.
+        """
+        if not self.is_calibrated:
+            return None, 0.0
         
-        squares = self.split_board(board_image)
-        fen_rows = []
+        start = time.perf_counter()
+        if self.classifier is not None:
+            # All 64 squares in one batched forward pass
+            grid, confidences = self.classifier.classify_board(board_image)
+            min_confidence = float(confidences.min())
+        else:
+            squares = self.split_board(board_image)
+            grid = []
+            min_confidence = 1.0
+            for r in range(8):
+                row = []
+                for c in range(8):
+                    piece, confidence = self.match_square_scored(squares[r][c])
+                    min_confidence = min(min_confidence, confidence)
+                    row.append(piece)
+                grid.append(row)
         
+        fen_rows = []
         for r in range(8):
             empty_count = 0
             row_str = ""
             for c in range(8):
-                piece = self.match_square(squares[r][c])
+                piece = grid[r][c]
                 
                 if piece == '.':
                     empty_count += 1
@@ -179,4 +313,5 @@ class VisionHandler:
         # We can try to infer from previous state or just ask the user.
         # For this version, let's return the board part, and handle the rest in logic.
         
-        return f"{fen_board} w KQkq - 0 1"
+        registry.histogram("vision_classify_seconds", "Board image to FEN time").record(time.perf_counter() - start)
+        return f"{fen_board} w KQkq - 0 1", min_confidence
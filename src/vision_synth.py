@@ -0,0 +1,180 @@
+"""
+Synthetic chess board renderer for testing and benchmarking the vision code.
+
+Boards are drawn with Pillow from a FEN in several piece styles, square themes,
+sizes and noise/blur levels. Every render comes with its ground truth, so the
+vision pipeline can be measured offline without a screen.
+"""
+import random
+
+import chess
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+SQUARE_THEMES = {
+    "green": ("#EBECD0", "#779556"),  # same colours as BoardUI
+    "brown": ("#F0D9B5", "#B58863"),
+    "blue": ("#DEE3E6", "#8CA2AD"),
+    "gray": ("#E0E0E0", "#A0A0A0"),
+}
+
+HIGHLIGHT_COLOR = (246, 246, 105)
+
+# Unicode glyphs; the filled (black) glyphs are used for both colours in the "glyph" style
+FILLED_GLYPHS = {chess.PAWN: "♟", chess.KNIGHT: "♞", chess.BISHOP: "♝",
+                 chess.ROOK: "♜", chess.QUEEN: "♛", chess.KING: "♚"}
+OUTLINE_GLYPHS = {chess.PAWN: "♙", chess.KNIGHT: "♘", chess.BISHOP: "♗",
+                  chess.ROOK: "♖", chess.QUEEN: "♕", chess.KING: "♔"}
+
+# Fonts known to contain the chess glyphs (Windows, Linux, macOS)
+GLYPH_FONTS = ["seguisym.ttf", "DejaVuSans.ttf", "DejaVuSans-Bold.ttf", "Arial Unicode.ttf", "FreeSerif.ttf"]
+
+# Procedural silhouettes on a unit square (x right, y down), one polygon list per piece type
+SHAPES = {
+    chess.PAWN: [[(0.35, 0.85), (0.65, 0.85), (0.58, 0.55), (0.62, 0.45), (0.5, 0.28), (0.38, 0.45), (0.42, 0.55)]],
+    chess.KNIGHT: [[(0.28, 0.85), (0.72, 0.85), (0.68, 0.5), (0.6, 0.2), (0.4, 0.25), (0.25, 0.45), (0.45, 0.5), (0.35, 0.65)]],
+    chess.BISHOP: [[(0.3, 0.85), (0.7, 0.85), (0.6, 0.6), (0.65, 0.4), (0.5, 0.15), (0.35, 0.4), (0.4, 0.6)]],
+    chess.ROOK: [[(0.27, 0.85), (0.73, 0.85), (0.67, 0.35), (0.72, 0.35), (0.72, 0.18), (0.6, 0.18), (0.6, 0.25),
+                  (0.55, 0.25), (0.55, 0.18), (0.45, 0.18), (0.45, 0.25), (0.4, 0.25), (0.4, 0.18), (0.28, 0.18),
+                  (0.28, 0.35), (0.33, 0.35)]],
+    chess.QUEEN: [[(0.25, 0.85), (0.75, 0.85), (0.82, 0.25), (0.65, 0.5), (0.5, 0.15), (0.35, 0.5), (0.18, 0.25)]],
+    chess.KING: [[(0.25, 0.85), (0.75, 0.85), (0.7, 0.4), (0.55, 0.4), (0.55, 0.28), (0.65, 0.28), (0.65, 0.2),
+                  (0.55, 0.2), (0.55, 0.1), (0.45, 0.1), (0.45, 0.2), (0.35, 0.2), (0.35, 0.28), (0.45, 0.28),
+                  (0.45, 0.4), (0.3, 0.4)]],
+}
+
+_font_cache = {}
+
+
+def _load_font(names, size):
+    key = (tuple(names), size)
+    if key not in _font_cache:
+        font = None
+        for name in names:
+            try:
+                font = ImageFont.truetype(name, size)
+                break
+            except OSError:
+                continue
+        _font_cache[key] = font
+    return _font_cache[key]
+
+
+def _glyph_font(size):
+    return _load_font(GLYPH_FONTS, size)
+
+
+def available_styles():
+    """Piece styles that can be rendered on this machine (glyph styles need a suitable font)."""
+    styles = ["shape", "letter"]
+    if _glyph_font(20) is not None:
+        styles = ["glyph", "outline"] + styles
+    return styles
+
+
+def _draw_piece(draw, piece, x, y, sq, style):
+    fg, bg = ((255, 255, 255), (20, 20, 20)) if piece.color == chess.WHITE else ((20, 20, 20), (230, 230, 230))
+    cx, cy = x + sq / 2, y + sq / 2
+
+    if style == "shape":
+        for poly in SHAPES[piece.piece_type]:
+            points = [(x + px * sq, y + py * sq) for px, py in poly]
+            draw.polygon(points, fill=fg, outline=bg, width=max(1, sq // 24))
+    elif style == "letter":
+        r = sq * 0.38
+        draw.ellipse((cx - r, cy - r, cx + r, cy + r), fill=fg, outline=bg, width=max(1, sq // 24))
+        font = ImageFont.load_default(size=int(sq * 0.5))
+        draw.text((cx, cy), piece.symbol().upper(), fill=bg, font=font, anchor="mm")
+    elif style == "glyph":
+        font = _glyph_font(int(sq * 0.8))
+        draw.text((cx, cy), FILLED_GLYPHS[piece.piece_type], fill=fg, font=font, anchor="mm",
+                  stroke_width=max(1, sq // 32), stroke_fill=bg)
+    elif style == "outline":
+        # Book diagram style: hollow glyphs for White, filled for Black, always in black ink
+        font = _glyph_font(int(sq * 0.8))
+        glyphs = OUTLINE_GLYPHS if piece.color == chess.WHITE else FILLED_GLYPHS
+        draw.text((cx, cy), glyphs[piece.piece_type], fill=(0, 0, 0), font=font, anchor="mm")
+    else:
+        raise ValueError(f"Unknown piece style '{style}'")
+
+
+def render_board(fen, square_size=48, style="shape", theme="green", noise=0.0, blur=0.0,
+                 highlights=(), seed=None):
+    """
+    Render the placement part of `fen` as a BGR numpy image cropped to the board edges.
+
+    noise: standard deviation of additive Gaussian noise (gray levels)
+    blur: Gaussian blur radius in pixels
+    highlights: squares tinted like a last-move highlight
+    """
+    board = chess.Board(fen)
+    light, dark = SQUARE_THEMES[theme]
+    sq = square_size
+    image = Image.new("RGB", (8 * sq, 8 * sq))
+    draw = ImageDraw.Draw(image)
+
+    for r in range(8):
+        for c in range(8):
+            square = chess.square(c, 7 - r)
+            x, y = c * sq, r * sq
+            draw.rectangle((x, y, x + sq - 1, y + sq - 1), fill=light if (r + c) % 2 == 0 else dark)
+            if square in highlights:
+                draw.rectangle((x, y, x + sq - 1, y + sq - 1), fill=HIGHLIGHT_COLOR)
+            piece = board.piece_at(square)
+            if piece:
+                _draw_piece(draw, piece, x, y, sq, style)
+
+    if blur > 0:
+        image = image.filter(ImageFilter.GaussianBlur(blur))
+
+    pixels = np.asarray(image, dtype=np.float32)
+    if noise > 0:
+        rng = np.random.default_rng(seed)
+        pixels = pixels + rng.normal(0.0, noise, pixels.shape)
+    # RGB -> BGR to match OpenCV captures
+    return np.clip(pixels, 0, 255).astype(np.uint8)[:, :, ::-1].copy()
+
+
+def ground_truth(fen):
+    """8x8 grid of piece symbols ('.' for empty) in split_board order (rank 8 first)."""
+    board = chess.Board(fen)
+    grid = []
+    for r in range(8):
+        row = []
+        for c in range(8):
+            piece = board.piece_at(chess.square(c, 7 - r))
+            row.append(piece.symbol() if piece else '.')
+        grid.append(row)
+    return grid
+
+
+def generate_samples(fens, square_size=48, style="shape", theme="green", noise=0.0, blur=0.0,
+                     highlight_last_move=False, seed=0):
+    """
+    Yield dicts with the rendered image and its ground truth for each FEN.
+    Noise is seeded per sample so runs are reproducible.
+    """
+    rng = random.Random(seed)
+    for i, fen in enumerate(fens):
+        highlights = ()
+        if highlight_last_move:
+            highlights = tuple(rng.sample(chess.SQUARES, 2))
+        image = render_board(fen, square_size, style, theme, noise, blur, highlights, seed=seed + i)
+        yield {
+            "image": image,
+            "fen": fen,
+            "board_fen": chess.Board(fen).board_fen(),
+            "grid": ground_truth(fen),
+            "style": style,
+            "theme": theme,
+            "square_size": square_size,
+            "noise": noise,
+            "blur": blur,
+        }
+
+
+def count_correct_squares(predicted_fen, fen):
+    """Number of the 64 squares whose predicted content matches the ground truth."""
+    predicted = ground_truth(predicted_fen.split()[0] + " w - - 0 1")
+    truth = ground_truth(fen)
+    return sum(predicted[r][c] == truth[r][c] for r in range(8) for c in range(8))
@@ -0,0 +1,26 @@
+import os
+import shutil
+import tempfile
+
+# Engines the tests crash on purpose dump their UCI traces (src/uci_trace.py) here instead of the
+# user's $TMPDIR/checkerchesser_traces. Set before any test module imports src, and inherited by
+# worker processes.
+TRACE_DIR = tempfile.mkdtemp(prefix="checkerchesser_test_traces-")
+os.environ["CHECKERCHESSER_TRACE_DIR"] = TRACE_DIR
+
+# Scriptable stand-in engine shared by the engine tests: `from conftest import FAKE_ENGINE, fake_handler`
+FAKE_ENGINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_uci_engine.py")
+
+
+def fake_handler(*args, **kwargs):
+    """Started EngineHandler on the fake engine; args are its command line, kwargs go to EngineHandler."""
+    from src.engine import EngineHandler
+
+    handler = EngineHandler(FAKE_ENGINE, list(args), **kwargs)
+    success, msg = handler.initialize_engine()
+    assert success, msg
+    return handler
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(TRACE_DIR, ignore_errors=True)
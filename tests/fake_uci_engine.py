@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Scriptable stand-in for a UCI engine, for tests and benchmarks.
+
+It speaks enough UCI for python-chess and EngineHandler, plays legal moves
+(ranked deterministically), supports MultiPV, and can inject latency, crashes
+and hangs, or replay a recorded transcript.
+
+Usage:
+    tests/fake_uci_engine.py [--latency S] [--depth N] [--crash-after N] [--hang-after N]
+                             [--transcript FILE] [--name NAME]
+
+Transcript files hold the engine side of a session: lines starting with "> "
+are commands expected from the GUI, the lines after them ("< ..." ) are sent
+back verbatim when that command arrives. Commands not in the transcript fall
+back to the built-in behaviour.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import chess
+
+
+def send(line):
+    sys.stdout.write(line + "\n")
+    sys.stdout.flush()
+
+
+def load_transcript(path):
+    """List of (command, [responses]) in recorded order."""
+    script = []
+    with open(path, encoding="utf-8") as f:
+        for raw in f:
+            line = raw.rstrip("\n")
+            if line.startswith("> "):
+                script.append((line[2:].strip(), []))
+            elif line.startswith("< ") and script:
+                script[-1][1].append(line[2:])
+    return script
+
+
+def ranked_moves(board):
+    """Deterministic move ranking: captures and checks first, then by UCI string."""
+    def key(move):
+        return (not board.is_capture(move), not board.gives_check(move), move.uci())
+    return sorted(board.legal_moves, key=key)
+
+
+class FakeEngine:
+    def __init__(self, args):
+        self.args = args
+        self.name = args.name
+        self.board = chess.Board()
+        self.multipv = 1
+        self.options = {"Threads": "1", "Hash": "16", "MultiPV": "1"}
+        self.go_count = 0
+        self.hung = False
+        self.search_thread = None
+        self.stop_event = threading.Event()
+        self.transcript = load_transcript(args.transcript) if args.transcript else []
+
+    def run(self):
+        for raw in sys.stdin:
+            line = raw.strip()
+            if not line:
+                continue
+            if self.hung:
+                # Swallow everything, like an engine stuck in a search
+                continue
+            if self.transcript and self.transcript[0][0] == line:
+                _, responses = self.transcript.pop(0)
+                for response in responses:
+                    send(response)
+                continue
+            if not self.handle(line):
+                break
+        self.stop_search()
+
+    def handle(self, line):
+        tokens = line.split()
+        command = tokens[0]
+        if command == "uci":
+            send(f"id name {self.name}")
+            send("id author CheckerChesser tests")
+            send("option name Threads type spin default 1 min 1 max 512")
+            send("option name Hash type spin default 16 min 1 max 33554432")
+            send("option name MultiPV type spin default 1 min 1 max 500")
+            send("uciok")
+        elif command == "isready":
+            self.wait_search()
+            send("readyok")
+        elif command == "setoption":
+            self.set_option(tokens)
+        elif command == "ucinewgame":
+            self.board = chess.Board()
+        elif command == "position":
+            self.set_position(tokens)
+        elif command == "go":
+            self.go_count += 1
+            if self.args.crash_after and self.go_count >= self.args.crash_after:
+                os._exit(1)
+            if self.args.hang_after and self.go_count >= self.args.hang_after:
+                self.hung = True
+                return True
+            self.stop_event.clear()
+            self.search_thread = threading.Thread(target=self.search, args=(tokens,), daemon=True)
+            self.search_thread.start()
+        elif command == "stop":
+            self.stop_search()
+        elif command == "quit":
+            return False
+        return True
+
+    def set_option(self, tokens):
+        if "name" not in tokens:
+            return
+        name_end = tokens.index("value") if "value" in tokens else len(tokens)
+        name = " ".join(tokens[tokens.index("name") + 1:name_end])
+        value = " ".join(tokens[name_end + 1:]) if name_end < len(tokens) else ""
+        self.options[name] = value
+        if name == "MultiPV":
+            self.multipv = max(1, int(value))
+
+    def set_position(self, tokens):
+        if tokens[1] == "startpos":
+            self.board = chess.Board()
+            rest = tokens[2:]
+        else:
+            end = tokens.index("moves") if "moves" in tokens else len(tokens)
+            self.board = chess.Board(" ".join(tokens[2:end]))
+            rest = tokens[end:]
+        if rest and rest[0] == "moves":
+            for uci in rest[1:]:
+                self.board.push_uci(uci)
+
+    def search(self, tokens):
+        infinite = "infinite" in tokens
+        moves = ranked_moves(self.board)
+        if "searchmoves" in tokens:
+            allowed = set(tokens[tokens.index("searchmoves") + 1:])
+            moves = [m for m in moves if m.uci() in allowed]
+        depth = self.args.depth
+        per_depth = self.args.latency / depth if depth else 0.0
+        start = time.perf_counter()
+
+        for d in range(1, depth + 1):
+            if self.stop_event.wait(per_depth):
+                break
+            elapsed_ms = int((time.perf_counter() - start) * 1000)
+            nodes = 1000 * d * d
+            for i, move in enumerate(moves[:self.multipv]):
+                score = 50 - 15 * i + d
+                send(f"info depth {d} seldepth {d} multipv {i + 1} score cp {score} nodes {nodes} "
+                     f"nps {nodes * 1000 // max(1, elapsed_ms)} time {elapsed_ms} pv {self.pv(move)}")
+
+        if infinite:
+            self.stop_event.wait()
+        if moves:
+            send(f"bestmove {moves[0].uci()}")
+        else:
+            send("bestmove (none)")
+
+    def pv(self, move):
+        """The move plus the top-ranked reply, so callers see a multi-move line."""
+        board = self.board.copy(stack=False)
+        board.push(move)
+        replies = ranked_moves(board)
+        return f"{move.uci()} {replies[0].uci()}" if replies else move.uci()
+
+    def wait_search(self):
+        if self.search_thread is not None:
+            self.search_thread.join()
+            self.search_thread = None
+
+    def stop_search(self):
+        self.stop_event.set()
+        self.wait_search()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake UCI engine for tests and benchmarks.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds spent per search")
+    parser.add_argument("--depth", type=int, default=3, help="Depth iterations reported per search")
+    parser.add_argument("--crash-after", type=int, default=0, help="Exit abruptly on the Nth 'go'")
+    parser.add_argument("--hang-after", type=int, default=0, help="Stop responding from the Nth 'go'")
+    parser.add_argument("--transcript", help="Replay responses from a recorded transcript")
+    parser.add_argument("--name", default="FakeEngine")
+    FakeEngine(parser.parse_args()).run()
+
+
+if __name__ == "__main__":
+    main()
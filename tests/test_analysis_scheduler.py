@@ -0,0 +1,129 @@
+import sys
+import os
+import threading
+import unittest
+
+import chess
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.analysis_cache import AnalysisCache
+from src.analysis_scheduler import AnalysisScheduler
+from src.engine import EnginePool
+from src.metrics import registry
+from conftest import FAKE_ENGINE
+
+AFTER_E4 = "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1"
+
+
+class TestAnalysisCache(unittest.TestCase):
+    def test_keeps_the_best_result(self):
+        cache = AnalysisCache()
+        board = chess.Board()
+        line = {"rank": 1, "move": chess.Move.from_uci("e2e4"), "score": 30, "pv": []}
+        self.assertTrue(cache.put(board, [line] * 3, depth=10, multipv=3))
+        self.assertFalse(cache.put(board, [line], depth=8, multipv=1))
+        self.assertEqual(cache.get(board, multipv=2)["depth"], 10)
+        self.assertEqual(len(cache.get(board, multipv=2)["lines"]), 2)
+        self.assertIsNone(cache.get(board, multipv=4))
+        self.assertIsNone(cache.get(board, multipv=1, min_depth=12))
+        self.assertTrue(cache.put(board, [line], depth=12, multipv=1))
+        self.assertEqual(cache.get(board)["depth"], 12)
+
+    def test_transpositions_share_an_entry(self):
+        cache = AnalysisCache()
+        first = chess.Board()
+        for uci in ["g1f3", "g8f6", "b1c3"]:
+            first.push_uci(uci)
+        second = chess.Board()
+        for uci in ["b1c3", "g8f6", "g1f3"]:
+            second.push_uci(uci)
+        cache.put(first, [], depth=5, multipv=1)
+        self.assertIsNotNone(cache.get(second))
+
+    def test_evicts_least_recently_used(self):
+        cache = AnalysisCache(max_entries=2)
+        boards = [chess.Board(), chess.Board(AFTER_E4), chess.Board("8/8/8/8/8/8/8/K6k w - - 0 1")]
+        cache.put(boards[0], [], 1, 1)
+        cache.put(boards[1], [], 1, 1)
+        cache.get(boards[0])
+        cache.put(boards[2], [], 1, 1)
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get(boards[1]))
+        self.assertIsNotNone(cache.get(boards[0]))
+
+
+class TestAnalysisScheduler(unittest.TestCase):
+    def setUp(self):
+        self.pool = EnginePool(1, FAKE_ENGINE)
+        self.assertTrue(self.pool.initialize()[0])
+        self.events = []
+        self.done = threading.Event()
+
+    def tearDown(self):
+        self.pool.quit()
+
+    def record(self, client, done_depth=None):
+        """Callback logging (client, depth, lines); sets self.done once `done_depth` is reported."""
+        def callback(lines, depth):
+            self.events.append((client, depth, lines))
+            if depth == done_depth:
+                self.done.set()
+        return callback
+
+    def test_visible_board_first_then_background(self):
+        scheduler = AnalysisScheduler(self.pool, start_depth=2, depth_step=2, max_depth=6, background_max_depth=4)
+        scheduler.submit("background", AFTER_E4, 2, self.record("background", done_depth=4))
+        scheduler.submit("visible", chess.STARTING_FEN, 2, self.record("visible"))
+        scheduler.set_visible("visible")
+        scheduler.start()
+        self.assertTrue(self.done.wait(10))
+        scheduler.stop()
+
+        order = [(client, depth) for client, depth, _ in self.events]
+        self.assertEqual(order, [("visible", 2), ("visible", 4), ("visible", 6),
+                                 ("background", 2), ("background", 4)])
+        lines = self.events[0][2]
+        self.assertEqual(len(lines), 2)
+        self.assertEqual([line["rank"] for line in lines], [1, 2])
+        self.assertIn(lines[0]["move"], chess.Board().legal_moves)
+
+    def test_background_boards_take_turns(self):
+        scheduler = AnalysisScheduler(self.pool, start_depth=2, depth_step=2, max_depth=4)
+        scheduler.submit("a", AFTER_E4, 1, self.record("a"))
+        scheduler.submit("b", chess.STARTING_FEN, 1, self.record("b", done_depth=4))
+        scheduler.start()
+        self.assertTrue(self.done.wait(10))
+        scheduler.stop()
+        order = [(client, depth) for client, depth, _ in self.events]
+        self.assertEqual(order, [("a", 2), ("b", 2), ("a", 4), ("b", 4)])
+
+    def test_shared_cache_answers_other_boards(self):
+        cache = AnalysisCache()
+        scheduler = AnalysisScheduler(self.pool, cache, start_depth=2, depth_step=2, max_depth=2)
+        first = threading.Event()
+        scheduler.submit("first", AFTER_E4, 3, lambda lines, depth: first.set())
+        scheduler.start()
+        self.assertTrue(first.wait(10))
+
+        hits = registry.counter("analysis_cache_hits_total").value
+        scheduler.submit("last", AFTER_E4, 2, self.record("second", done_depth=2))
+        self.assertTrue(self.done.wait(10))
+        scheduler.stop()
+        self.assertEqual(registry.counter("analysis_cache_hits_total").value, hits + 1)
+        self.assertEqual(len(self.events[0][2]), 2)
+
+    def test_resubmit_replaces_the_job(self):
+        scheduler = AnalysisScheduler(self.pool, start_depth=2, depth_step=2, max_depth=4)
+        scheduler.submit("board", chess.STARTING_FEN, 1, self.record("old"))
+        scheduler.submit("board", AFTER_E4, 1, self.record("new", done_depth=2))
+        scheduler.set_visible("board")
+        scheduler.start()
+        self.assertTrue(self.done.wait(10))
+        scheduler.stop()
+        self.assertEqual(self.events[0][0], "new")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import sys
+import os
+import csv
+import io
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+import chess
+import numpy as np
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.analysis_store import AnalysisStore, ROW_DTYPE, main, make_row
+from src.packing import unpack_move
+
+E4 = chess.Move.from_uci("e2e4")
+E5 = chess.Move.from_uci("e7e5")
+
+
+def game_rows(game, scores):
+    return [make_row(game * 1000 + ply, game, ply, 12, score, E4, [E4, E5]) for ply, score in enumerate(scores)]
+
+
+class TestAnalysisStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = os.path.join(self.tmp.name, "store")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self, chunk_size=4):
+        store = AnalysisStore(self.dir, chunk_size=chunk_size)
+        store.append(game_rows(0, [20, 30, 25, 400, 380]))    # swing at ply 3
+        store.append(game_rows(1, [15, 10, -290, -300]))      # swing at ply 2; game 1 starts mid-chunk
+        store.append(game_rows(2, [-300, -290, -250]))     # first ply is not a swing: new game
+        store.close()
+        return AnalysisStore(self.dir)
+
+    def test_rows_round_trip(self):
+        store = self.build()
+        self.assertEqual(len(store), 12)
+        self.assertEqual(len(store.chunks), 3)
+        self.assertEqual(store.chunks[1]["game_min"], 0)
+        self.assertEqual(store.chunks[1]["game_max"], 1)
+        rows = store.select()
+        self.assertEqual(rows.dtype, ROW_DTYPE)
+        self.assertEqual(list(rows["score"][:5]), [20, 30, 25, 400, 380])
+        row = rows[0]
+        self.assertEqual(unpack_move(row["move"]), E4)
+        self.assertEqual([unpack_move(m) for m in row["pv"][:row["pv_len"]]], [E4, E5])
+
+    def test_swings_cross_chunks_but_not_games(self):
+        store = self.build()
+        rows, deltas = store.swings(200)
+        self.assertEqual([(int(r["game"]), int(r["ply"])) for r in rows], [(0, 3), (1, 2)])
+        self.assertEqual(list(deltas), [375, -300])
+
+    def test_game_slice_and_filters(self):
+        store = self.build()
+        rows = store.game(1)
+        self.assertEqual(list(rows["ply"]), [0, 1, 2, 3])
+        self.assertEqual(list(rows["score"]), [15, 10, -290, -300])
+        losing = store.select(lambda cols: cols["score"] < -100)
+        self.assertEqual(len(losing), 5)
+        totals = sum(len(cols["score"]) for _, cols in store.scan(["score"], where=lambda c: c["score"] > 0))
+        self.assertEqual(totals, 7)
+
+    def test_append_resumes_an_existing_store(self):
+        self.build()
+        store = AnalysisStore(self.dir, chunk_size=4)
+        store.append(game_rows(3, [0, 0]))
+        store.close()
+        reopened = AnalysisStore(self.dir)
+        self.assertEqual(len(reopened), 14)
+        self.assertEqual(len(reopened.game(3)), 2)
+
+    def test_export_csv(self):
+        store = self.build()
+        path = os.path.join(self.tmp.name, "all.csv")
+        self.assertEqual(store.export_csv(path), 12)
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(rows[3]["score"], "400")
+        self.assertEqual(rows[3]["move"], "e2e4")
+        self.assertEqual(rows[3]["pv"], "e2e4 e7e5")
+
+    def test_cli(self):
+        self.build()
+        out = io.StringIO()
+        with redirect_stdout(out):
+            self.assertEqual(main(["swings", self.dir, "--threshold", "200"]), 0)
+            self.assertEqual(main(["info", self.dir]), 0)
+        lines = out.getvalue().splitlines()
+        self.assertIn("swing +375", lines[0])
+        self.assertIn("12 rows in 3 chunks", lines[-1])
+
+    def test_mates_are_clipped(self):
+        row = np.array([make_row(1, 0, 0, 30, 100000, None)], dtype=ROW_DTYPE)[0]
+        self.assertEqual(row["score"], 32000)
+        self.assertEqual(row["pv_len"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
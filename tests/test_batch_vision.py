@@ -0,0 +1,129 @@
+import sys
+import os
+import io
+import json
+import tempfile
+import unittest
+from contextlib import redirect_stderr
+
+import chess
+import cv2
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.batch_vision import build_templates, format_record, iter_image_paths, main, run_batch
+from src.epd_runner import read_epd
+from src.template_library import TemplateLibrary
+from src.random_positions import random_fens
+from src.vision_synth import render_board
+
+SQUARE = 32
+
+
+class TestBatchVision(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+        self.calibration = self.write_image("start.png", chess.STARTING_FEN)
+        self.fens = random_fens(5, seed=4)
+        self.images = os.path.join(self.dir, "images")
+        self.paths = [self.write_image(os.path.join("images", f"{i:02d}.png"), fen) for i, fen in enumerate(self.fens)]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_image(self, name, fen):
+        path = os.path.join(self.dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        cv2.imwrite(path, render_board(fen, square_size=SQUARE, style="shape"))
+        return path
+
+    def write_broken(self, name):
+        path = os.path.join(self.dir, name)
+        with open(path, "w") as f:
+            f.write("not an image")
+        return path
+
+    def test_iter_image_paths(self):
+        nested = self.write_image(os.path.join("images", "sub", "a.png"), chess.STARTING_FEN)
+        with open(os.path.join(self.images, "notes.txt"), "w") as f:
+            f.write("skip me")
+        # Directories are walked in sorted order, subdirectories after their parent's files
+        self.assertEqual(list(iter_image_paths([self.images])), self.paths + [nested])
+        self.assertEqual(list(iter_image_paths([self.paths[2], self.calibration])), [self.paths[2], self.calibration])
+        pattern = os.path.join(self.images, "0[13].png")
+        self.assertEqual(sorted(iter_image_paths([pattern])), [self.paths[1], self.paths[3]])
+        self.assertEqual(list(iter_image_paths([os.path.join(self.dir, "missing", "*.png")])), [])
+
+    def test_results_in_input_order_with_bounded_window(self):
+        templates = build_templates(calibration=self.calibration)
+        pulled = [0]
+
+        def paths():
+            for path in self.paths:
+                pulled[0] += 1
+                yield path
+
+        class Out(io.StringIO):
+            pulled_at_first_write = None
+
+            def write(self, text):
+                if self.pulled_at_first_write is None:
+                    self.pulled_at_first_write = pulled[0]
+                return super().write(text)
+
+        out = Out()
+        self.assertEqual(run_batch(paths(), templates, out, workers=2, window=2), (5, 0, 0))
+        # Only `window` images (plus the refill after the first result) were read before the first write
+        self.assertLessEqual(out.pulled_at_first_write, 3)
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([r["path"] for r in records], self.paths)
+        self.assertEqual([r["fen"].split()[0] for r in records], [fen.split()[0] for fen in self.fens])
+
+    def test_failures_are_reported(self):
+        templates = build_templates(calibration=self.calibration)
+        broken = self.write_broken(os.path.join("images", "03b.png"))
+        paths = list(iter_image_paths([self.images]))
+        out = io.StringIO()
+        self.assertEqual(run_batch(paths, templates, out, fmt="epd", workers=2, min_confidence=0.0), (6, 1, 0))
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 6)
+        self.assertEqual(lines[4], f"# {broken}: unreadable image")
+        self.assertTrue(lines[0].startswith(self.fens[0].split()[0]))
+        self.assertIn(f'c0 "{self.paths[0]}"', lines[0])
+
+    def test_format_record(self):
+        record = {"path": "a.png", "fen": chess.STARTING_FEN, "confidence": 0.9731}
+        self.assertEqual(json.loads(format_record(record, "jsonl")), record)
+        self.assertEqual(format_record(record, "epd"),
+                         'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - c0 "a.png"; c1 "0.9731";')
+        self.assertEqual(format_record({"path": "b.png", "fen": None, "error": "no board found"}, "epd"),
+                         "# b.png: no board found")
+
+    def test_cli(self):
+        self.write_broken(os.path.join("images", "zz.png"))
+        out = os.path.join(self.dir, "results.epd")
+        err = io.StringIO()
+        with redirect_stderr(err):
+            code = main([self.images, "--calibration", self.calibration, "--out", out, "--workers", "2"])
+        self.assertEqual(code, 1)
+        self.assertIn("Processed 6 images", err.getvalue())
+        self.assertIn("1 failed", err.getvalue())
+        # The EPD file still reads back as the recognised positions
+        self.assertEqual([board.board_fen() for _, board, _, _ in read_epd([out])],
+                         [chess.Board(fen).board_fen() for fen in self.fens])
+
+    def test_cli_piece_set_from_library(self):
+        library = os.path.join(self.dir, "sets")
+        TemplateLibrary(library).save("synth", build_templates(calibration=self.calibration))
+        out = os.path.join(self.dir, "results.epd")
+        with redirect_stderr(io.StringIO()):
+            code = main([self.images, "--templates", "synth", "--library", library, "--out", out, "--workers", "1"])
+        self.assertEqual(code, 0)
+        self.assertEqual([board.board_fen() for _, board, _, _ in read_epd([out])],
+                         [chess.Board(fen).board_fen() for fen in self.fens])
+
+
+if __name__ == '__main__':
+    unittest.main()
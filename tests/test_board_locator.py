@@ -0,0 +1,62 @@
+import sys
+import os
+import unittest
+
+import cv2
+import numpy as np
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.board_locator import BoardLocator, order_corners
+
+
+def make_scene(corners, size=(1000, 1400), background=(120, 110, 100), sq=60):
+    """A plain 8x8 checkerboard pasted into a larger image at the given corners."""
+    board = np.zeros((8 * sq, 8 * sq, 3), np.uint8)
+    for r in range(8):
+        for c in range(8):
+            board[r * sq:(r + 1) * sq, c * sq:(c + 1) * sq] = (200, 220, 230) if (r + c) % 2 == 0 else (80, 140, 110)
+
+    src = np.float32([[0, 0], [8 * sq, 0], [8 * sq, 8 * sq], [0, 8 * sq]])
+    matrix = cv2.getPerspectiveTransform(src, np.float32(corners))
+    scene = np.full((size[0], size[1], 3), background, np.uint8)
+    warped = cv2.warpPerspective(board, matrix, (size[1], size[0]))
+    mask = cv2.warpPerspective(np.full(board.shape[:2], 255, np.uint8), matrix, (size[1], size[0]))
+    scene[mask > 0] = warped[mask > 0]
+    return scene
+
+
+class TestBoardLocator(unittest.TestCase):
+    def test_order_corners(self):
+        points = np.float32([[10, 90], [90, 90], [10, 10], [90, 10]])
+        ordered = order_corners(points)
+        np.testing.assert_array_equal(ordered, np.float32([[10, 10], [90, 10], [90, 90], [10, 90]]))
+
+    def test_locates_board_with_perspective(self):
+        corners = np.float32([[330, 200], [870, 210], [920, 820], [280, 800]])
+        scene = make_scene(corners)
+        found = BoardLocator().locate(scene)
+        self.assertIsNotNone(found)
+        # A square is ~75px here; split_board crops 10% margins, so a few px is fine
+        self.assertLess(np.abs(found - corners).max(), 10)
+
+    def test_extract_board_is_square_multiple_of_8(self):
+        corners = np.float32([[300, 200], [900, 200], [900, 800], [300, 800]])
+        board = BoardLocator().extract_board(make_scene(corners), square_size=20)
+        self.assertEqual(board.shape[:2], (160, 160))
+
+    def test_geometry_cache(self):
+        locator = BoardLocator()
+        corners = np.float32([[300, 200], [900, 200], [900, 800], [300, 800]])
+        scene = make_scene(corners)
+        first = locator.locate(scene, source_key="video")
+        self.assertIn("video", locator.cache)
+        self.assertIs(locator.locate(scene, source_key="video"), first)
+
+    def test_no_board(self):
+        self.assertIsNone(BoardLocator().locate(np.full((400, 600, 3), 128, np.uint8)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import sys
+import os
+import threading
+import time
+import unittest
+
+import chess
+import chess.engine
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.cpu_budget import BACKGROUND, BATCH, INTERACTIVE, CpuBudget
+from src.engine import EngineHandler
+from conftest import FAKE_ENGINE, fake_handler
+
+
+class TestCpuBudget(unittest.TestCase):
+    def test_classes(self):
+        budget = CpuBudget(cpus=range(8))
+        self.assertEqual([budget.engine_threads(p) for p in [INTERACTIVE, BACKGROUND, BATCH]], [7, 1, 1])
+        self.assertIsNone(budget.affinity(INTERACTIVE))
+        self.assertEqual(budget.affinity(BACKGROUND), [4, 5, 6, 7])
+        self.assertEqual(budget.affinity(BATCH), [1, 2, 3, 4, 5, 6, 7])
+        single = CpuBudget(cpus=[0])
+        self.assertEqual(single.engine_threads(INTERACTIVE), 1)
+        self.assertIsNone(single.affinity(BATCH))
+
+        # Default engine counts fit the class's CPUs
+        self.assertEqual(budget.default_engines(BATCH), 7)
+        self.assertEqual(budget.default_engines(BATCH, threads="2"), 3)
+        self.assertEqual(budget.default_engines(BACKGROUND), 4)
+        self.assertEqual(budget.default_engines(INTERACTIVE), 8)
+        self.assertEqual(budget.default_engines(None, threads=16), 1)
+        self.assertEqual(single.default_engines(BATCH), 1)
+
+    def test_interactive_preempts_and_holds_back(self):
+        budget = CpuBudget(cpus=range(4))
+        stopped = threading.Event()
+        with budget.search(BACKGROUND) as background:
+            background.attach(stopped.set)
+            with budget.search(INTERACTIVE):
+                self.assertTrue(stopped.is_set())
+                self.assertTrue(background.preempted)
+
+                started = threading.Event()
+
+                def _later():
+                    with budget.search(BATCH) as batch:
+                        started.set()
+                        self.assertFalse(batch.preempted)
+                thread = threading.Thread(target=_later)
+                thread.start()
+                self.assertFalse(started.wait(0.2))  # waits for the interactive search
+            self.assertTrue(started.wait(2))
+            thread.join()
+
+
+class TestEnginePriorities(unittest.TestCase):
+    def test_background_search_is_preempted(self):
+        background = fake_handler("--latency", "3", priority=BACKGROUND)
+        interactive = fake_handler(priority=INTERACTIVE)
+        try:
+            results = {}
+
+            def _search():
+                start = time.perf_counter()
+                results["infos"] = background.search_infos(chess.Board(), chess.engine.Limit(depth=20))[1]
+                results["seconds"] = time.perf_counter() - start
+            thread = threading.Thread(target=_search)
+            thread.start()
+            time.sleep(0.3)
+            self.assertTrue(interactive.get_top_moves(chess.STARTING_FEN, limit=1, time_limit=0.01))
+            thread.join(5)
+            self.assertLess(results["seconds"], 2.5)
+            self.assertTrue(background.preempted)
+
+            background.search_infos(chess.Board(), chess.engine.Limit(depth=1))
+            self.assertFalse(background.preempted)
+        finally:
+            background.quit()
+            interactive.quit()
+
+    def test_threads_and_niceness(self):
+        handler = fake_handler(priority=BATCH)
+        try:
+            pid = handler.engine.protocol.transport.get_pid()
+            tasks = f"/proc/{pid}/task"
+            if os.path.isdir(tasks):
+                # Every engine thread, including those started before the class was applied
+                for tid in os.listdir(tasks):
+                    self.assertGreaterEqual(os.getpriority(os.PRIO_PROCESS, int(tid)), 19)
+        finally:
+            handler.quit()
+
+        # Explicit options win over the class default
+        handler = EngineHandler(FAKE_ENGINE, engine_options={"Threads": 3}, priority=INTERACTIVE)
+        self.assertTrue(handler.initialize_engine()[0])
+        try:
+            sent = [line for _, direction, line in handler.trace.lines() if direction == ">"]
+            self.assertIn("setoption name Threads value 3", sent)
+        finally:
+            handler.quit()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,188 @@
+import sys
+import os
+import socket
+import tempfile
+import threading
+import unittest
+
+import chess
+import chess.pgn
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.analysis_cache import AnalysisCache
+from src.analysis_store import AnalysisStore
+from src.distributed import Coordinator, iter_positions, main, read_message, run_worker, send_message, write_store
+from conftest import FAKE_ENGINE, fake_handler
+
+MOVES = ["e2e4", "e7e5", "g1f3", "b8c6", "f1c4", "g8f6", "d2d3", "f8c5"]
+
+
+def positions():
+    board = chess.Board()
+    fens = [board.fen()]
+    for uci in MOVES:
+        board.push_uci(uci)
+        fens.append(board.fen())
+    return fens
+
+
+def played():
+    board = chess.Board()
+    for uci in MOVES:
+        board.push_uci(uci)
+    return board
+
+
+class TestDistributed(unittest.TestCase):
+    def start(self, **kwargs):
+        kwargs.setdefault("batch_size", 2)
+        coordinator = Coordinator({"depth": 2}, multipv=2, **kwargs)
+        host, port = coordinator.serve("127.0.0.1", 0)
+        self.addCleanup(coordinator.shutdown)
+        return coordinator, port
+
+    def handler(self, *args):
+        handler = fake_handler(*args)
+        self.addCleanup(handler.quit)
+        return handler
+
+    def rogue_lease(self, port):
+        """Lease a batch like a worker, then return the open stream without answering."""
+        sock = socket.create_connection(("127.0.0.1", port))
+        stream = sock.makefile("rwb")
+        send_message(stream, {"type": "lease"})
+        batch = read_message(stream)
+        self.assertEqual(batch["type"], "batch")
+        return sock, stream
+
+    def test_workers_share_deduplicated_positions(self):
+        cache = AnalysisCache()
+        coordinator, port = self.start(cache=cache)
+        fens = positions()
+        for fen in fens + fens[:3]:
+            coordinator.add(fen)
+        coordinator.close()
+
+        counts = {}
+        threads = []
+        for name in ["w1", "w2"]:
+            handler = self.handler("--latency", "0.05")
+            thread = threading.Thread(target=lambda n=name, h=handler: counts.__setitem__(
+                n, run_worker("127.0.0.1", port, h, n)))
+            thread.start()
+            threads.append(thread)
+        self.assertTrue(coordinator.finished.wait(20))
+        for thread in threads:
+            thread.join(10)
+
+        self.assertEqual(len(coordinator.results), len(fens))
+        self.assertEqual(coordinator.duplicates, 3)
+        self.assertEqual(sum(counts.values()), len(fens))
+        self.assertTrue(all(counts.values()), counts)  # both workers took part
+        self.assertEqual(sorted(coordinator.workers), ["w1", "w2"])
+        for fen in fens:
+            entry = cache.get(chess.Board(fen), multipv=2)
+            self.assertIsNotNone(entry)
+            self.assertIn(entry["lines"][0]["move"], chess.Board(fen).legal_moves)
+
+    def test_abandoned_lease_is_retried(self):
+        coordinator, port = self.start()
+        for fen in positions()[:4]:
+            coordinator.add(fen)
+        coordinator.close()
+
+        sock, stream = self.rogue_lease(port)
+        stream.close()
+        sock.close()  # dropped connection: its lease is requeued at once
+        run_worker("127.0.0.1", port, self.handler())
+        self.assertTrue(coordinator.finished.is_set())
+        self.assertEqual(len(coordinator.results), 4)
+        self.assertFalse(coordinator.failed)
+
+    def test_expired_lease_is_retried(self):
+        coordinator, port = self.start(lease_timeout=0.2)
+        for fen in positions()[:4]:
+            coordinator.add(fen)
+        coordinator.close()
+
+        sock, stream = self.rogue_lease(port)  # holds its lease and never answers
+        self.addCleanup(sock.close)
+        self.addCleanup(stream.close)
+        run_worker("127.0.0.1", port, self.handler())
+        self.assertEqual(len(coordinator.results), 4)
+
+    def test_gives_up_after_max_attempts(self):
+        coordinator, port = self.start(max_attempts=1)
+        for fen in positions()[:4]:
+            coordinator.add(fen)
+        coordinator.close()
+
+        sock, stream = self.rogue_lease(port)
+        stream.close()
+        sock.close()
+        run_worker("127.0.0.1", port, self.handler())
+        self.assertTrue(coordinator.finished.is_set())
+        self.assertEqual(len(coordinator.failed), 2)
+        self.assertEqual(len(coordinator.results), 2)
+
+    def test_cached_positions_need_no_worker(self):
+        cache = AnalysisCache()
+        board = chess.Board()
+        line = {"rank": 1, "move": chess.Move.from_uci("e2e4"), "score": 30, "pv": [chess.Move.from_uci("e2e4")]}
+        cache.put(board, [line, line], depth=20, multipv=2)
+        coordinator, _ = self.start(cache=cache)
+        coordinator.add(board.fen())
+        coordinator.close()
+        self.assertTrue(coordinator.finished.is_set())
+        self.assertEqual(coordinator.results[cache.key(board)]["worker"], "cache")
+
+    def test_worker_cli(self):
+        coordinator, port = self.start()
+        for fen in positions():
+            coordinator.add(fen)
+        coordinator.close()
+        code = main(["worker", "--port", str(port), "--engine", FAKE_ENGINE, "--engines", "2", "--name", "box"])
+        self.assertEqual(code, 0)
+        self.assertEqual(len(coordinator.results), len(positions()))
+        self.assertTrue(set(coordinator.workers) <= {"box/0", "box/1"})
+
+    def test_write_store(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        pgn = os.path.join(tmp.name, "game.pgn")
+        with open(pgn, "w", encoding="utf-8") as f:
+            print(chess.pgn.Game.from_board(played()), file=f)
+        epd = os.path.join(tmp.name, "one.epd")
+        with open(epd, "w", encoding="utf-8") as f:
+            f.write(chess.Board(positions()[3]).epd() + "\n")  # also a position of the game
+
+        coordinator, port = self.start()
+        for fen in iter_positions([pgn, epd]):
+            coordinator.add(fen)
+        coordinator.close()
+        run_worker("127.0.0.1", port, self.handler())
+        self.assertTrue(coordinator.finished.is_set())
+
+        directory = os.path.join(tmp.name, "analysis")
+        self.assertEqual(write_store(directory, [pgn, epd], coordinator.results), len(positions()) + 1)
+        rows = AnalysisStore(directory).select()
+        self.assertEqual(rows["game"].tolist(), [0] * len(positions()) + [1])
+        self.assertEqual(rows["ply"].tolist(), list(range(len(positions()))) + [0])
+        self.assertEqual(rows["key"][3], rows["key"][-1])
+        for row in rows:
+            result = coordinator.results[int(row["key"])]
+            board = chess.Board(result["fen"])
+            best = result["lines"][0]
+            # Scores are stored from White's point of view
+            self.assertEqual(int(row["score"]), best["score"] if board.turn == chess.WHITE else -best["score"])
+            self.assertEqual(int(row["depth"]), result["depth"])
+
+        # A second run appends after the games already in the store
+        write_store(directory, [epd], coordinator.results)
+        self.assertEqual(AnalysisStore(directory).select()["game"].tolist()[-1], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
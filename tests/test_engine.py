@@ -2,6 +2,8 @@ import sys
 import os
 import unittest
 
+import chess
+
 # Add src to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
@@ -20,6 +22,79 @@ class TestChessLogic(unittest.TestCase):
         self.assertTrue(success)
         self.assertNotEqual(gs.get_fen(), "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1")
 
+    def test_null_move_fen(self):
+        gs = GameState()
+        gs.make_move("e2e4")
+        # Same pieces, White to move again, no en passant square
+        self.assertEqual(gs.get_null_move_fen(), "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 1 2")
+        self.assertEqual(len(gs.board.move_stack), 1)
+        for move in ["f7f6", "d1h5"]:
+            gs.make_move(move)
+        self.assertIsNone(gs.get_null_move_fen())  # in check
+
+    def test_legal_move_map(self):
+        gs = GameState()
+        move_map = gs.legal_move_map()
+        self.assertIs(gs.legal_move_map(), move_map)  # cached until the position changes
+        self.assertEqual(sum(len(d) for d in move_map.values()), 20)
+        self.assertEqual(set(gs.destinations(chess.G1)), {chess.F3, chess.H3})
+        self.assertEqual(gs.destinations(chess.E1), {})
+        self.assertEqual(gs.find_move(chess.E2, chess.E4), chess.Move.from_uci("e2e4"))
+        self.assertIsNone(gs.find_move(chess.E2, chess.E5))
+
+        gs.make_move("e2e4")
+        self.assertIsNot(gs.legal_move_map(), move_map)
+        self.assertIn(chess.E7, gs.legal_move_map())
+        gs.pop()
+        self.assertIn(chess.E2, gs.legal_move_map())
+        gs.set_turn(chess.BLACK)
+        self.assertNotIn(chess.E2, gs.legal_move_map())
+
+    def test_promotion_variants(self):
+        gs = GameState()
+        gs.set_fen("8/P6k/8/8/8/8/8/K7 w - - 0 1")
+        moves = gs.destinations(chess.A7)[chess.A8]
+        self.assertEqual([m.promotion for m in moves], [chess.QUEEN, chess.ROOK, chess.BISHOP, chess.KNIGHT])
+        self.assertEqual(gs.find_move(chess.A7, chess.A8).promotion, chess.QUEEN)
+        self.assertEqual(gs.find_move(chess.A7, chess.A8, chess.KNIGHT).promotion, chess.KNIGHT)
+
+        gs.set_piece(chess.A8, chess.Piece(chess.ROOK, chess.BLACK))
+        self.assertEqual(gs.destinations(chess.A7), {})
+
+    def test_edit_validation(self):
+        gs = GameState()
+        self.assertTrue(gs.is_valid())
+        gs.set_piece(chess.E8, None)
+        self.assertEqual(gs.position_errors(), ["Black has no king"])
+        self.assertEqual(gs.board.castling_xfen(), "KQ")
+
+        gs.set_piece(chess.E8, chess.Piece(chess.KING, chess.BLACK))
+        self.assertTrue(gs.is_valid())
+        self.assertEqual(gs.board.castling_xfen(), "KQkq")
+        gs.set_piece(chess.H1, None)
+        self.assertEqual(gs.board.castling_xfen(), "Qkq")
+
+        gs.set_piece(chess.A8, chess.Piece(chess.PAWN, chess.WHITE))
+        self.assertIn("Pawns on the first or last rank", gs.position_errors())
+        gs.set_piece(chess.A8, chess.Piece(chess.ROOK, chess.BLACK))
+        self.assertTrue(gs.is_valid())
+
+        # A white queen checking the black king is only legal with Black to move
+        gs.set_piece(chess.E7, chess.Piece(chess.QUEEN, chess.WHITE))
+        self.assertEqual(gs.position_errors(), ["The side not to move is in check"])
+        gs.edit_turn(chess.BLACK)
+        self.assertTrue(gs.is_valid())
+
+    def test_edit_clears_stale_en_passant(self):
+        gs = GameState()
+        gs.make_move("e2e4")
+        self.assertEqual(gs.board.ep_square, chess.E3)
+        gs.set_piece(chess.H7, None)
+        self.assertEqual(gs.board.ep_square, chess.E3)  # e4 could still have just been played
+        gs.set_piece(chess.E4, None)
+        self.assertIsNone(gs.board.ep_square)
+        self.assertTrue(gs.is_valid())
+
     def test_engine_missing(self):
         # Should handle missing engine gracefully
         engine = EngineHandler("non_existent_stockfish.exe")
@@ -0,0 +1,160 @@
+import sys
+import os
+import io
+import json
+import stat
+import tempfile
+import threading
+import time
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+import chess
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.cpu_budget import BACKGROUND, CpuBudget
+from src.engine import resolve_engine_path
+from src.engine_compare import EngineComparison, discover_engines, format_comparison, load_engine_configs, main
+from conftest import FAKE_ENGINE
+
+
+def fake_config(name, *args):
+    return {"name": name, "path": FAKE_ENGINE, "args": ["--name", name] + list(args), "options": {}}
+
+
+@unittest.skipIf(os.name == "nt", "POSIX executable lookup")
+class TestEngineDiscovery(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def executable(self, *parts):
+        path = os.path.join(self.tmp.name, *parts)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write("#!/bin/sh\n")
+        os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR)
+        return path
+
+    def test_resolves_files_directories_and_windows_names(self):
+        binary = self.executable("engines", "stockfish", "stockfish-ubuntu-x86-64")
+        with open(os.path.join(self.tmp.name, "engines", "stockfish", "stockfish.txt"), "w") as f:
+            f.write("readme")
+        self.assertEqual(resolve_engine_path(binary), binary)
+        self.assertEqual(resolve_engine_path(os.path.join(self.tmp.name, "engines")), binary)
+        plain = self.executable("sf")
+        self.assertEqual(resolve_engine_path(plain + ".exe"), plain)
+        self.assertIsNone(resolve_engine_path(os.path.join(self.tmp.name, "missing.exe")))
+
+    def test_bare_names_come_from_path(self):
+        binary = self.executable("bin", "lc0")
+        with mock.patch.dict(os.environ, {"PATH": os.path.dirname(binary)}):
+            self.assertEqual(resolve_engine_path("lc0.exe"), binary)
+            found = discover_engines(self.tmp.name)
+        self.assertEqual([(c["name"], c["path"]) for c in found], [("lc0", binary)])
+
+    def test_config_file(self):
+        path = os.path.join(self.tmp.name, "engines.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump([{"path": "/opt/sf/stockfish", "options": {"Hash": 64}}], f)
+        configs = load_engine_configs(path)
+        self.assertEqual(configs, [{"path": "/opt/sf/stockfish", "options": {"Hash": 64}, "name": "stockfish",
+                                    "args": []}])
+
+
+class TestEngineComparison(unittest.TestCase):
+    def run_comparison(self, comparison, fen=chess.STARTING_FEN, timeout=10):
+        self.addCleanup(comparison.quit)
+        self.assertTrue(all(success for _, success, _ in comparison.initialize()))
+        comparison.analyse(fen)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            snapshot = comparison.snapshot()
+            if all(state["depth"] == 3 and state["lines"] for state in snapshot):
+                return snapshot
+            time.sleep(0.05)
+        self.fail(f"engines did not report: {comparison.snapshot()}")
+
+    def test_engines_analyse_side_by_side(self):
+        comparison = EngineComparison([fake_config("Alpha", "--latency", "0.2"), fake_config("Beta", "--latency", "0.2")],
+                                      multipv=2, reserved_cores=1, cores=5)
+        self.assertFalse(comparison.time_sliced)
+        self.assertEqual([h.engine_options["Threads"] for h in comparison.handlers], [2, 2])
+        snapshot = self.run_comparison(comparison)
+
+        self.assertEqual([state["name"] for state in snapshot], ["Alpha", "Beta"])
+        for state in snapshot:
+            self.assertEqual(len(state["lines"]), 2)
+            self.assertGreater(state["nps"], 0)
+            self.assertEqual(state["lines"][0]["score"], 53)  # White's point of view
+        text = format_comparison(snapshot, chess.STARTING_FEN)
+        self.assertIn("Alpha", text)
+        self.assertIn("Beta", text)
+        self.assertIn("All engines agree on", text)
+
+    def test_lines_stay_with_their_position(self):
+        comparison = EngineComparison([fake_config("Alpha"), fake_config("Beta")], cores=3)
+        snapshot = self.run_comparison(comparison)
+        self.assertEqual(comparison.position()[0], chess.STARTING_FEN)
+        # Formatting lines against another position (a2a3 is not legal after 1. e4) must not raise
+        after_e4 = "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1"
+        self.assertIn("All engines agree on a2a3", format_comparison(snapshot, after_e4))
+
+        # Game over or invalid position: nothing is analysed and no lines are left over
+        comparison.clear()
+        fen, lines = comparison.position()
+        self.assertIsNone(fen)
+        self.assertEqual([state["lines"] for state in lines], [[], []])
+
+    def test_priority_class_cores(self):
+        # Background engines run on the upper half of the cores: their Threads share those, not all cores
+        with mock.patch("src.engine_compare.budget", CpuBudget(cpus=range(8))):
+            comparison = EngineComparison([fake_config("Alpha"), fake_config("Beta")], priority=BACKGROUND)
+        self.assertEqual(comparison.free_cores, 4)
+        self.assertEqual([h.engine_options["Threads"] for h in comparison.handlers], [2, 2])
+
+    def test_scores_are_from_whites_point_of_view(self):
+        comparison = EngineComparison([fake_config("Alpha")], cores=2)
+        fen = "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1"
+        snapshot = self.run_comparison(comparison, fen)
+        self.assertEqual(snapshot[0]["lines"][0]["score"], -53)
+
+    def test_more_engines_than_cores_take_turns(self):
+        configs = [fake_config(name, "--latency", "0.05") for name in ["A", "B", "C"]]
+        comparison = EngineComparison(configs, reserved_cores=1, cores=2, slice_seconds=0.1)
+        self.assertTrue(comparison.time_sliced)
+        self.assertEqual(comparison.free_cores, 1)
+
+        active, peak, lock = [0], [0], threading.Lock()
+        for handler in comparison.handlers:
+            original = handler.analyse_stream
+
+            def counted(*args, original=original, **kwargs):
+                with lock:
+                    active[0] += 1
+                    peak[0] = max(peak[0], active[0])
+                try:
+                    return original(*args, **kwargs)
+                finally:
+                    with lock:
+                        active[0] -= 1
+            handler.analyse_stream = counted
+
+        self.run_comparison(comparison)
+        self.assertEqual(peak[0], 1)  # the reserved core was never used
+
+    def test_cli(self):
+        out = io.StringIO()
+        with redirect_stdout(out):
+            code = main(["--engine", FAKE_ENGINE, "--engine", FAKE_ENGINE, "--time", "0.5", "--quiet"])
+        self.assertEqual(code, 0)
+        self.assertEqual(out.getvalue().count("fake_uci_engine.py"), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import sys
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+import chess
+import chess.engine
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.engine import EnginePool
+from conftest import FAKE_ENGINE, fake_handler
+
+AFTER_E4 = "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1"
+
+
+class TestFakeEngine(unittest.TestCase):
+    def test_best_move_is_legal(self):
+        handler = fake_handler()
+        try:
+            move = handler.get_best_move(AFTER_E4, time_limit=0.01)
+            self.assertIn(move, chess.Board(AFTER_E4).legal_moves)
+        finally:
+            handler.quit()
+
+    def test_multipv_ranking(self):
+        handler = fake_handler()
+        try:
+            top = handler.get_top_moves(chess.STARTING_FEN, limit=3, time_limit=0.01)
+            self.assertEqual([m["rank"] for m in top], [1, 2, 3])
+            self.assertEqual(len({m["move"] for m in top}), 3)
+            scores = [m["score"] for m in top]
+            self.assertEqual(scores, sorted(scores, reverse=True))
+        finally:
+            handler.quit()
+
+    def test_recovers_from_crash(self):
+        handler = fake_handler("--crash-after", "2")
+        try:
+            self.assertIsNotNone(handler.get_best_move(chess.STARTING_FEN, time_limit=0.01))
+            self.assertIsNone(handler.get_best_move(chess.STARTING_FEN, time_limit=0.01))
+            self.assertIsNotNone(handler.get_best_move(chess.STARTING_FEN, time_limit=0.01))
+        finally:
+            handler.quit()
+
+    def test_recovers_from_hang(self):
+        handler = fake_handler("--hang-after", "1", timeout=0.3)
+        try:
+            self.assertIsNone(handler.get_best_move(chess.STARTING_FEN, time_limit=0.01))
+            # The replacement engine hangs on its first search too, but it must have been started
+            self.assertIsNotNone(handler.engine)
+        finally:
+            handler.quit()
+
+    def test_streaming_search_recovers_from_hang(self):
+        # Every replacement engine hangs on its first search too
+        handler = fake_handler("--hang-after", "1", timeout=0.5)
+        try:
+            for limit in [chess.engine.Limit(depth=3), chess.engine.Limit(time=0.1)]:
+                engine = handler.engine
+                start = time.perf_counter()
+                self.assertEqual(handler.search_infos(chess.Board(), limit), (None, []))
+                self.assertLess(time.perf_counter() - start, 3)
+                self.assertIsNot(handler.engine, engine)  # killed and restarted
+                self.assertIsNotNone(handler.engine)
+                self.assertFalse(handler.lock.locked())
+
+            stop = threading.Event()
+            threading.Timer(0.2, stop.set).start()
+            start = time.perf_counter()
+            self.assertFalse(handler.analyse_stream(chess.Board(), lambda info: None, stop))  # ignores "stop"
+            self.assertLess(time.perf_counter() - start, 3)
+        finally:
+            handler.quit()
+
+    def test_invalid_positions_never_reach_engine(self):
+        # The engine crashes on its second search: rejected positions must not count as searches
+        handler = fake_handler("--crash-after", "2")
+        try:
+            engine = handler.engine
+            no_black_king = "8/8/8/8/8/8/8/4K3 w - - 0 1"
+            black_in_check_white_to_move = "5k2/8/8/8/8/8/8/4KR2 w - - 0 1"
+            for fen in [no_black_king, black_in_check_white_to_move]:
+                self.assertFalse(chess.Board(fen).is_valid())
+                self.assertEqual(handler.get_top_moves(fen, time_limit=0.01), [])
+                self.assertIsNone(handler.get_best_move(fen, time_limit=0.01))
+            self.assertIsNotNone(handler.get_best_move(chess.STARTING_FEN, time_limit=0.01))
+            self.assertIs(handler.engine, engine)  # never restarted
+        finally:
+            handler.quit()
+
+    def test_transcript_replay(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "session.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("> isready\n< readyok\n"
+                        "> go movetime 10\n< info depth 1 score cp 77 pv g1f3\n< bestmove g1f3\n")
+            handler = fake_handler("--transcript", path)
+            try:
+                self.assertEqual(handler.get_best_move(chess.STARTING_FEN, time_limit=0.01), chess.Move.from_uci("g1f3"))
+            finally:
+                handler.quit()
+
+
+class TestEnginePool(unittest.TestCase):
+    def test_map_keeps_order(self):
+        pool = EnginePool(2, FAKE_ENGINE, ["--latency", "0.005"])
+        success, msg = pool.initialize()
+        self.assertTrue(success, msg)
+        try:
+            fens = [chess.STARTING_FEN, AFTER_E4] * 3
+            moves = list(pool.map(lambda handler, fen: handler.get_best_move(fen, time_limit=0.01), fens))
+            for fen, move in zip(fens, moves):
+                self.assertIn(move, chess.Board(fen).legal_moves)
+        finally:
+            pool.quit()
+
+    def test_missing_engine(self):
+        pool = EnginePool(2, "non_existent_stockfish.exe")
+        success, msg = pool.initialize()
+        self.assertFalse(success)
+        self.assertIn("not found", msg)
+
+
+if __name__ == '__main__':
+    unittest.main()
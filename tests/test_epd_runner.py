@@ -0,0 +1,99 @@
+import sys
+import os
+import csv
+import io
+import tempfile
+import unittest
+from unittest import mock
+
+import chess.engine
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.cpu_budget import BACKGROUND, BATCH
+from src.engine import EnginePool, parse_uci_options
+from src.epd_runner import main, read_epd, run_suite, summarize
+from conftest import FAKE_ENGINE
+
+
+# The fake engine prefers captures, then checks, then the first move in UCI order
+SUITE = """# tiny suite
+4k3/8/8/3q4/4P3/8/8/4K3 w - - bm exd5; id "capture";
+4k3/8/8/8/8/8/4P3/4K3 w - - bm e3; id "quiet";
+4k3/8/8/3q4/4P3/8/8/4K3 w - - am exd5; id "avoid";
+"""
+
+
+class TestEpdRunner(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "suite.epd")
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(SUITE)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_read_epd(self):
+        positions = list(read_epd([self.path]))
+        self.assertEqual([p[0] for p in positions], ["capture", "quiet", "avoid"])
+        self.assertEqual(positions[0][2], [chess.Move.from_uci("e4d5")])
+        self.assertEqual(positions[2][3], [chess.Move.from_uci("e4d5")])
+
+    def test_malformed_line_counts_as_failure(self):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("4k3/8/8/8/8/8/4P3 w - - bm e3;\n")
+        with mock.patch("sys.stderr", new_callable=io.StringIO) as stderr:
+            positions = list(read_epd([self.path]))
+        self.assertEqual(len(positions), 4)
+        self.assertEqual(positions[3][:2], ("suite.epd:5", None))
+        self.assertTrue(stderr.getvalue().startswith(f"{self.path}:5: "))
+
+        out = os.path.join(self.directory.name, "out.csv")
+        args = [self.path, "--engine", FAKE_ENGINE, "--depth", "3", "--workers", "1", "--csv", out, "--quiet"]
+        with mock.patch("sys.stderr", new_callable=io.StringIO), mock.patch("sys.stdout", new_callable=io.StringIO):
+            self.assertEqual(main(args), 0)
+        with open(out, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual([(r["id"], r["solved"]) for r in rows][-1], ("suite.epd:5", "0"))
+
+    def test_run_suite(self):
+        pool = EnginePool(2, FAKE_ENGINE, ["--latency", "0.01"], engine_options={"Threads": "1"})
+        self.assertTrue(pool.initialize()[0])
+        try:
+            rows = run_suite(list(read_epd([self.path])), pool, chess.engine.Limit(time=0.05))
+        finally:
+            pool.quit()
+        self.assertEqual([r["solved"] for r in rows], [1, 0, 0])
+        self.assertEqual(rows[0]["move"], "exd5")
+        self.assertEqual(rows[0]["solve_depth"], 1)
+        summary = summarize(rows, 1.0)
+        self.assertEqual(summary["solved"], 1)
+        self.assertAlmostEqual(summary["solved_percent"], 100.0 / 3)
+
+    def test_cli_csv_and_gate(self):
+        out = os.path.join(self.directory.name, "out.csv")
+        args = [self.path, "--engine", FAKE_ENGINE, "--depth", "3", "--workers", "1", "--csv", out, "--quiet"]
+        self.assertEqual(main(args), 0)
+        with open(out, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(main(args + ["--min-solved", "2"]), 1)
+
+    def test_cli_priority(self):
+        args = [self.path, "--engine", FAKE_ENGINE, "--depth", "1", "--workers", "1", "--quiet"]
+        # Suite runs are bulk work: batch class unless asked otherwise
+        for extra, priority in [([], BATCH), (["--priority", BACKGROUND], BACKGROUND)]:
+            with mock.patch("src.epd_runner.EnginePool", wraps=EnginePool) as pool_class:
+                self.assertEqual(main(args + extra), 0)
+            self.assertEqual(pool_class.call_args.kwargs["priority"], priority)
+
+    def test_parse_uci_options(self):
+        self.assertEqual(parse_uci_options(["Threads=2", "Hash = 64"]), {"Threads": "2", "Hash": "64"})
+        with self.assertRaises(ValueError):
+            parse_uci_options(["Threads"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+import sys
+import os
+import io
+import tempfile
+import threading
+import unittest
+from contextlib import redirect_stdout
+
+import chess
+import chess.pgn
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.distributed import iter_positions
+from src.game_store import GameStore, main
+
+PGN = """[Event "Opening"]
+[White "A"]
+[Black "B"]
+[Result "*"]
+
+1. e4 {best by test} e5 (1... c5 2. Nf3) 2. Nf3 Nc6 3. Bb5 a6 4. O-O *
+
+[Event "Promotion"]
+[FEN "8/P6k/8/8/8/8/8/K7 w - - 0 1"]
+[SetUp "1"]
+[Result "1-0"]
+
+1. a8=N Kg6 2. Nb6 1-0
+
+[Event "Fischer random"]
+[Variant "Chess960"]
+[FEN "nrbkqbrn/pppppppp/8/8/8/8/PPPPPPPP/NRBKQBRN w GBgb - 0 1"]
+[SetUp "1"]
+[Result "*"]
+
+1. g3 g6 2. Bg2 Bg7 3. f4 f5 4. Qf2 Qf7 5. O-O *
+
+[Event "Crazyhouse"]
+[Variant "Crazyhouse"]
+[Result "*"]
+
+1. e4 d5 2. exd5 Qxd5 *
+
+[Event "Empty"]
+[Result "*"]
+
+*
+"""
+
+
+class TestGameStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.pgn = os.path.join(self.tmp.name, "games.pgn")
+        with open(self.pgn, "w", encoding="utf-8") as f:
+            f.write(PGN)
+        self.dir = os.path.join(self.tmp.name, "store")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def convert(self):
+        store = GameStore(self.dir)
+        added, skipped = store.add_pgn([self.pgn])
+        store.close()
+        return added, skipped
+
+    def expected_games(self):
+        games = []
+        with open(self.pgn, encoding="utf-8") as f:
+            while (game := chess.pgn.read_game(f)) is not None:
+                if game.headers.get("Variant") != "Crazyhouse":
+                    games.append(game)
+        return games
+
+    def test_roundtrip_matches_pgn(self):
+        self.assertEqual(self.convert(), (4, 1))  # crazyhouse is skipped
+        store = GameStore(self.dir)
+        self.assertEqual(len(store), 4)
+        self.assertEqual(store.lengths().tolist(), [7, 3, 9, 0])
+
+        for i, game in enumerate(self.expected_games()):
+            # Only the tags present in the file; the PGN reader fills in the rest of the seven-tag roster
+            self.assertEqual(store.headers(i), {k: v for k, v in game.headers.items() if "?" not in v})
+            expected = game.board()
+            fens = [expected.fen()]
+            for move in game.mainline_moves():
+                expected.push(move)
+                fens.append(expected.fen())
+            self.assertEqual([board.fen() for board in store.replay(i)], fens)
+            self.assertEqual(store.board(i).move_stack, expected.move_stack)
+            self.assertEqual(list(store.to_pgn(i).mainline_moves()), list(game.mainline_moves()))
+
+        self.assertTrue(store.board(2).chess960)
+        self.assertEqual(store.board(2).piece_at(chess.G1), chess.Piece(chess.KING, chess.WHITE))
+        self.assertEqual(store.board(1, ply=1).piece_at(chess.A8), chess.Piece(chess.KNIGHT, chess.WHITE))
+        state = store.game_state(0, ply=2)
+        self.assertEqual(state.get_fen(), "rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 2")
+        self.assertIsNotNone(state.find_move(chess.G1, chess.F3))
+
+    def test_headers_from_threads(self):
+        self.convert()
+        store = GameStore(self.dir)
+        expected = [store.headers(i) for i in range(len(store))]
+        errors = []
+
+        # Threads share the store's one header file handle
+        def read():
+            try:
+                for _ in range(300):
+                    for i in range(len(store)):
+                        if store.headers(i) != expected[i]:
+                            errors.append(i)
+            except ValueError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=read) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def test_append_and_interrupted_write(self):
+        self.convert()
+        store = GameStore(self.dir)
+        store.add({"Event": "Unpublished"}, [chess.Move.from_uci("d2d4")])
+        self.assertEqual(len(store), 5)
+        self.assertEqual(store.game_moves(4).tolist(), [chess.D2 | chess.D4 << 6])  # readable before flush
+        del store  # never flushed: the manifest still describes four games
+
+        store = GameStore(self.dir)
+        self.assertEqual(len(store), 4)
+        store.add({"Event": "Appended"}, [chess.Move.from_uci("c2c4")])
+        store.close()
+        store = GameStore(self.dir)
+        self.assertEqual(len(store), 5)
+        self.assertEqual(store.headers(4), {"Event": "Appended"})
+        self.assertEqual(store.board(4).fen(), "rnbqkbnr/pppppppp/8/8/2P5/8/PP1PPPPP/RNBQKBNR b KQkq - 0 1")
+        self.assertEqual(os.path.getsize(os.path.join(self.dir, "moves.bin")), 2 * (19 + 1))
+
+    def test_batch_analysis_reads_stores(self):
+        self.convert()
+        from_pgn = [fen for fen in iter_positions([self.pgn]) if "[" not in fen]  # minus crazyhouse pockets
+        from_store = list(iter_positions([self.dir]))
+        self.assertEqual(from_store, from_pgn)
+        self.assertEqual(len(from_store), 8 + 4 + 10 + 1)
+
+    def test_cli(self):
+        out = io.StringIO()
+        with redirect_stdout(out):
+            self.assertEqual(main(["convert", self.pgn, "--out", self.dir]), 0)
+            self.assertEqual(main(["info", self.dir]), 0)
+            self.assertEqual(main(["scan", self.dir]), 0)
+        self.assertIn("4 games, 19 moves", out.getvalue())
+        self.assertIn("23 positions", out.getvalue())
+
+        exported = os.path.join(self.tmp.name, "out.pgn")
+        self.assertEqual(main(["export", self.dir, exported, "--first", "1", "--count", "1"]), 0)
+        with open(exported, encoding="utf-8") as f:
+            game = chess.pgn.read_game(f)
+        self.assertEqual(game.headers["Event"], "Promotion")
+        self.assertEqual(game.end().board().fen(), "8/8/1N4k1/8/8/8/8/K7 b - - 2 2")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+import sys
+import os
+import tempfile
+import unittest
+
+import chess
+import chess.engine
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.engine import EnginePool
+from src.match_runner import SPRT, Adjudicator, MatchRunner, elo_estimate, load_openings, play_game
+from conftest import FAKE_ENGINE
+
+# White mates at once (the fake engine plays Qe8#)
+MATE_IN_ONE = "7k/5Q2/6K1/8/8/8/8/8 w - - 0 1"
+
+
+class TestStatistics(unittest.TestCase):
+    def test_sprt_bounds_and_decisions(self):
+        sprt = SPRT(0, 10, alpha=0.05, beta=0.05)
+        self.assertAlmostEqual(sprt.upper, 2.944, places=3)
+        self.assertAlmostEqual(sprt.lower, -2.944, places=3)
+        self.assertIsNone(sprt.status(10, 10, 10))
+        self.assertEqual(sprt.status(600, 300, 400), "H1")
+        self.assertEqual(sprt.status(400, 300, 600), "H0")
+
+    def test_llr_sign(self):
+        sprt = SPRT(0, 5)
+        self.assertGreater(sprt.llr(60, 30, 40), 0)
+        self.assertLess(sprt.llr(40, 30, 60), 0)
+        self.assertEqual(sprt.llr(0, 0, 0), 0.0)
+
+    def test_elo_estimate(self):
+        elo, margin = elo_estimate(50, 0, 50)
+        self.assertEqual(elo, 0.0)
+        elo, _ = elo_estimate(76, 0, 24)  # 76% is about +200 Elo
+        self.assertAlmostEqual(elo, 200, delta=5)
+        self.assertEqual(elo_estimate(3, 0, 0), (None, None))
+
+
+class TestAdjudicator(unittest.TestCase):
+    def test_resign(self):
+        adjudicator = Adjudicator(resign_score=500, resign_moves=2)
+        board = chess.Board()
+        self.assertIsNone(adjudicator.check(board, [600, 600, 600]))
+        self.assertEqual(adjudicator.check(board, [600, 600, 700, 900]), ("1-0", "adjudication"))
+        self.assertEqual(adjudicator.check(board, [-600] * 4), ("0-1", "adjudication"))
+
+    def test_draw_needs_min_ply(self):
+        adjudicator = Adjudicator(draw_score=10, draw_moves=2, draw_min_ply=4)
+        board = chess.Board()
+        self.assertIsNone(adjudicator.check(board, [0] * 4))
+        for uci in ["g1f3", "g8f6", "f3g1", "f6g8"]:
+            board.push_uci(uci)
+        self.assertEqual(adjudicator.check(board, [0] * 4), ("1/2-1/2", "adjudication"))
+
+    def test_game_over_and_max_plies(self):
+        self.assertIsNone(Adjudicator().check(chess.Board(), []))
+        mate = chess.Board(MATE_IN_ONE)
+        mate.push_uci("f7e8")
+        self.assertEqual(Adjudicator().check(mate, []), ("1-0", "checkmate"))
+        board = chess.Board()
+        board.push_uci("e2e4")
+        self.assertEqual(Adjudicator(max_plies=1).check(board, []), ("1/2-1/2", "max plies"))
+
+
+class TestMatch(unittest.TestCase):
+    def test_load_openings(self):
+        with tempfile.TemporaryDirectory() as directory:
+            epd = os.path.join(directory, "book.epd")
+            with open(epd, "w", encoding="utf-8") as f:
+                f.write(MATE_IN_ONE + "\n# comment\n7k/5Q2/6K1/8/8/8/8/8 w - - bm Qe8; id \"x\";\n")
+            pgn = os.path.join(directory, "book.pgn")
+            with open(pgn, "w", encoding="utf-8") as f:
+                f.write("1. e4 e5 2. Nf3 *\n\n1. d4 d5 *\n")
+            self.assertEqual(len(load_openings(epd)), 2)
+            openings = load_openings(pgn)
+        self.assertEqual(len(openings), 2)
+        self.assertEqual(openings[0][0], chess.STARTING_FEN)
+        self.assertEqual([m.uci() for m in openings[0][1]], ["e2e4", "e7e5", "g1f3"])
+
+    def test_concurrent_match_colour_reversal(self):
+        pools = [EnginePool(2, FAKE_ENGINE), EnginePool(2, FAKE_ENGINE)]
+        for pool in pools:
+            self.assertTrue(pool.initialize()[0])
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                pgn = os.path.join(directory, "match.pgn")
+                runner = MatchRunner(pools[0], pools[1], [(MATE_IN_ONE, [])], chess.engine.Limit(time=0.01),
+                                     Adjudicator(), names=("A", "B"), pgn_path=pgn, concurrency=2)
+                wins, draws, losses = runner.run(4)
+                with open(pgn, encoding="utf-8") as f:
+                    text = f.read()
+        finally:
+            for pool in pools:
+                pool.quit()
+        # White always mates, and each engine is White in half the games
+        self.assertEqual((wins, draws, losses), (2, 0, 2))
+        self.assertEqual(text.count("[Result \"1-0\"]"), 4)
+        self.assertEqual(text.count("[White \"A\"]"), 2)
+
+    def test_play_game_from_start(self):
+        pool = EnginePool(1, FAKE_ENGINE)
+        self.assertTrue(pool.initialize()[0])
+        try:
+            with pool.acquire() as engine:
+                state, result, reason = play_game(engine, engine, (chess.STARTING_FEN, []),
+                                                  chess.engine.Limit(time=0.01), Adjudicator(max_plies=40))
+        finally:
+            pool.quit()
+        self.assertIn(result, ("1-0", "0-1", "1/2-1/2"))
+        self.assertLessEqual(len(state.board.move_stack), 40)
+        self.assertTrue(reason)
+
+    def test_each_game_starts_with_ucinewgame(self):
+        pool = EnginePool(1, FAKE_ENGINE)
+        self.assertTrue(pool.initialize()[0])
+        try:
+            with pool.acquire() as engine:
+                for _ in range(3):
+                    play_game(engine, engine, (MATE_IN_ONE, []), chess.engine.Limit(time=0.01), Adjudicator())
+                sent = [line for _, direction, line in engine.trace.lines() if direction == ">"]
+        finally:
+            pool.quit()
+        self.assertEqual(sent.count("ucinewgame"), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
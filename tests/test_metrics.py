@@ -0,0 +1,89 @@
+import sys
+import os
+import json
+import tempfile
+import threading
+import unittest
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.metrics import MetricsRegistry, _bucket_bounds, _bucket_index
+
+
+class TestHistogram(unittest.TestCase):
+    def test_bucket_bounds_contain_value(self):
+        for micros in list(range(200)) + [1000, 12345, 10 ** 6, 10 ** 9]:
+            low, high = _bucket_bounds(_bucket_index(micros))
+            self.assertLessEqual(low, micros)
+            self.assertLess(micros, high)
+            # log-linear: bucket width stays within ~6% of the value
+            self.assertLessEqual(high - low, max(1, micros / 16.0))
+
+    def test_percentiles(self):
+        histogram = MetricsRegistry().histogram("search_seconds")
+        for ms in range(1, 101):
+            histogram.record(ms / 1000.0)
+        self.assertEqual(histogram.count, 100)
+        self.assertAlmostEqual(histogram.percentile(50), 0.050, delta=0.004)
+        self.assertAlmostEqual(histogram.percentile(99), 0.099, delta=0.007)
+        self.assertEqual(histogram.percentile(100), 0.1)
+        self.assertAlmostEqual(histogram.snapshot()["mean"], 0.0505)
+
+    def test_empty(self):
+        snap = MetricsRegistry().histogram("idle_seconds").snapshot()
+        self.assertEqual(snap["count"], 0)
+        self.assertIsNone(snap["p99"])
+
+    def test_concurrent_records(self):
+        registry = MetricsRegistry()
+
+        def work():
+            for _ in range(1000):
+                registry.histogram("h").record(0.001)
+                registry.counter("c").inc()
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(registry.histogram("h").count, 4000)
+        self.assertEqual(registry.counter("c").value, 4000)
+
+
+class TestRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+        self.registry.counter("engine_errors_total", "Failed engine calls").inc(2)
+        with self.registry.timer("engine_search_seconds"):
+            pass
+
+    def test_type_mismatch(self):
+        with self.assertRaises(TypeError):
+            self.registry.histogram("engine_errors_total")
+
+    def test_prometheus_text(self):
+        text = self.registry.to_prometheus()
+        self.assertIn("# TYPE checkerchesser_engine_errors_total counter", text)
+        self.assertIn("checkerchesser_engine_errors_total 2", text)
+        self.assertIn('checkerchesser_engine_search_seconds_bucket{le="+Inf"} 1', text)
+        self.assertIn("checkerchesser_engine_search_seconds_count 1", text)
+
+    def test_write_json(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "metrics.json")
+            self.registry.write(path)
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        self.assertEqual(data["engine_errors_total"]["value"], 2)
+        self.assertEqual(data["engine_search_seconds"]["count"], 1)
+
+    def test_reset(self):
+        self.registry.reset()
+        self.assertEqual(self.registry.counter("engine_errors_total").value, 0)
+        self.assertEqual(self.registry.histogram("engine_search_seconds").count, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
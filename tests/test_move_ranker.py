@@ -0,0 +1,90 @@
+import sys
+import os
+import threading
+import time
+import unittest
+
+import chess
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.engine import EngineHandler
+from src.move_ranker import MoveRanker
+from conftest import FAKE_ENGINE
+
+
+class RecordingHandler(EngineHandler):
+    """Remembers (depth, root move count) of every search."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.searches = []
+
+    def search_infos(self, board, limit, multipv=None, root_moves=None, **kwargs):
+        self.searches.append((limit.depth, len(root_moves) if root_moves else None))
+        return super().search_infos(board, limit, multipv, root_moves, **kwargs)
+
+
+class TestMoveRanker(unittest.TestCase):
+    def setUp(self):
+        self.handler = RecordingHandler(FAKE_ENGINE)
+        self.assertTrue(self.handler.initialize_engine()[0])
+
+    def tearDown(self):
+        self.handler.quit()
+
+    def test_ranks_every_legal_move(self):
+        board = chess.Board()
+        ranking = MoveRanker(self.handler, shallow_depth=2, depth_step=2, rounds=3, keep=8).rank(board.fen())
+        self.assertEqual(len(ranking), 20)
+        self.assertEqual({line["move"] for line in ranking}, set(board.legal_moves))
+        self.assertEqual([line["rank"] for line in ranking], list(range(1, 21)))
+        scores = [line["score"] for line in ranking]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def test_refines_a_shrinking_candidate_set(self):
+        updates = []
+        ranker = MoveRanker(self.handler, shallow_depth=2, depth_step=2, rounds=3, keep=8)
+        ranking = ranker.rank(chess.STARTING_FEN, on_update=updates.append)
+
+        self.assertEqual(len(updates), 4)  # shallow pass plus three refinements
+        self.assertEqual(self.handler.searches, [(2, 20), (4, 8), (6, 4), (8, 2)])
+        self.assertEqual(updates[-1], ranking)
+        self.assertEqual(ranking[0]["move"], updates[0][0]["move"])
+
+    def test_stops_when_superseded(self):
+        updates = []
+        ranker = MoveRanker(self.handler, shallow_depth=2, rounds=3)
+        ranking = ranker.rank(chess.STARTING_FEN, on_update=updates.append, should_continue=lambda: False)
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(len(ranking), 20)
+
+    def test_stop_event_aborts_the_running_pass(self):
+        slow = RecordingHandler(FAKE_ENGINE, ["--latency", "0.5", "--depth", "10"])
+        self.assertTrue(slow.initialize_engine()[0])
+        try:
+            stop = threading.Event()
+            updates = []
+
+            def on_update(ranking):
+                updates.append(ranking)
+                threading.Timer(0.1, stop.set).start()  # a newer position arrives during the refinement
+
+            start = time.perf_counter()
+            ranking = MoveRanker(slow, shallow_depth=2, rounds=3).rank(chess.STARTING_FEN, on_update=on_update,
+                                                                       stop_event=stop)
+            elapsed = time.perf_counter() - start
+        finally:
+            slow.quit()
+        self.assertEqual(len(slow.searches), 2)
+        self.assertEqual(ranking, updates[0])
+        self.assertLess(elapsed, 1.5)  # all four passes take 2 s
+
+    def test_no_legal_moves(self):
+        mated = "rnb1kbnr/pppp1ppp/8/4p3/6Pq/5P2/PPPPP2P/RNBQKBNR w KQkq - 1 3"
+        self.assertEqual(MoveRanker(self.handler).rank(mated), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import sys
+import os
+import random
+import unittest
+
+import chess
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.packing import NO_EP, pack_board, pack_move, pack_state, unpack_codes, unpack_move, unpack_state
+
+
+class TestPacking(unittest.TestCase):
+    def test_move_roundtrip(self):
+        for uci in ["e2e4", "a7a8q", "h2h1n", "e1g1", "a1h8"]:
+            move = chess.Move.from_uci(uci)
+            packed = pack_move(move)
+            self.assertLess(packed, 1 << 16)
+            self.assertEqual(unpack_move(packed), move)
+
+    def test_board_is_32_bytes(self):
+        packed = pack_board(chess.Board())
+        self.assertEqual(packed.shape, (32,))
+        codes = unpack_codes(packed)
+        self.assertEqual(codes[chess.E1], chess.KING)
+        self.assertEqual(codes[chess.E8], chess.KING + 6)
+        self.assertEqual(codes[chess.E4], 0)
+
+    def test_state_roundtrip_random_games(self):
+        rng = random.Random(3)
+        for _ in range(20):
+            board = chess.Board()
+            for _ in range(rng.randint(0, 60)):
+                moves = list(board.legal_moves)
+                if not moves:
+                    break
+                board.push(rng.choice(moves))
+            restored = unpack_state(*pack_state(board), board.halfmove_clock, board.fullmove_number)
+            self.assertEqual(restored.fen(en_passant="legal"), board.fen(en_passant="legal"))
+
+    def test_en_passant_only_when_legal(self):
+        board = chess.Board()
+        board.push_uci("e2e4")
+        self.assertEqual(pack_state(board)[3], NO_EP)
+        board = chess.Board("4k3/8/8/8/3p4/8/4P3/4K3 w - - 0 1")
+        board.push_uci("e2e4")
+        self.assertEqual(pack_state(board)[3], chess.E3)
+
+
+if __name__ == '__main__':
+    unittest.main()
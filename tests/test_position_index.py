@@ -0,0 +1,106 @@
+import sys
+import os
+import io
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+import chess
+import numpy as np
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import position_index
+from src.game_store import GameStore
+from src.position_index import PositionIndex, board_signature, main, material_counts
+
+# Open Sicilian, Queen's Gambit and a pawn ending
+GAMES = [
+    ({"White": "A", "Black": "B", "Event": "Sicilian"}, "e2e4 c7c5 g1f3 d7d6 d2d4 c5d4 f3d4 g8f6 b1c3 a7a6"),
+    ({"White": "C", "Black": "D", "Event": "QGD"}, "d2d4 d7d5 c2c4 e7e6 b1c3 g8f6 c1g5 f8e7 e2e3 e8g8"),
+    ({"White": "E", "Black": "F", "Event": "Ending", "FEN": "8/5k2/8/3p4/3P4/8/5K2/8 w - - 0 1"}, "f2e3 f7e6"),
+]
+
+
+class TestPositionIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+        store = GameStore(self.dir)
+        for headers, moves in GAMES:
+            store.add(headers, [chess.Move.from_uci(uci) for uci in moves.split()])
+        store.close()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_signatures(self):
+        signature = board_signature(chess.Board())
+        self.assertEqual(signature["pawns"].tolist(), [chess.BB_RANK_2, chess.BB_RANK_7])
+        self.assertEqual(material_counts([signature["material"]]).tolist(), [[8, 2, 2, 2, 1] * 2])
+        # Per side: knights, bishops and rooks in two 2x2 blocks each, queen and king in one
+        self.assertEqual(int(np.bitwise_count(signature["sketch"]).sum()), 16)
+
+        ending = board_signature(chess.Board(GAMES[2][0]["FEN"]))
+        self.assertEqual(material_counts([ending["material"]]).tolist(), [[1, 0, 0, 0, 0] * 2])
+
+    def test_search(self):
+        index = PositionIndex(self.dir)
+        self.assertFalse(index.built)
+        self.assertEqual(index.build(), 11 + 11 + 3)
+        index = PositionIndex(self.dir)
+        self.assertFalse(index.stale)
+
+        # A Sicilian position with one extra move by each side: the closest game is the Sicilian
+        board = chess.Board()
+        for uci in "e2e4 c7c5 g1f3 d7d6 d2d4 c5d4 f3d4 g8f6 b1c3 e7e6".split():
+            board.push_uci(uci)
+        results = index.search(board, count=3)
+        self.assertEqual([r["game"] for r in results], [0, 1, 2])  # one result per game
+        self.assertEqual(results[0]["ply"], 9)  # before ...a6: only the e-pawn differs
+        self.assertEqual(results[0]["material"], 1.0)
+        self.assertLess(results[0]["pawns"], 1.0)
+        self.assertGreater(results[0]["similarity"], results[1]["similarity"])
+
+        # Same pawns as the ending, other pieces: found by pawn structure alone
+        results = index.search(chess.Board("8/8/2k5/3p4/3P4/2K5/8/8 w - - 0 1"), count=1, kind="pawns")
+        self.assertEqual((results[0]["game"], results[0]["pawns"]), (2, 1.0))
+
+        # The inverted index only looks at positions with exactly the query's material
+        results = index.search(chess.Board(), count=5, same_material=True)
+        self.assertEqual([r["game"] for r in results], [0, 1])
+        self.assertEqual([r["ply"] for r in results], [0, 0])
+        self.assertEqual(len(index.material_bucket(board_signature(chess.Board())["material"])), 6 + 11)  # until ...cxd4, and all of the QGD
+
+    def test_scan_in_chunks(self):
+        index = PositionIndex(self.dir)
+        index.build()
+        board = chess.Board(GAMES[2][0]["FEN"])
+        expected = index.search(board, count=3)
+        original = position_index.CHUNK
+        position_index.CHUNK = 4  # games straddle chunk boundaries
+        try:
+            self.assertEqual(index.search(board, count=3), expected)
+            self.assertEqual(index.search(chess.Board(), count=2, same_material=True)[0]["game"], 0)
+        finally:
+            position_index.CHUNK = original
+
+    def test_cli(self):
+        out = io.StringIO()
+        with redirect_stdout(out):
+            self.assertEqual(main(["query", self.dir, chess.STARTING_FEN]), 1)
+            self.assertEqual(main(["build", self.dir]), 0)
+            self.assertEqual(main(["query", self.dir, chess.STARTING_FEN, "--count", "2"]), 0)
+        self.assertIn("25 positions from 3 games", out.getvalue())
+        self.assertIn("1.00  (pawns 1.00, material 1.00, pieces 1.00)  game 0 move 1: A - B, Sicilian",
+                      out.getvalue())
+
+        store = GameStore(self.dir)
+        store.add({"Event": "Later"}, [])
+        store.close()
+        self.assertTrue(PositionIndex(self.dir).stale)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import sys
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.profiler import SamplingProfiler
+
+
+def busy_worker(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+class TestSamplingProfiler(unittest.TestCase):
+    def test_captures_other_threads(self):
+        stop = threading.Event()
+        worker = threading.Thread(target=busy_worker, args=(stop,), name="Worker")
+        worker.start()
+        finished = threading.Event()
+        profiler = SamplingProfiler(interval=0.002, label="analysis")
+        profiler.start(duration=0.2, on_finish=lambda p: finished.set())
+        self.assertTrue(finished.wait(5))
+        stop.set()
+        worker.join()
+
+        self.assertGreater(profiler.sample_count, 5)
+        lines = profiler.collapsed()
+        worker_lines = [line for line in lines if line.startswith("analysis;Worker;")]
+        self.assertTrue(worker_lines)
+        self.assertTrue(any("busy_worker (test_profiler.py" in line for line in worker_lines))
+        # The sampler does not profile itself
+        self.assertFalse(any(";SamplingProfiler;" in line for line in lines))
+        stack, count = lines[0].rsplit(" ", 1)
+        self.assertGreater(int(count), 0)
+
+    def test_stop_early_and_write(self):
+        profiler = SamplingProfiler(interval=0.001, label="edit")
+        profiler.start(duration=60)
+        time.sleep(0.05)
+        start = time.perf_counter()
+        profiler.stop()
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertFalse(profiler.is_running)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = profiler.write(profiler.default_path(directory))
+            self.assertTrue(os.path.basename(path).startswith("edit-"))
+            with open(path, encoding="utf-8") as f:
+                self.assertTrue(f.readline().startswith("edit;MainThread;"))
+
+    def test_stop_without_waiting(self):
+        # on_finish blocks until the stopping thread is free again, like a Tk after() call
+        caller_free = threading.Event()
+        finished = threading.Event()
+
+        def _on_finish(profiler):
+            caller_free.wait(5)
+            finished.set()
+
+        profiler = SamplingProfiler(interval=0.001)
+        profiler.start(duration=60, on_finish=_on_finish)
+        time.sleep(0.02)
+        profiler.stop(wait=False)
+        caller_free.set()
+        self.assertTrue(finished.wait(5))
+        self.assertGreater(profiler.sample_count, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
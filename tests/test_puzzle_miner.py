@@ -0,0 +1,92 @@
+import sys
+import os
+import io
+import tempfile
+import unittest
+
+import chess
+import chess.engine
+import chess.pgn
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.engine import EnginePool
+from src.puzzle_miner import PuzzleMiner, format_puzzle, iter_games, main
+from conftest import FAKE_ENGINE
+
+GAMES = """[White "A"]
+[Black "B"]
+
+1. e4 e5 2. Nf3 Nc6 3. Bc4 Nf6 4. Ng5 d5 5. exd5 Nxd5 6. Nxf7 Kxf7 *
+
+[White "C"]
+[Black "D"]
+
+1. d4 d5 2. c4 e6 *
+"""
+
+
+class TestPuzzleMiner(unittest.TestCase):
+    # The fake engine scores every position +51..+53 for the side to move and its
+    # second line 15cp lower, so each ply "loses" ~106cp with a 15cp-unique best move.
+    def setUp(self):
+        self.pool = EnginePool(1, FAKE_ENGINE)
+        self.assertTrue(self.pool.initialize()[0])
+
+    def tearDown(self):
+        self.pool.quit()
+
+    def miner(self, **kwargs):
+        settings = dict(swing=100, min_advantage=0, unique_margin=10, max_solution_moves=2, min_ply=4)
+        settings.update(kwargs)
+        return PuzzleMiner(chess.engine.Limit(depth=1), chess.engine.Limit(depth=3), **settings)
+
+    def mine(self, miner):
+        game = chess.pgn.read_game(io.StringIO(GAMES))
+        with self.pool.acquire() as handler:
+            return miner.mine(handler, ("games.pgn#1", game))
+
+    def test_prefilter_limits_deep_searches(self):
+        puzzles, stats = self.mine(self.miner(swing=1000))
+        self.assertEqual(puzzles, [])
+        self.assertEqual(stats["shallow"], 12)
+        self.assertEqual(stats["deep"], 0)
+
+    def test_solution_lines(self):
+        puzzles, stats = self.mine(self.miner())
+        self.assertEqual(stats["deep"], 9)  # plies 4..12 pass the swing test
+        self.assertEqual(len(puzzles), 9)
+        for puzzle in puzzles:
+            board = chess.Board(puzzle["fen"])
+            # Two solver moves with the defence between them, all legal
+            self.assertEqual(len(puzzle["moves"]), 3)
+            for move in puzzle["moves"]:
+                self.assertIn(move, board.legal_moves)
+                board.push(move)
+        self.assertIn("bm ", format_puzzle(puzzles[0], "epd", 1))
+
+    def test_uniqueness_rejects(self):
+        puzzles, stats = self.mine(self.miner(unique_margin=20))
+        self.assertEqual(stats["deep"], 9)
+        self.assertEqual(puzzles, [])
+
+    def test_cli(self):
+        with tempfile.TemporaryDirectory() as directory:
+            pgn = os.path.join(directory, "games.pgn")
+            with open(pgn, "w", encoding="utf-8") as f:
+                f.write(GAMES)
+            self.assertEqual(len(list(iter_games([pgn]))), 2)
+            out = os.path.join(directory, "puzzles.epd")
+            self.assertEqual(main([pgn, "--engine", FAKE_ENGINE, "--workers", "2", "--swing", "100",
+                                   "--min-advantage", "0", "--unique-margin", "10", "--min-ply", "4",
+                                   "--out", out]), 0)
+            with open(out, encoding="utf-8") as f:
+                lines = f.read().splitlines()
+        # Nine from the first game, one (the last ply) from the second
+        self.assertEqual(len(lines), 10)
+        self.assertEqual(sum("c0 \"games.pgn#2\"" in line for line in lines), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
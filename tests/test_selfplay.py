@@ -0,0 +1,49 @@
+import sys
+import os
+import tempfile
+import unittest
+
+import chess.polyglot
+import numpy as np
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.selfplay import load_records, record_board, record_move, run_selfplay
+from conftest import FAKE_ENGINE
+
+
+class TestSelfPlay(unittest.TestCase):
+    def test_generate_and_resume(self):
+        with tempfile.TemporaryDirectory() as directory:
+            writer, first, _ = run_selfplay(directory, 3, FAKE_ENGINE, workers=1, max_plies=30, chunk_size=50)
+            self.assertEqual(writer.next_game, 3)
+            records = load_records(directory)
+            self.assertEqual(len(records), first)
+
+            # Resuming plays only the missing games and never stores a position twice
+            writer, second, _ = run_selfplay(directory, 5, FAKE_ENGINE, workers=1, max_plies=30, chunk_size=50)
+            records = load_records(directory)
+
+        self.assertEqual(writer.next_game, 5)
+        self.assertEqual(len(records), first + second)
+        self.assertEqual(sorted(np.unique(records["game"]).tolist()), [0, 1, 2, 3, 4])
+        self.assertEqual(len(np.unique(records["key"])), len(records))
+        for record in records[::17]:
+            board = record_board(record)
+            self.assertEqual(chess.polyglot.zobrist_hash(board), int(record["key"]))
+            self.assertIn(record_move(record), board.legal_moves)
+            self.assertIn(int(record["result"]), (-1, 0, 1))
+
+    def test_engine_failure_drops_the_game(self):
+        with tempfile.TemporaryDirectory() as directory:
+            # Every game's third search crashes the engine (which restarts for the next game)
+            writer, positions, _ = run_selfplay(directory, 2, FAKE_ENGINE, ["--crash-after", "3"], workers=1,
+                                                max_plies=30)
+            self.assertEqual(writer.next_game, 2)
+            self.assertEqual(positions, 0)
+            self.assertEqual(len(load_records(directory)), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
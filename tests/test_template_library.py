@@ -0,0 +1,73 @@
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+
+import chess
+import numpy as np
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.template_library import TemplateLibrary, load_template_file, save_template_file
+from src.vision import VisionHandler
+from src.vision_synth import render_board
+
+
+def render(fen, style, theme):
+    return render_board(fen, square_size=40, style=style, theme=theme)
+
+
+STYLES = {
+    "green": ("shape", "green"),
+    "brown": ("letter", "brown"),
+}
+
+
+class TestTemplateLibrary(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.library = TemplateLibrary(self.directory)
+        for name, style in STYLES.items():
+            vision = VisionHandler()
+            vision.calibrate(render(chess.STARTING_FEN, *style))
+            self.library.save(name, vision.templates)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_round_trip_keeps_case(self):
+        path = os.path.join(self.directory, "single.npz")
+        templates = self.library.load("green")
+        save_template_file(path, templates)
+        loaded = load_template_file(path)
+        self.assertEqual(set(loaded), set(templates))
+        self.assertIn('K', loaded)
+        self.assertIn('k', loaded)
+        np.testing.assert_array_equal(loaded['Q'], templates['Q'])
+
+    def test_list_sets(self):
+        self.assertEqual(self.library.list_sets(), ["brown", "green"])
+
+    def test_select_from_middlegame(self):
+        fen = "r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4"
+        for name, style in STYLES.items():
+            chosen, _ = TemplateLibrary(self.directory).select(render(fen, *style))
+            self.assertEqual(chosen, name)
+
+    def test_vision_auto_select(self):
+        vision = VisionHandler()
+        self.assertFalse(vision.is_calibrated)
+        name = vision.auto_select_piece_set(render(chess.STARTING_FEN, *STYLES["brown"]), self.library)
+        self.assertEqual(name, "brown")
+        self.assertTrue(vision.is_calibrated)
+
+    def test_empty_library(self):
+        empty = TemplateLibrary(os.path.join(self.directory, "missing"))
+        self.assertEqual(empty.list_sets(), [])
+        self.assertEqual(empty.select(render(chess.STARTING_FEN, *STYLES["green"]))[0], None)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import sys
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import chess
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import uci_trace
+from src.metrics import registry
+from src.uci_trace import UciTrace, dump_all
+from conftest import fake_handler
+
+
+class TestUciTrace(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_ring_buffer_and_stats(self):
+        trace = UciTrace(capacity=6)
+        with mock.patch("time.perf_counter", side_effect=[1.0, 1.2, 1.5, 1.6, 2.0, 2.1, 2.4, 3.0]):
+            trace.record(">", "go depth 5")
+            trace.record("<", "info depth 1 score cp 10 pv e2e4")
+            trace.record("<", "info depth 2 score cp 12 pv e2e4")
+            trace.record("<", "bestmove e2e4")
+            trace.record(">", "position startpos moves e2e4")
+            trace.record(">", "go depth 5")
+            trace.record("<", "info depth 1 score cp -10 pv e7e5")
+            trace.record("<", "bestmove e7e5")
+        self.assertEqual(trace.total, 8)
+        self.assertEqual([line for _, _, line in trace.lines()][0], "info depth 2 score cp 12 pv e2e4")
+
+        # Only the second search is still complete in the buffer
+        stats = trace.stats()
+        self.assertEqual(len(stats["go_to_bestmove"]), 1)
+        self.assertAlmostEqual(stats["go_to_first_info"][0], 0.3)
+        self.assertAlmostEqual(stats["go_to_bestmove"][0], 0.9)
+        self.assertAlmostEqual(stats["search_silence"][0], 0.6)
+        self.assertAlmostEqual(stats["idle"][0], 0.5)
+        text = trace.format("test")
+        self.assertIn("6 lines kept of 8 recorded", text)
+        self.assertIn("reason: test", text)
+
+    def test_engine_traffic_is_traced(self):
+        before = registry.histogram("uci_go_to_bestmove_seconds").count
+        handler = fake_handler()
+        try:
+            handler.get_top_moves(chess.STARTING_FEN, limit=2, time_limit=0.01)
+            handler.get_best_move(chess.STARTING_FEN, time_limit=0.01)
+            lines = [(direction, line) for _, direction, line in handler.trace.lines()]
+            self.assertIn((">", "uci"), lines)
+            self.assertIn(("<", "uciok"), lines)
+            self.assertIn(("<", "bestmove a2a3"), lines)
+            self.assertEqual(len(handler.trace.stats()["go_to_bestmove"]), 2)
+            self.assertIn("fake_uci_engine.py pid", handler.trace.label)
+            self.assertGreaterEqual(registry.histogram("uci_go_to_bestmove_seconds").count, before + 2)
+
+            texts = []
+            for path in dump_all(os.path.join(self.tmp.name, "dumps")):
+                with open(path, encoding="utf-8") as f:
+                    texts.append(f.read())
+            mine = [text for text in texts if text.startswith(f"UCI trace of {handler.trace.label},")]
+            self.assertEqual(len(mine), 1)
+            self.assertIn("> go movetime 10", mine[0])
+        finally:
+            handler.quit()
+
+    def test_crash_dump(self):
+        crash_dir = os.path.join(self.tmp.name, "crashes")
+        with mock.patch.object(uci_trace, "CRASH_DIR", crash_dir), mock.patch.object(uci_trace, "MAX_CRASH_DUMPS", 2):
+            handler = fake_handler("--crash-after", "1")
+            try:
+                for _ in range(3):
+                    self.assertIsNone(handler.get_best_move(chess.STARTING_FEN, time_limit=0.01))
+            finally:
+                handler.quit()
+            dumps = sorted(os.listdir(crash_dir))
+            self.assertEqual(len(dumps), 2)  # rotated
+            with open(os.path.join(crash_dir, dumps[-1]), encoding="utf-8") as f:
+                text = f.read()
+        self.assertIn("reason: EngineTerminatedError", text)
+        self.assertIn("> go movetime 10", text)
+        self.assertIn("- process exited (code 1)", text)
+        self.assertIn("1 in progress", text)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,176 @@
+import sys
+import os
+import io
+import tempfile
+import unittest
+from contextlib import redirect_stderr
+from unittest import mock
+
+import chess
+import chess.pgn
+import cv2
+import numpy as np
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.square_classifier import DEFAULT_MODEL_PATH
+from src.template_library import TemplateLibrary
+from src.video_pgn import (VideoPGNReconstructor, changed_squares, format_timestamp, main, reconstruct_video,
+                           square_signatures)
+from src.vision import VisionHandler
+from src.vision_synth import render_board
+
+# Includes castling, whose change covers four squares
+MOVES = "e2e4 e7e5 g1f3 b8c6 f1c4 g8f6 e1g1".split()
+SQUARE = 32
+FPS = 10
+FRAMES_PER_POSITION = 4  # more than stable_frames + 1, so every position settles
+
+
+def positions(moves=MOVES):
+    """FEN of the start position and after each move."""
+    board = chess.Board()
+    fens = [board.fen()]
+    for uci in moves:
+        board.push_uci(uci)
+        fens.append(board.fen())
+    return fens
+
+
+def render(fen, **kwargs):
+    return render_board(fen, square_size=SQUARE, style="shape", **kwargs)
+
+
+def calibrated_vision():
+    vision = VisionHandler()
+    vision.calibrate(render(chess.STARTING_FEN))
+    return vision
+
+
+def feed(reconstructor, images):
+    """Feed images as consecutive frames at FPS; returns every accepted move."""
+    accepted = []
+    for i, image in enumerate(images):
+        accepted += reconstructor.feed_frame(image, i / FPS)
+    return accepted
+
+
+class TestSignatures(unittest.TestCase):
+    def test_changed_squares(self):
+        before = square_signatures(render(chess.STARTING_FEN))
+        after = square_signatures(render(positions()[1]))
+        mask = changed_squares(before, after, 8.0)
+        # Visual rows: rank 8 first; e2 and e4 are rows 6 and 4 of column 4
+        self.assertEqual(sorted(zip(*np.nonzero(mask))), [(4, 4), (6, 4)])
+        self.assertFalse(changed_squares(before, before, 8.0).any())
+        noisy = square_signatures(render(chess.STARTING_FEN, noise=3.0, seed=1))
+        self.assertFalse(changed_squares(before, noisy, 8.0).any())
+
+    def test_format_timestamp(self):
+        self.assertEqual(format_timestamp(0), "0:00:00.0")
+        self.assertEqual(format_timestamp(83.25), "0:01:23.2")
+        self.assertEqual(format_timestamp(3725.0), "1:02:05.0")
+
+
+class TestReconstructor(unittest.TestCase):
+    def frames(self, fens):
+        return [render(fen) for fen in fens for _ in range(FRAMES_PER_POSITION)]
+
+    def test_moves_and_timestamps(self):
+        reconstructor = VideoPGNReconstructor(calibrated_vision())
+        accepted = feed(reconstructor, self.frames(positions()))
+        self.assertEqual([m.uci() for m in accepted], MOVES)
+        self.assertEqual(reconstructor.board.fen(), positions()[-1])
+        self.assertEqual(reconstructor.stats["moves"], len(MOVES))
+        self.assertEqual(reconstructor.stats["unmatched"], 0)
+        # Only changed squares are classified: two per move, four for castling
+        self.assertEqual(reconstructor.stats["classified_squares"], 2 * (len(MOVES) - 1) + 4)
+
+        # Each move is accepted on the frame where its position has been still for stable_frames
+        first = reconstructor.game.next()
+        self.assertEqual(first.comment, f"[%ts {format_timestamp((FRAMES_PER_POSITION + 2) / FPS)}]")
+        pgn = str(reconstructor.game)
+        self.assertIn("1. e4 { [%ts 0:00:00.6] } 1... e5", pgn)
+        self.assertIn("4. O-O", pgn)
+
+    def test_dropped_position_is_two_plies(self):
+        fens = positions()
+        del fens[3]  # 2. Nf3 never settles on camera
+        reconstructor = VideoPGNReconstructor(calibrated_vision())
+        accepted = feed(reconstructor, self.frames(fens))
+        self.assertEqual([m.uci() for m in accepted], MOVES)
+        # Both plies of the pair carry the same timestamp
+        nodes = list(reconstructor.game.mainline())
+        self.assertEqual(nodes[2].comment, nodes[3].comment)
+
+    def test_noise_frame_is_ignored(self):
+        fens = positions()[:3]
+        images = self.frames(fens)
+        # A single garbled frame (a hand, a glitch) between two positions
+        images.insert(FRAMES_PER_POSITION, render(fens[0], noise=80.0, seed=2))
+        reconstructor = VideoPGNReconstructor(calibrated_vision())
+        accepted = feed(reconstructor, images)
+        self.assertEqual([m.uci() for m in accepted], MOVES[:2])
+        self.assertEqual(reconstructor.stats["unmatched"], 0)
+        self.assertGreater(reconstructor.stats["skipped"], 0)
+
+
+class TestVideoFile(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.video = os.path.join(self.tmp.name, "game.avi")
+        # Frame around the board, as in a screen recording
+        side = 8 * SQUARE
+        writer = cv2.VideoWriter(self.video, cv2.VideoWriter_fourcc(*"MJPG"), FPS, (side + 40, side + 20))
+        for fen in positions():
+            frame = np.full((side + 20, side + 40, 3), 40, dtype=np.uint8)
+            frame[10:10 + side, 20:20 + side] = render(fen)
+            for _ in range(FRAMES_PER_POSITION):
+                writer.write(frame)
+        writer.release()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_reconstruct_video(self):
+        game, stats = reconstruct_video(self.video, crop=(20, 10, 8 * SQUARE, 8 * SQUARE), sample_fps=FPS)
+        self.assertEqual([m.uci() for m in game.mainline_moves()], MOVES)
+        self.assertEqual(game.headers["Site"], self.video)
+        self.assertEqual(game.headers["Result"], "*")
+        self.assertAlmostEqual(stats["video_seconds"], len(positions()) * FRAMES_PER_POSITION / FPS)
+        self.assertEqual(stats["frames"], len(positions()) * FRAMES_PER_POSITION)
+
+    def test_cli(self):
+        out = os.path.join(self.tmp.name, "game.pgn")
+        err = io.StringIO()
+        with redirect_stderr(err):
+            self.assertEqual(main([self.video, "--out", out, "--crop", f"20,10,{8 * SQUARE},{8 * SQUARE}",
+                                   "--sample-fps", str(FPS)]), 0)
+        with open(out, encoding="utf-8") as f:
+            game = chess.pgn.read_game(f)
+        self.assertEqual([m.uci() for m in game.mainline_moves()], MOVES)
+        self.assertEqual(game.next().comment, "[%ts 0:00:00.6]")
+        self.assertIn(f"{len(MOVES)} moves from 3s of video", err.getvalue())
+
+    def test_cli_piece_set_from_library(self):
+        library = os.path.join(self.tmp.name, "sets")
+        TemplateLibrary(library).save("synth", calibrated_vision().templates)
+        out = os.path.join(self.tmp.name, "game.pgn")
+        with redirect_stderr(io.StringIO()):
+            self.assertEqual(main([self.video, "--out", out, "--crop", f"20,10,{8 * SQUARE},{8 * SQUARE}",
+                                   "--sample-fps", str(FPS), "--templates", "synth", "--library", library]), 0)
+        with open(out, encoding="utf-8") as f:
+            game = chess.pgn.read_game(f)
+        self.assertEqual([m.uci() for m in game.mainline_moves()], MOVES)
+
+    def test_cli_default_classifier(self):
+        # A bare --classifier loads the same default weights as batch_vision
+        with mock.patch.object(VisionHandler, "use_classifier", side_effect=RuntimeError("stop")) as use:
+            with self.assertRaises(RuntimeError):
+                main([self.video, "--classifier"])
+        use.assert_called_once_with(DEFAULT_MODEL_PATH)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+import sys
+import os
+import tempfile
+import unittest
+
+import chess
+import numpy as np
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.random_positions import random_fens
+from src.square_classifier import CLASSES, SquareClassifier, board_features, board_labels, build_training_set
+from src.vision import VisionHandler
+from src.vision_synth import available_styles, count_correct_squares, generate_samples, ground_truth, render_board
+
+
+class TestVisionSynth(unittest.TestCase):
+    def test_render_size_and_channels(self):
+        for style in available_styles():
+            image = render_board(chess.STARTING_FEN, square_size=32, style=style)
+            self.assertEqual(image.shape, (256, 256, 3))
+            self.assertEqual(image.dtype, np.uint8)
+
+    def test_noise_is_reproducible(self):
+        a = render_board(chess.STARTING_FEN, noise=8.0, seed=3)
+        b = render_board(chess.STARTING_FEN, noise=8.0, seed=3)
+        np.testing.assert_array_equal(a, b)
+
+    def test_ground_truth_order(self):
+        grid = ground_truth(chess.STARTING_FEN)
+        self.assertEqual(grid[0], list("rnbqkbnr"))
+        self.assertEqual(grid[7], list("RNBQKBNR"))
+        self.assertEqual(grid[4], ['.'] * 8)
+
+    def test_samples_carry_ground_truth(self):
+        fens = random_fens(3, seed=1)
+        samples = list(generate_samples(fens, square_size=24, style="shape"))
+        self.assertEqual(len(samples), 3)
+        for sample, fen in zip(samples, fens):
+            self.assertEqual(sample["fen"], fen)
+            self.assertEqual(sample["board_fen"], chess.Board(fen).board_fen())
+
+    def test_count_correct_squares(self):
+        self.assertEqual(count_correct_squares(chess.STARTING_FEN, chess.STARTING_FEN), 64)
+        after_e4 = "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1"
+        self.assertEqual(count_correct_squares(after_e4, chess.STARTING_FEN), 62)
+
+
+class TestVisionHandler(unittest.TestCase):
+    def setUp(self):
+        self.vision = VisionHandler()
+        self.start = render_board(chess.STARTING_FEN, square_size=40, style="shape")
+
+    def test_uncalibrated(self):
+        self.assertIsNone(self.vision.get_fen_from_image(self.start))
+
+    def test_split_board(self):
+        squares = self.vision.split_board(self.start)
+        self.assertEqual(len(squares), 8)
+        self.assertEqual(len(squares[0]), 8)
+        self.assertEqual(squares[0][0].shape, (32, 32, 3))
+
+    def test_calibrated_fen_and_confidence(self):
+        self.vision.calibrate(self.start)
+        fen, confidence = self.vision.get_fen_with_confidence(self.start)
+        self.assertEqual(fen.split()[1:], ["w", "KQkq", "-", "0", "1"])
+        self.assertEqual(len(fen.split()[0].split("/")), 8)
+        self.assertEqual(fen.split()[0], chess.Board().board_fen())
+        # Every square, on either square colour, clearly beats its runner-up template
+        self.assertGreater(confidence, 0.5)
+        self.assertLessEqual(confidence, 1.0)
+
+    def test_templates_match_on_both_square_colours(self):
+        self.vision.calibrate(self.start)
+        # The queens and kings are calibrated on one square colour only
+        for fen in ["4k3/8/8/8/8/8/8/3QK3 w - - 0 1", "3kq3/8/8/8/8/8/8/2K1Q3 w - - 0 1"] + random_fens(5, seed=7):
+            image = render_board(fen, square_size=40, style="shape")
+            self.assertEqual(self.vision.get_fen_from_image(image).split()[0], chess.Board(fen).board_fen())
+
+    def test_replacing_templates_drops_prepared_ones(self):
+        letters = render_board(chess.STARTING_FEN, square_size=40, style="letter")
+        self.vision.calibrate(self.start)
+        self.vision.get_fen_from_image(self.start)  # prepares the shape templates
+        other = VisionHandler()
+        other.calibrate(letters)
+        self.vision.templates = other.templates
+        self.assertEqual(self.vision.get_fen_from_image(letters).split()[0], chess.Board().board_fen())
+
+    def test_save_and_load_templates(self):
+        self.vision.calibrate(self.start)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "set.npz")
+            self.vision.save_templates(path)
+            other = VisionHandler()
+            other.load_templates(path)
+        self.assertTrue(other.is_calibrated)
+        self.assertEqual(other.get_fen_from_image(self.start), self.vision.get_fen_from_image(self.start))
+
+
+class TestSquareClassifier(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        features, labels = build_training_set(boards=80, seed=0, styles=["shape", "letter"], sizes=(32, 40))
+        cls.model = SquareClassifier(features.shape[1], hidden=32)
+        cls.model.train(features, labels, epochs=10)
+
+    def test_features_and_labels_shape(self):
+        image = render_board(chess.STARTING_FEN, square_size=32)
+        self.assertEqual(board_features(image).shape[0], 64)
+        labels = board_labels(chess.STARTING_FEN)
+        self.assertEqual(CLASSES[labels[0]], 'r')
+        self.assertEqual(CLASSES[labels[63]], 'R')
+        self.assertEqual(CLASSES[labels[30]], '.')
+
+    def test_held_out_accuracy(self):
+        correct = total = 0
+        for sample in generate_samples(random_fens(5, seed=99), square_size=36, style="shape", theme="blue"):
+            fen = VisionHandler(classifier=self.model).get_fen_from_image(sample["image"])
+            correct += count_correct_squares(fen, sample["fen"])
+            total += 64
+        self.assertGreater(correct / total, 0.97)
+
+    def test_save_and_load(self):
+        image = render_board(random_fens(1, seed=5)[0], square_size=32, style="letter")
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "model.npz")
+            self.model.save(path)
+            loaded = SquareClassifier.load(path)
+        self.assertEqual(loaded.classify_board(image)[0], self.model.classify_board(image)[0])
+
+
+if __name__ == '__main__':
+    unittest.main()